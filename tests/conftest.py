@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# tools/ 內的模組以檔名互相匯入
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "tools"))
@@ -0,0 +1,22 @@
+from code_index import CodeIndex
+
+
+def _index(tmp_path):
+    index = CodeIndex(str(tmp_path / "code_index.db"))
+    index.add_document('a', 'code', "curve = CreateCurve(points)\nCURVE_COUNT = 3", page=1)
+    index.add_document('b', 'code', "spline = doc.Curve(pts)", page=2)
+    return index
+
+
+def test_identifier_search_is_case_sensitive(tmp_path):
+    with _index(tmp_path) as index:
+        hits = index.search('Curve', identifier=True)
+        assert [(hit['ref'], hit['line']) for hit in hits] == [('b', 1)]
+        assert [hit['ref'] for hit in index.search('curve', identifier=True)] == ['a']
+        assert index.search('CreateCurv', identifier=True) == []
+
+
+def test_substring_search_ignores_case(tmp_path):
+    with _index(tmp_path) as index:
+        hits = index.search('curve')
+        assert [(hit['ref'], hit['line']) for hit in hits] == [('a', 1), ('a', 2), ('b', 1)]
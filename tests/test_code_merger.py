@@ -0,0 +1,52 @@
+from code_merger import StreamingCodeMerger, line_number_range
+
+
+def _block(page, first, last, top=0.1, bottom=0.9, **extra):
+    lines = [f"{n} x{n} = {n}" for n in range(first, last + 1)] if first else []
+    return dict({'page': page, 'screenshot': f"page_{page:03d}.png", 'code_lines': lines,
+                 'description': '', 'line_count': len(lines), 'has_description': False,
+                 'first_line_no': first, 'last_line_no': last,
+                 'top_ratio': top, 'bottom_ratio': bottom}, **extra)
+
+
+def _merge_all(blocks):
+    merger = StreamingCodeMerger()
+    merged = []
+    for block in blocks:
+        merged.extend(merger.feed(block))
+    return merged + merger.close()
+
+
+def test_line_number_range():
+    assert line_number_range(["12 a = 1", "", "14 b = 2"]) == (12, 14)
+    assert line_number_range(["a = 1"]) == (None, None)
+
+
+def test_chain_over_three_pages_is_merged_once():
+    merged = _merge_all([_block(4, 1, 20), _block(5, 21, 40), _block(6, 41, 45, bottom=0.3),
+                         _block(7, 1, 5)])
+    assert len(merged) == 2
+    chain = merged[0]
+    assert chain['pages'] == [4, 5, 6]
+    assert chain['line_count'] == 45
+    assert (chain['first_line_no'], chain['last_line_no']) == (1, 45)
+    assert merged[1]['page'] == 7
+
+
+def test_gap_in_line_numbers_or_pages_breaks_the_chain():
+    merged = _merge_all([_block(4, 1, 20), _block(5, 25, 30), _block(7, 31, 35)])
+    assert [block.get('pages', [block['page']]) for block in merged] == [[4], [5], [7]]
+
+
+def test_position_decides_when_numbers_continue():
+    # 上一區塊在頁面中段結束、下一區塊也不在頁首：是兩段獨立的程式
+    merged = _merge_all([_block(4, 1, 10, bottom=0.5), _block(5, 11, 20, top=0.6)])
+    assert len(merged) == 2
+
+
+def test_blocks_without_numbers_fall_back_to_is_continued():
+    first = _block(4, None, None, code_lines=["a = 1"], is_continued=True)
+    second = _block(5, None, None, code_lines=["b = 2"])
+    merged = _merge_all([first, second])
+    assert len(merged) == 1
+    assert merged[0]['code_lines'] == ["a = 1", "b = 2"]
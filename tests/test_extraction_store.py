@@ -0,0 +1,46 @@
+import json
+
+from extraction_store import ExtractionStore, PDF_SCANNER, AUTO_EXTRACTOR
+
+
+def _block(page, block, code, **extra):
+    return dict({'page': page, 'block': block, 'code': code, 'description': '',
+                 'screenshot': f"screenshots/page_{page:03d}_block_{block}.png"}, **extra)
+
+
+def test_upsert_keeps_ocr_text_out_of_the_exported_json(tmp_path):
+    with ExtractionStore(str(tmp_path / "extraction.db")) as store:
+        block = _block(3, 1, "print(1)", raw_text="3 pr1nt(1)")
+        store.upsert_block('book.pdf', PDF_SCANNER, '3:1', block, 'ocr_done')
+
+        row = store.query_blocks('book.pdf', PDF_SCANNER)[0]
+        assert row['ocr_text'] == "3 pr1nt(1)"
+        assert row['code'] == "print(1)"
+
+        codes = store.export_extracted_codes('book.pdf', tmp_path / "extracted_codes.json")
+        assert codes == [_block(3, 1, "print(1)")]
+        assert json.loads((tmp_path / "extracted_codes.json").read_text()) == codes
+
+
+def test_replace_page_blocks_and_upsert_update_in_place(tmp_path):
+    with ExtractionStore(str(tmp_path / "extraction.db")) as store:
+        store.replace_page_blocks('book.pdf', PDF_SCANNER, 5,
+                                  [('5:1', _block(5, 1, "a = 1")), ('5:2', _block(5, 2, "b = 2"))],
+                                  'ocr_done')
+        store.replace_page_blocks('book.pdf', PDF_SCANNER, 5,
+                                  [('5:1', _block(5, 1, "a = 10"))], 'ocr_done')
+        store.upsert_block('book.pdf', PDF_SCANNER, '7:1', _block(7, 1, "c = 3"), 'ocr_done')
+        store.upsert_block('book.pdf', PDF_SCANNER, '7:1', _block(7, 1, "c = 4"), 'ocr_done')
+
+        assert [b['code'] for b in store.blocks_data('book.pdf', PDF_SCANNER)] == ["a = 10", "c = 4"]
+        assert store.blocks_data('book.pdf', PDF_SCANNER, pages=(6, 8))[0]['page'] == 7
+
+
+def test_code_regions_export_matches_the_auto_extractor_format(tmp_path):
+    regions = [{'page': 10, 'region': 1, 'image': 'examples/code_p10_12_40.png',
+                'dimensions': '300x120'}]
+    with ExtractionStore(str(tmp_path / "extraction.db")) as store:
+        for i, region in enumerate(regions):
+            store.upsert_block('book.pdf', AUTO_EXTRACTOR, f"10:{i + 1}", region, 'detected')
+        assert store.export_code_regions('book.pdf', tmp_path / "code_regions.json") == regions
+    assert json.loads((tmp_path / "code_regions.json").read_text()) == regions
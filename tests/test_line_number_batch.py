@@ -0,0 +1,78 @@
+import numpy as np
+import pytesseract
+
+import line_number_batch
+from line_number_batch import BatchLineNumberVerifier, left_strip
+
+
+def _block(rows):
+    """寬400的區塊影像，rows 列出左側行號所在的y座標"""
+    image = np.full((200, 400), 255, np.uint8)
+    for y in rows:
+        image[y:y + 8, 10:30] = 0
+    return image
+
+
+def _fake_tesseract(calls):
+    """把拼圖中每段深色列當成一行數字"""
+    def image_to_data(sprite, config='', output_type=None):
+        calls.append(sprite.shape)
+        dark = (sprite < 128).any(axis=1)
+        data = {key: [] for key in ('text', 'block_num', 'par_num', 'line_num', 'top', 'height')}
+        y = 0
+        while y < len(dark):
+            if not dark[y]:
+                y += 1
+                continue
+            end = y
+            while end < len(dark) and dark[end]:
+                end += 1
+            data['text'].append(str(len(data['text']) + 1))
+            data['block_num'].append(1)
+            data['par_num'].append(1)
+            data['line_num'].append(len(data['text']))
+            data['top'].append(y)
+            data['height'].append(end - y)
+            y = end
+        return data
+    return image_to_data
+
+
+def test_left_strip_is_the_number_column():
+    assert left_strip(_block([])).shape == (200, 40)
+
+
+def test_one_ocr_call_maps_lines_back_to_blocks(monkeypatch):
+    calls = []
+    monkeypatch.setattr(line_number_batch.pytesseract, 'image_to_data', _fake_tesseract(calls))
+    verifier = BatchLineNumberVerifier()
+    verifier.add((3, 1), _block([20, 60, 100, 140]))
+    verifier.add((3, 2), _block([]))
+    verifier.add((4, 1), _block([20, 60]))
+
+    assert verifier.flush() == {(3, 1): True, (3, 2): False, (4, 1): False}
+    assert len(calls) == 1
+    assert verifier.stats()['strips_checked'] == 3
+    assert verifier.stats()['calls_saved'] == 2
+
+
+def test_sprites_are_split_at_the_height_limit(monkeypatch):
+    calls = []
+    monkeypatch.setattr(line_number_batch.pytesseract, 'image_to_data', _fake_tesseract(calls))
+    verifier = BatchLineNumberVerifier(max_sprite_height=500)
+    for page in range(5):
+        verifier.add(page, _block([20, 60, 100]))
+
+    assert verifier.flush() == {page: True for page in range(5)}
+    assert len(calls) == 3
+    assert all(height <= 500 + verifier.gap for height, _ in calls)
+
+
+def test_ocr_failure_means_no_line_numbers(monkeypatch):
+    def broken(*args, **kwargs):
+        raise pytesseract.TesseractNotFoundError()
+    monkeypatch.setattr(line_number_batch.pytesseract, 'image_to_data', broken)
+    verifier = BatchLineNumberVerifier()
+    verifier.add('a', _block([20, 60, 100]))
+    assert verifier.flush() == {'a': False}
+    assert verifier.stats()['ocr_calls'] == 0
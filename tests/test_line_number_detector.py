@@ -0,0 +1,35 @@
+import cv2
+import numpy as np
+
+from line_number_detector import decide, detect_line_numbers
+
+
+def _numbered_block(lines: int = 8) -> np.ndarray:
+    image = np.full((lines * 30 + 20, 420), 235, dtype=np.uint8)
+    for i in range(lines):
+        y = 35 + i * 30
+        cv2.putText(image, f"{i + 1:>2}", (8, y), cv2.FONT_HERSHEY_SIMPLEX, 0.6, 0, 1)
+        cv2.putText(image, "pt = rs.AddPoint(x, y, 0)", (70, y),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.6, 0, 1)
+    return image
+
+
+def test_numbered_code_is_positive():
+    detection = detect_line_numbers(_numbered_block())
+    assert decide(detection) is True
+
+
+def test_figure_without_gutter_is_negative():
+    figure = np.full((200, 300), 235, dtype=np.uint8)
+    for x in range(10, 290, 20):
+        for y in range(10, 190, 20):
+            cv2.circle(figure, (x, y), 6, 0, 1)
+    assert decide(detect_line_numbers(figure)) is False
+
+
+def test_only_the_band_between_thresholds_is_ambiguous():
+    base = {'column': [0, 10], 'rows': 8, 'digit_rows': 8}
+    assert decide(dict(base, confidence=0.9)) is True
+    assert decide(dict(base, confidence=0.65)) is None
+    assert decide(dict(base, confidence=0.5)) is False
+    assert decide(dict(base, confidence=0.0, column=None, digit_rows=0)) is False
@@ -0,0 +1,50 @@
+import cv2
+import numpy as np
+
+from ocr_cache import OCRCache
+
+
+def _crop(seed=0, shape=(40, 120)):
+    return np.random.default_rng(seed).integers(0, 256, shape, dtype=np.uint8)
+
+
+def test_key_covers_pixels_engine_config_and_version(tmp_path):
+    cache = OCRCache(str(tmp_path / "cache"))
+    base = cache.key(_crop(), 'dots.ocr', '', '1.0')
+    assert base == cache.key(_crop(), 'dots.ocr', '', '1.0')
+    others = [cache.key(_crop(1), 'dots.ocr', '', '1.0'),
+              cache.key(_crop(), 'tesseract', '', '1.0'),
+              cache.key(_crop(), 'dots.ocr', '--psm 6', '1.0'),
+              cache.key(_crop(), 'dots.ocr', '', '1.1'),
+              cache.key(_crop().reshape(120, 40), 'dots.ocr', '', '1.0')]
+    assert len({base, *others}) == 6
+
+
+def test_key_is_the_same_for_a_path_and_its_pixels(tmp_path):
+    cache = OCRCache(str(tmp_path / "cache"))
+    path = tmp_path / "block.png"
+    cv2.imwrite(str(path), _crop())
+    assert cache.key(path, 'dots.ocr') == cache.key(_crop(), 'dots.ocr')
+    assert cache.key(tmp_path / "missing.png", 'dots.ocr') is None
+
+
+def test_get_returns_first_hit_and_counts_once(tmp_path):
+    cache = OCRCache(str(tmp_path / "cache"))
+    dots, tesseract = cache.key(_crop(), 'dots.ocr'), cache.key(_crop(), 'tesseract')
+    assert cache.get(dots) is None
+    cache.put(tesseract, "fallback")
+    assert cache.get(dots, tesseract) == "fallback"
+    cache.put(dots, "primary")
+    assert cache.get(dots, tesseract) == "primary"
+    assert cache.stats() == {'hits': 2, 'misses': 1, 'hit_rate': 0.667}
+
+
+def test_results_survive_a_new_cache_instance_and_evict_by_size(tmp_path):
+    cache = OCRCache(str(tmp_path / "cache"), max_bytes=250)
+    keys = [cache.key(_crop(i), 'dots.ocr') for i in range(4)]
+    for key in keys:
+        cache.put(key, "x" * 100)
+    reopened = OCRCache(str(tmp_path / "cache"), max_bytes=250)
+    assert reopened.get(keys[-1]) == "x" * 100
+    assert reopened.get(keys[0]) is None
+    assert len(list((tmp_path / "cache").glob("*.txt"))) <= 2
@@ -0,0 +1,39 @@
+from ocr_correction import OCRCorrector
+
+
+def test_parseable_code_keeps_literals():
+    """能解析的程式碼中，字串與註解內的中文標點不動"""
+    corrector = OCRCorrector()
+    code = 'print("他說“你好”")  # 說明，這裡'
+    assert corrector.correct_code(code) == code
+
+
+def test_normalizes_only_outside_literals():
+    corrector = OCRCorrector()
+    code = 'def f（x）：\n    return "“a”"  # 註解，保留'
+    assert corrector.correct_code(code) == 'def f(x):\n    return "“a”"  # 註解，保留'
+
+
+def test_fixes_undefined_identifier():
+    """未定義的 pr1nt 改成 print；屬性與自己定義的名稱不動"""
+    corrector = OCRCorrector()
+    assert corrector.correct_code('pr1nt(x)') == 'print(x)'
+    assert corrector.correct_code('for i in range(1O)\n    pr1nt(i)') == \
+        'for i in range(10):\n    print(i)'
+    assert corrector.correct_code('obj.pr1nt(1)') == 'obj.pr1nt(1)'
+    assert corrector.correct_code('pr1nt = 3\npr1nt') == 'pr1nt = 3\npr1nt'
+
+
+def test_decisions_are_memoized_and_persisted(tmp_path):
+    cache = tmp_path / "corrections.json"
+    corrector = OCRCorrector(str(cache))
+    code = 'for i in range(1O)\n    x = i'
+    fixed = corrector.correct_batch([code, code])
+    assert fixed == ['for i in range(10):\n    x = i'] * 2
+    assert corrector.stats()['cache_misses'] == 2
+    assert corrector.stats()['cache_hits'] == 2
+    corrector.save()
+
+    reloaded = OCRCorrector(str(cache))
+    assert reloaded.correct_code(code) == fixed[0]
+    assert reloaded.stats()['cache_misses'] == 0
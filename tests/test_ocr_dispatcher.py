@@ -0,0 +1,83 @@
+import time
+
+import pytest
+
+from ocr_dispatcher import OCRDispatcher
+
+# 假的 Dots OCR 直譯器：依圖片名稱決定回傳文字、失敗或卡住
+FAKE_PYTHON = """#!/bin/sh
+case "$3" in
+    *slow*) sleep 30 & echo $! > "$3.pid"; wait ;;
+    *fail*) echo broken >&2; exit 1 ;;
+    *) echo "text of $(basename "$3")" ;;
+esac
+"""
+
+
+@pytest.fixture
+def fake_python(tmp_path):
+    path = tmp_path / "python"
+    path.write_text(FAKE_PYTHON)
+    path.chmod(0o755)
+    return str(path)
+
+
+def test_results_come_back_in_submission_order(fake_python, tmp_path):
+    dispatcher = OCRDispatcher(concurrency=3, timeout=10, python=fake_python)
+    try:
+        paths = [str(tmp_path / f"block_{i}.png") for i in range(6)]
+        assert dispatcher.recognize(paths) == [f"text of block_{i}.png\n" for i in range(6)]
+    finally:
+        dispatcher.close()
+
+
+def test_timeouts_are_retried_then_fall_back(fake_python, tmp_path):
+    dispatcher = OCRDispatcher(concurrency=1, timeout=0.3, retries=1, backoff=0.01,
+                               python=fake_python)
+    try:
+        engine, _ = dispatcher.submit(tmp_path / "slow.png").result(timeout=10)
+    finally:
+        dispatcher.close()
+    stats = dispatcher.stats()
+    assert (stats['timeouts'], stats['retries'], stats['fallbacks']) == (2, 1, 1)
+    assert engine != 'dots.ocr'
+
+
+def test_backoff_does_not_hold_the_only_slot(fake_python, tmp_path):
+    dispatcher = OCRDispatcher(concurrency=1, timeout=10, retries=1, backoff=2,
+                               python=fake_python)
+    try:
+        dispatcher.submit(tmp_path / "fail.png")
+        time.sleep(0.3)  # 第一次失敗後進入2秒退避
+        start = time.perf_counter()
+        assert dispatcher.submit(tmp_path / "ok.png").result(timeout=10)[0] == 'dots.ocr'
+        assert time.perf_counter() - start < 1.5
+    finally:
+        dispatcher.close()
+
+
+def test_close_cancels_jobs_and_kills_process_groups(fake_python, tmp_path):
+    dispatcher = OCRDispatcher(concurrency=1, timeout=60, python=fake_python)
+    image = tmp_path / "slow.png"
+    future = dispatcher.submit(image)
+    pid_file = tmp_path / "slow.png.pid"
+    for _ in range(50):
+        if pid_file.exists() and pid_file.read_text().strip():
+            break
+        time.sleep(0.1)
+    sleeper = int(pid_file.read_text())
+
+    dispatcher.close()
+
+    assert future.cancelled()
+    time.sleep(0.1)
+    assert not _alive(sleeper)
+
+
+def _alive(pid: int) -> bool:
+    """行程仍在執行（已結束但尚未被回收的殭屍行程不算）"""
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            return f.read().rsplit(')', 1)[1].split()[0] != 'Z'
+    except FileNotFoundError:
+        return False
@@ -0,0 +1,31 @@
+import sys
+
+import pytest
+
+import ocr_worker
+
+
+def test_pool_closes_started_workers_when_a_later_one_fails(monkeypatch):
+    started = []
+    real_worker = ocr_worker.OCRWorker
+
+    def worker(python):
+        if started:
+            raise RuntimeError("second worker failed")
+        started.append(real_worker(python=sys.executable, startup_timeout=30))
+        return started[-1]
+
+    monkeypatch.setattr(ocr_worker, 'OCRWorker', worker)
+    with pytest.raises(RuntimeError):
+        ocr_worker.OCRWorkerPool(2)
+    assert started[0].process.poll() is not None
+
+
+def test_worker_reports_engine_and_closes_its_process_group():
+    worker = ocr_worker.OCRWorker(python=sys.executable, startup_timeout=30)
+    try:
+        # 測試環境沒有 dots.ocr，工作行程宣告改用pytesseract
+        assert worker.engine in ('dots.ocr', 'tesseract')
+    finally:
+        worker.close()
+    assert worker.process.poll() is not None
@@ -0,0 +1,53 @@
+import cv2
+import numpy as np
+
+from perceptual_hash import DuplicateGrouper, dhash, hamming, phash
+
+
+def _code_crop(text, width=420, shift=0):
+    image = np.full((60, width), 235, dtype=np.uint8)
+    cv2.putText(image, "1  import rhinoscriptsyntax as rs", (8 + shift, 22),
+                cv2.FONT_HERSHEY_SIMPLEX, 0.5, 0, 1)
+    cv2.putText(image, f"2  {text}", (8 + shift, 48), cv2.FONT_HERSHEY_SIMPLEX, 0.5, 0, 1)
+    return image
+
+
+def _noisy(image, seed=0):
+    noise = np.random.default_rng(seed).integers(-4, 5, image.shape)
+    return np.clip(image.astype(np.int16) + noise, 0, 255).astype(np.uint8)
+
+
+def test_hashes_are_stable_under_render_noise():
+    crop = _code_crop("pt = rs.AddPoint(0, 0, 0)")
+    for func in (dhash, phash):
+        assert func(crop) == func(crop.copy())
+        assert hamming(func(crop), func(_noisy(crop))) <= 10
+    scaled = cv2.resize(crop, (crop.shape[1] * 2, crop.shape[0] * 2))
+    assert hamming(dhash(crop), dhash(scaled)) <= 10
+    assert hamming(0b1011, 0b0001) == 2
+
+
+def test_repeated_block_joins_the_first_group():
+    grouper = DuplicateGrouper(threshold=10)
+    first = _code_crop("pt = rs.AddPoint(0, 0, 0)")
+    assert grouper.assign(first, 'p1') == (0, False)
+    grouper.set_text(0, "import rhinoscriptsyntax as rs")
+    # 另一頁重新渲染的同一段程式
+    again = _code_crop("pt = rs.AddPoint(0, 0, 0)")
+    again[5, 400] = 120
+    assert grouper.assign(again, 'p9') == (0, True)
+    assert grouper.text(0) == "import rhinoscriptsyntax as rs"
+
+
+def test_one_character_difference_is_not_a_duplicate():
+    grouper = DuplicateGrouper(threshold=10)
+    grouper.assign(_code_crop("pt = rs.AddPoint(0, 0, 0)"))
+    group_id, duplicate = grouper.assign(_code_crop("pt = rs.AddPoint(0, 0, 8)"))
+    assert (group_id, duplicate) == (1, False)
+    assert grouper.stats() == {'checked': 2, 'groups': 2, 'ocr_avoided': 0}
+
+
+def test_different_sizes_never_match():
+    grouper = DuplicateGrouper(threshold=64)
+    grouper.assign(_code_crop("x = 1", width=420))
+    assert grouper.assign(_code_crop("x = 1", width=300))[1] is False
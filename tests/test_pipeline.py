@@ -0,0 +1,48 @@
+import threading
+
+import fitz
+
+from pdf_scanner import PDFCodeScanner
+
+
+def _blank_pdf(path, pages):
+    doc = fitz.open()
+    for i in range(pages):
+        doc.new_page().insert_text((72, 72), f"page {i + 1}")
+    doc.save(str(path))
+    doc.close()
+
+
+def test_iter_scan_stops_stage_threads_when_consumer_stops(tmp_path):
+    pdf_path = tmp_path / "blank.pdf"
+    _blank_pdf(pdf_path, 12)
+    scanner = PDFCodeScanner(str(pdf_path), output_dir=str(tmp_path / "out"),
+                             screenshots_dir=str(tmp_path / "shots"))
+    before = set(threading.enumerate())
+
+    scan = scanner.iter_scan(dpi=36, queue_size=1)
+    page_num, results = next(scan)
+    scan.close()
+
+    assert page_num == 1 and results == []
+    assert set(threading.enumerate()) - before == set()
+
+
+def test_iter_scan_stops_stage_threads_on_error(tmp_path):
+    pdf_path = tmp_path / "blank.pdf"
+    _blank_pdf(pdf_path, 6)
+    scanner = PDFCodeScanner(str(pdf_path), output_dir=str(tmp_path / "out"),
+                             screenshots_dir=str(tmp_path / "shots"))
+    before = set(threading.enumerate())
+
+    def fail(page_num, code_blocks):
+        raise ValueError("OCR failed")
+    scanner.submit_ocr = fail
+
+    try:
+        list(scanner.iter_scan(dpi=36, queue_size=1))
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("stage error was not raised")
+    assert set(threading.enumerate()) - before == set()
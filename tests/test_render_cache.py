@@ -0,0 +1,70 @@
+import os
+import time
+
+import fitz
+
+from render_cache import RenderCache, evict_lru, png_size
+
+
+def _pdf(path, pages=2):
+    doc = fitz.open()
+    for i in range(pages):
+        doc.new_page(width=200, height=100).insert_text((20, 50), f"page {i + 1}")
+    doc.save(str(path))
+    doc.close()
+    return path
+
+
+def test_key_depends_on_every_render_parameter(tmp_path):
+    cache = RenderCache(str(tmp_path / "cache"))
+    base = cache.key('abc', 0, 144)
+    assert base == cache.key('abc', 0, 144)
+    others = [cache.key('abd', 0, 144), cache.key('abc', 1, 144), cache.key('abc', 0, 200),
+              cache.key('abc', 0, 144, clip=(0, 0, 10, 10)),
+              cache.key('abc', 0, 144, colorspace='gray')]
+    assert len({base, *others}) == 6
+
+
+def test_second_render_is_a_hit_and_changed_pdf_is_a_miss(tmp_path):
+    cache = RenderCache(str(tmp_path / "cache"))
+    pdf_path = _pdf(tmp_path / "book.pdf")
+    with fitz.open(str(pdf_path)) as doc:
+        first = cache.render(doc, 0, 72)
+        assert cache.render(doc, 0, 72) == first
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert png_size(first) == (200, 100)
+
+    time.sleep(0.01)
+    _pdf(pdf_path, pages=3)
+    with fitz.open(str(pdf_path)) as doc:
+        assert cache.render(doc, 0, 72) != first
+    assert cache.misses == 2
+
+
+def test_materialize_hardlinks_into_the_output_dir(tmp_path):
+    cache = RenderCache(str(tmp_path / "cache"))
+    with fitz.open(str(_pdf(tmp_path / "book.pdf"))) as doc:
+        dest = cache.render_to(doc, 1, 72, tmp_path / "page_002.png")
+        cached = cache.render(doc, 1, 72)
+    assert dest.samefile(cached)
+    assert os.stat(cached).st_nlink == 2
+    # 再放一次同一個位置不會出錯
+    assert cache.materialize(cached, dest) == dest
+
+
+def test_evict_lru_removes_least_recently_used_first(tmp_path):
+    for i, name in enumerate(["old", "mid", "new"]):
+        path = tmp_path / f"{name}.png"
+        path.write_bytes(b"x" * 100)
+        os.utime(path, (1000 + i, 1000 + i))
+    freed = evict_lru(tmp_path, 150, "*.png")
+    assert freed == 200
+    assert [p.name for p in tmp_path.glob("*.png")] == ["new.png"]
+
+
+def test_cache_stays_under_its_byte_limit(tmp_path):
+    cache = RenderCache(str(tmp_path / "cache"), max_bytes=1)
+    with fitz.open(str(_pdf(tmp_path / "book.pdf"))) as doc:
+        for dpi in (72, 96, 120):
+            cache.render(doc, 0, dpi)
+    assert len(list((tmp_path / "cache").glob("*.png"))) <= 1
@@ -0,0 +1,23 @@
+import json
+
+from scan_manifest import ScanManifest
+
+
+def test_record_batches_writes(tmp_path):
+    path = tmp_path / "scan_manifest.json"
+    manifest = ScanManifest(path, settings={'ocr_dpi': 200}, save_every=3)
+    manifest.record(1, 'a', [])
+    manifest.record(2, 'b', [])
+    assert not path.exists()
+    manifest.record(3, 'c', [])
+    assert set(json.loads(path.read_text())['pages']) == {'1', '2', '3'}
+    assert manifest.unsaved == 0
+
+
+def test_changed_settings_discard_results(tmp_path):
+    path = tmp_path / "scan_manifest.json"
+    manifest = ScanManifest(path, settings={'ocr_dpi': 200, 'vector': False})
+    manifest.record(1, 'a', [{'code': 'x'}])
+    manifest.save()
+    assert ScanManifest(path, settings={'ocr_dpi': 200, 'vector': False}).is_done(1, 'a')
+    assert not ScanManifest(path, settings={'ocr_dpi': 300, 'vector': False}).is_done(1, 'a')
@@ -0,0 +1,53 @@
+import fitz
+
+from text_layer import extract_block_code, extract_description, is_garbled
+
+CODE = ["def f(x):", "    if x:", "        return 1", "", "    return 0"]
+
+
+def _page(with_numbers=True, code=CODE):
+    doc = fitz.open()
+    page = doc.new_page()
+    y = 100
+    for number, line in enumerate(code, 1):
+        if with_numbers:
+            page.insert_text((60, y), str(number), fontname="cour", fontsize=10)
+        if line:
+            page.insert_text((90, y), line, fontname="cour", fontsize=10)
+        y += 14
+    page.insert_text((60, y + 20), "Line Description: f returns one", fontname="helv", fontsize=10)
+    page.insert_text((60, y + 40), "when x is truthy", fontname="helv", fontsize=10)
+    return doc, page, fitz.Rect(50, 85, 400, y)
+
+
+def test_indentation_is_rebuilt_and_line_number_column_removed():
+    doc, page, rect = _page()
+    result = extract_block_code(page, rect)
+    assert result['code'] == '\n'.join(CODE)
+    assert result['line_numbers'] == [1, 2, 3, 4, 5]
+    assert result['lines'][3] == (4, '')
+    doc.close()
+
+
+def test_code_without_line_numbers_keeps_its_text():
+    code = [line for line in CODE if line]
+    doc, page, rect = _page(with_numbers=False, code=code)
+    result = extract_block_code(page, rect)
+    assert result['code'] == '\n'.join(code)
+    assert result['line_numbers'] == []
+    doc.close()
+
+
+def test_description_starts_after_the_marker():
+    doc, page, rect = _page()
+    assert extract_description(page, rect) == "f returns one\nwhen x is truthy"
+    doc.close()
+
+
+def test_empty_or_unmapped_text_layer_falls_back_to_ocr():
+    doc = fitz.open()
+    page = doc.new_page()
+    assert extract_block_code(page, fitz.Rect(0, 0, 200, 200)) is None
+    assert is_garbled(" x")
+    assert not is_garbled("return 0")
+    doc.close()
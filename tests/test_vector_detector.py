@@ -0,0 +1,45 @@
+import fitz
+
+from vector_detector import find_gray_rects, is_scanned_page, merge_rects
+
+GRAY = (0.92, 0.92, 0.92)
+
+
+def _page():
+    doc = fitz.open()
+    return doc, doc.new_page()
+
+
+def test_gray_fills_are_found_in_page_coordinates():
+    doc, page = _page()
+    page.draw_rect(fitz.Rect(50, 100, 500, 260), color=None, fill=GRAY)
+    page.draw_rect(fitz.Rect(50, 300, 500, 400), color=None, fill=(0.92, 0.6, 0.6))  # 彩色
+    page.draw_rect(fitz.Rect(50, 420, 500, 500), color=None, fill=(0.5, 0.5, 0.5))  # 太深
+    page.draw_rect(fitz.Rect(50, 520, 90, 530), color=None, fill=GRAY)  # 太小
+
+    assert find_gray_rects(page) == [fitz.Rect(50, 100, 500, 260)]
+    doc.close()
+
+
+def test_split_backgrounds_are_merged():
+    doc, page = _page()
+    page.draw_rect(fitz.Rect(50, 100, 500, 180), color=None, fill=GRAY)
+    page.draw_rect(fitz.Rect(50, 180.5, 500, 260), color=None, fill=GRAY)
+
+    assert find_gray_rects(page) == [fitz.Rect(50, 100, 500, 260)]
+    assert len(merge_rects([fitz.Rect(0, 0, 10, 10), fitz.Rect(0, 20, 10, 30)])) == 2
+    doc.close()
+
+
+def test_only_image_pages_without_text_are_scanned():
+    doc, page = _page()
+    assert not is_scanned_page(page)
+
+    pix = fitz.Pixmap(fitz.csGRAY, fitz.IRect(0, 0, 20, 20), False)
+    pix.clear_with(200)
+    page.insert_image(fitz.Rect(0, 0, 200, 200), pixmap=pix)
+    assert is_scanned_page(page)
+
+    page.insert_text((50, 300), "print(1)")
+    assert not is_scanned_page(page)
+    doc.close()
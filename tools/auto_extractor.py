@@ -8,19 +8,34 @@ import os
 import json
 import cv2
 import numpy as np
+import fitz  # PyMuPDF
 from pathlib import Path
 from typing import List, Dict
+from concurrent.futures import ThreadPoolExecutor
+
+from image_buffer import load_gray
+from vector_detector import find_gray_rects, is_scanned_page
+from extraction_store import ExtractionStore, AUTO_EXTRACTOR
+from metrics import Metrics
 
 class AutoExtractor:
-    def __init__(self):
+    def __init__(self, pdf_path: str = None, zoom: float = 2,
+                 store: ExtractionStore = None, metrics: Metrics = None,
+                 output_dir: str = "examples"):
+        # 提供原始PDF時改由向量層取得區塊位置（截圖為 zoom 倍渲染）
+        self.pdf_path = pdf_path
+        self.metrics = metrics or Metrics(AUTO_EXTRACTOR)
+        self.zoom = zoom
+        self.store = store
+        self.source = str(Path(pdf_path).resolve()) if pdf_path else ''
+
         self.screenshots_dir = Path("extracted_codes")
-        self.output_dir = Path("examples")
-        self.output_dir.mkdir(exist_ok=True)
+        self.output_dir = Path(output_dir)
+        self.output_dir.mkdir(parents=True, exist_ok=True)
 
-    def identify_code_regions(self, image_path: Path) -> List[Dict]:
-        """識別圖片中的程式碼區域（灰色背景）"""
-        img = cv2.imread(str(image_path))
-        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    def identify_code_regions(self, image) -> List[Dict]:
+        """識別圖片中的程式碼區域（灰色背景），可傳入路徑、Pixmap或陣列"""
+        gray = load_gray(image)
 
         # 尋找灰色背景區域（程式碼通常在230-245的灰度值）
         mask = cv2.inRange(gray, 230, 245)
@@ -46,9 +61,36 @@ class AutoExtractor:
         code_regions.sort(key=lambda r: r['area'], reverse=True)
         return code_regions[:3]  # 最多3個區域
 
-    def extract_region(self, image_path: Path, region: Dict) -> str:
-        """提取特定區域並保存"""
-        img = cv2.imread(str(image_path))
+    def identify_code_regions_vector(self, page) -> List[Dict]:
+        """從PDF向量層讀取灰色矩形，換算成截圖像素座標；掃描頁回傳None"""
+        if is_scanned_page(page):
+            return None
+
+        code_regions = []
+        # 與點陣偵測相同的門檻：寬度>300、高度>100（截圖像素）
+        for rect in find_gray_rects(page, 300 / self.zoom, 100 / self.zoom):
+            x = round((rect.x0 - page.rect.x0) * self.zoom)
+            y = round((rect.y0 - page.rect.y0) * self.zoom)
+            w = round(rect.width * self.zoom)
+            h = round(rect.height * self.zoom)
+            code_regions.append({'x': x, 'y': y, 'w': w, 'h': h, 'area': w * h})
+
+        code_regions.sort(key=lambda r: r['area'], reverse=True)
+        return code_regions[:3]
+
+    def vector_regions(self) -> Dict[int, List[Dict]]:
+        """預先讀取所有頁面的向量區塊（fitz文件不跨執行緒共用）"""
+        doc = fitz.open(self.pdf_path)
+        with self.metrics.timer('detect'):
+            regions = {page_num + 1: self.identify_code_regions_vector(doc[page_num])
+                       for page_num in range(len(doc))}
+        doc.close()
+        return regions
+
+    def extract_region(self, image_path: Path, region: Dict, image: np.ndarray = None,
+                       writer: ThreadPoolExecutor = None) -> str:
+        """提取特定區域並保存（可傳入已解碼的圖片與背景寫檔執行緒池）"""
+        img = cv2.imread(str(image_path)) if image is None else image
         x, y, w, h = region['x'], region['y'], region['w'], region['h']
 
         # 提取區域
@@ -57,40 +99,92 @@ class AutoExtractor:
         # 保存區域圖片
         page_num = image_path.stem.split('_')[1]
         output_path = self.output_dir / f"code_p{page_num}_{x}_{y}.png"
-        cv2.imwrite(str(output_path), roi)
+        if writer is None:
+            with self.metrics.timer('io'):
+                cv2.imwrite(str(output_path), roi)
+        else:
+            writer.submit(self._timed_write, str(output_path), roi)
 
         return str(output_path)
 
-    def scan_all_screenshots(self):
-        """掃描所有截圖"""
-        screenshots = sorted(self.screenshots_dir.glob("page_*.png"))
+    def _timed_write(self, path: str, image: np.ndarray) -> bool:
+        with self.metrics.timer('io'):
+            return cv2.imwrite(path, image)
+
+    def scan_screenshot(self, screenshot: Path, writer: ThreadPoolExecutor = None,
+                        regions: List[Dict] = None) -> List[Dict]:
+        """處理單張截圖：只解碼一次，偵測與裁切共用同一個陣列
+
+        regions 已知時（向量層偵測）略過點陣偵測。
+        """
+        page_num = int(screenshot.stem.split('_')[1])
+        with self.metrics.timer('io'):
+            img = cv2.imread(str(screenshot))
+
+        # 識別程式碼區域
+        if regions is None:
+            with self.metrics.timer('detect'):
+                regions = self.identify_code_regions(img)
+        self.metrics.count('pages')
+        self.metrics.count('blocks', len(regions))
 
         results = []
-        for screenshot in screenshots:
-            page_num = int(screenshot.stem.split('_')[1])
+        for i, region in enumerate(regions):
+            # 提取並保存區域
+            code_path = self.extract_region(screenshot, region, img, writer)
 
-            # 識別程式碼區域
-            regions = self.identify_code_regions(screenshot)
+            results.append({
+                'page': page_num,
+                'region': i + 1,
+                'image': code_path,
+                'dimensions': f"{region['w']}x{region['h']}"
+            })
 
-            if regions:
-                print(f"📄 第 {page_num} 頁找到 {len(regions)} 個程式碼區塊")
+        return results
 
-                for i, region in enumerate(regions):
-                    # 提取並保存區域
-                    code_path = self.extract_region(screenshot, region)
+    def scan_all_screenshots(self, workers: int = 1):
+        """掃描所有截圖（workers > 1 時以執行緒池平行處理，OpenCV會釋放GIL）"""
+        screenshots = sorted(self.screenshots_dir.glob("page_*.png"))
+        known = self.vector_regions() if self.pdf_path else {}
+
+        def regions_for(screenshot: Path):
+            return known.get(int(screenshot.stem.split('_')[1]))
 
-                    results.append({
-                        'page': page_num,
-                        'region': i + 1,
-                        'image': code_path,
-                        'dimensions': f"{region['w']}x{region['h']}"
-                    })
+        results = []
+        if workers > 1:
+            # 離開時先等偵測完成，再等背景寫檔完成
+            with ThreadPoolExecutor(max_workers=workers) as writer, \
+                    ThreadPoolExecutor(max_workers=workers) as pool:
+                page_results = list(pool.map(
+                    lambda screenshot: self.scan_screenshot(screenshot, writer,
+                                                            regions_for(screenshot)),
+                    screenshots))
+        else:
+            page_results = [self.scan_screenshot(screenshot, regions=regions_for(screenshot))
+                            for screenshot in screenshots]
+
+        # 依頁碼順序彙整，輸出與逐張處理相同
+        for screenshot, regions in zip(screenshots, page_results):
+            if self.store:
+                page_num = int(screenshot.stem.split('_')[1])
+                self.store.replace_page_blocks(
+                    self.source, AUTO_EXTRACTOR, page_num,
+                    [(f"{page_num}:{region['region']}", region) for region in regions],
+                    'detected')
+            if regions:
+                print(f"📄 第 {regions[0]['page']} 頁找到 {len(regions)} 個程式碼區塊")
+                results.extend(regions)
 
         # 保存結果
-        with open(self.output_dir / "code_regions.json", 'w') as f:
-            json.dump(results, f, indent=2)
+        with self.metrics.timer('io'):
+            if self.store:
+                self.store.export_code_regions(self.source, self.output_dir / "code_regions.json")
+            else:
+                with open(self.output_dir / "code_regions.json", 'w') as f:
+                    json.dump(results, f, indent=2)
 
         print(f"\n✅ 完成！找到 {len(results)} 個程式碼區塊")
+        self.metrics.export(self.output_dir)
         return results
 
     def process_with_ocr(self, image_path: str) -> str:
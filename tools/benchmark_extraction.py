@@ -0,0 +1,302 @@
+#!/usr/bin/env python3
+"""
+提取流程效能基準
+以PyMuPDF產生合成教材（灰底程式碼、行號、Line Description表格、跨頁程式碼），
+計時各掃描器的每個階段，輸出可與前次結果比較的JSON報告；
+沒有tesseract時OCR階段以固定文字的替身執行，報告中標示為 mock
+
+用法：
+    python tools/benchmark_extraction.py --pages 40 --output bench.json
+    python tools/benchmark_extraction.py --compare bench.json
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import random
+import resource
+import argparse
+import platform
+import tempfile
+from pathlib import Path
+from typing import Dict, List
+import fitz  # PyMuPDF
+
+from pdf_scanner import PDFCodeScanner
+from smart_code_scanner import SmartCodeScanner
+from simple_scanner import SimpleScanner
+from auto_extractor import AutoExtractor
+from render_cache import RenderCache
+from line_number_detector import detect_line_numbers, ocr_line_numbers
+
+CODE_SNIPPETS = [
+    "import rhinoscriptsyntax as rs",
+    "pts = []",
+    "for i in range(x):",
+    "    if i < y:",
+    "        pt = rs.AddPoint(i, 0, 0)",
+    "        pts.append(pt)",
+    "    else:",
+    "        pt = rs.AddPoint(i, 10, 0)",
+    "crv = rs.AddInterpCurve(pts)",
+    "import Rhino.Geometry as rg",
+    "line = rg.Line(rg.Point3d(0, 0, 0), rg.Point3d(i, 5, 0))",
+    "def divide(curve, count):",
+    "    return rs.DivideCurve(curve, count)",
+    "a = pts",
+]
+
+PROSE = ("參數化設計透過程式描述幾何之間的關係，當輸入改變時，"
+         "整個模型會依規則自動更新。本節說明其背後的觀念與常見應用。")
+
+# 沒有tesseract時OCR階段的替身輸出（含行號與說明，清理步驟照常執行）
+MOCK_OCR_TEXT = ('\n'.join(f"{i + 1} {line}" for i, line in enumerate(CODE_SNIPPETS))
+                 + "\nLine Description\n1 說明")
+
+PAGE_WIDTH, PAGE_HEIGHT = 595, 842  # A4（點）
+MARGIN = 60
+LINE_HEIGHT = 15
+
+
+def _draw_code_block(page, top: float, first_line: int, lines: List[str]) -> float:
+    """繪製灰底、含行號的程式碼區塊，回傳區塊底部y座標"""
+    bottom = top + len(lines) * LINE_HEIGHT + 12
+    page.draw_rect(fitz.Rect(MARGIN, top, PAGE_WIDTH - MARGIN, bottom),
+                   color=None, fill=(0.93, 0.93, 0.93))
+    for i, line in enumerate(lines):
+        # 行號與程式碼畫成同一行文字，文字層的抽取結果與實際教材相同（"  1  import ..."）
+        page.insert_text((MARGIN + 6, top + 16 + i * LINE_HEIGHT),
+                         f"{first_line + i:>3}  {line}", fontsize=9, fontname="cour")
+    return bottom
+
+
+def _draw_description(page, top: float, line_count: int) -> float:
+    """繪製 Line Description 表格"""
+    page.insert_text((MARGIN, top + 14), "Line Description", fontsize=10, fontname="helv")
+    y = top + 30
+    for line_no in range(1, min(line_count, 5) + 1):
+        page.insert_text((MARGIN, y), f"{line_no}", fontsize=9, fontname="helv")
+        page.insert_text((MARGIN + 40, y), f"Explain statement on line {line_no}.",
+                         fontsize=9, fontname="helv")
+        y += LINE_HEIGHT
+    return y
+
+
+def generate_textbook(path: Path, pages: int = 40, seed: int = 0) -> Dict:
+    """產生合成教材PDF，回傳各類頁面的數量"""
+    rng = random.Random(seed)
+    doc = fitz.open()
+    layout = {'prose': 0, 'code': 0, 'cross_page': 0}
+
+    page_num = 0
+    while page_num < pages:
+        kind = rng.choice(['prose', 'prose', 'code', 'code', 'cross_page'])
+        if kind == 'cross_page' and page_num + 2 > pages:
+            kind = 'code'
+
+        if kind == 'prose':
+            page = doc.new_page(width=PAGE_WIDTH, height=PAGE_HEIGHT)
+            for i in range(20):
+                page.insert_text((MARGIN, MARGIN + i * 20), f"{i + 1}. {PROSE[:30]}",
+                                 fontsize=10, fontname="china-t")  # helv 沒有中文字形
+            page_num += 1
+
+        elif kind == 'code':
+            page = doc.new_page(width=PAGE_WIDTH, height=PAGE_HEIGHT)
+            lines = rng.sample(CODE_SNIPPETS, rng.randint(5, 12))
+            bottom = _draw_code_block(page, MARGIN + 40, 1, lines)
+            _draw_description(page, bottom + 20, len(lines))
+            page_num += 1
+
+        else:
+            # 程式碼從頁面底部延續到下一頁，行號連續
+            lines = [rng.choice(CODE_SNIPPETS) for _ in range(40)]
+            first = doc.new_page(width=PAGE_WIDTH, height=PAGE_HEIGHT)
+            split = (PAGE_HEIGHT - MARGIN - 400) // LINE_HEIGHT
+            _draw_code_block(first, 400, 1, lines[:split])
+            second = doc.new_page(width=PAGE_WIDTH, height=PAGE_HEIGHT)
+            bottom = _draw_code_block(second, MARGIN, split + 1, lines[split:])
+            _draw_description(second, bottom + 20, len(lines))
+            page_num += 2
+
+        layout[kind] += 1
+
+    doc.save(str(path))
+    doc.close()
+    return layout
+
+
+def _max_rss_so_far_mb() -> float:
+    """整個行程到目前為止的RSS高水位（MB）；不會因某階段結束而下降，不是單一階段的峰值"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS 回傳位元組，Linux 回傳KB
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+class MockOCRScanner(PDFCodeScanner):
+    """沒有tesseract時的替身：OCR直接回傳固定文字，只量截圖存檔、去重與清理的成本"""
+
+    def extract_code_with_dots(self, image_path: Path, image=None) -> str:
+        self.metrics.count('ocr_calls')
+        return MOCK_OCR_TEXT
+
+
+def _require_blocks(name: str, count: int):
+    """掃描器在合成教材上找不到區塊時，後續階段的計時沒有意義"""
+    if count <= 0:
+        raise RuntimeError(f"{name} 在合成教材上沒有找到程式碼區塊")
+    print(f"  ✅ {name}：{count} 個區塊")
+
+
+class StageTimer:
+    def __init__(self):
+        self.stages = {}
+
+    def run(self, name: str, func, pages: int = 0, count_blocks=None, **labels):
+        """執行並記錄一個階段：秒數、pages/s、blocks/s、累計RSS高水位（labels 一併寫入報告）
+
+        各階段共用掃描器與快取，在同一行程中依序執行；max_rss_so_far_mb 是到該階段結束為止
+        整個行程的最大RSS，只有比前一階段高時才表示這個階段創了新高。
+        """
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+
+        stage = {'seconds': round(elapsed, 4), 'max_rss_so_far_mb': _max_rss_so_far_mb(),
+                 **labels}
+        if pages:
+            stage['pages_per_s'] = round(pages / elapsed, 2) if elapsed else None
+        if count_blocks is not None:
+            blocks = count_blocks(result)
+            stage['blocks'] = blocks
+            stage['blocks_per_s'] = round(blocks / elapsed, 2) if elapsed else None
+        self.stages[name] = stage
+        print(f"  ⏱️ {name}: {stage['seconds']} 秒")
+        return result
+
+
+def run_benchmark(pages: int, workdir: Path, seed: int = 0) -> Dict:
+    """在獨立工作目錄中產生教材並計時所有階段（各掃描器使用相對路徑輸出）"""
+    workdir.mkdir(parents=True, exist_ok=True)
+    previous_cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        pdf_path = Path("synthetic_textbook.pdf")
+        layout = generate_textbook(pdf_path, pages, seed)
+        timer = StageTimer()
+        has_tesseract = shutil.which('tesseract') is not None
+
+        # 每次從空的渲染與OCR快取開始，量到的是實際成本
+        shutil.rmtree(".render_cache", ignore_errors=True)
+        shutil.rmtree(".ocr_cache", ignore_errors=True)
+        cache = RenderCache()
+
+        print("📐 PDFCodeScanner")
+        # 沒有tesseract時OCR階段以替身執行，報告中標示為 mock
+        ocr_engine = 'tesseract' if has_tesseract else 'mock'
+        scanner_class = PDFCodeScanner if has_tesseract else MockOCRScanner
+        scanner = scanner_class(str(pdf_path), render_cache=cache)
+        timer.run('pdf_scanner.triage', scanner.triage_pages, pages)
+        image_paths = timer.run('pdf_scanner.render', scanner.pdf_to_images, pages)
+        candidates = timer.run('pdf_scanner.detect',
+                               lambda: [scanner.find_candidate_blocks(p) for p in image_paths],
+                               pages, count_blocks=lambda r: sum(len(b) for b in r))
+        blocks = [b for page_blocks in candidates for b in page_blocks]
+        _require_blocks('PDFCodeScanner', len(blocks))
+        timer.run('pdf_scanner.line_number_projection',
+                  lambda: [detect_line_numbers(b['image']) for b in blocks],
+                  count_blocks=len)
+        if has_tesseract:
+            timer.run('pdf_scanner.line_number_ocr',
+                      lambda: [ocr_line_numbers(b['image']) for b in blocks],
+                      count_blocks=len)
+        raw_texts = ['\n'.join(f"{i + 1} {line}" for i, line in enumerate(CODE_SNIPPETS))
+                     + "\nLine Description\n1 說明"] * 200
+        timer.run('pdf_scanner.clean_code',
+                  lambda: [scanner.clean_code(text) for text in raw_texts],
+                  count_blocks=len)
+        # OCR＋清理（process_page 扣掉偵測）：截圖存檔、OCR、去重與清理
+        timer.run('pdf_scanner.ocr',
+                  lambda: [scanner.clean_blocks(page_num, scanner.ocr_blocks(page_num, page_blocks))
+                           for page_num, page_blocks in enumerate(candidates, 1) if page_blocks],
+                  count_blocks=lambda r: sum(len(b) for b in r), engine=ocr_engine)
+
+        print("🧠 SmartCodeScanner")
+        smart = SmartCodeScanner(str(pdf_path), render_cache=cache)
+        smart_blocks = timer.run('smart_scanner.analyze', smart.analyze_entire_pdf, pages,
+                                 count_blocks=len)
+        _require_blocks('SmartCodeScanner', len(smart_blocks))
+        timer.run('smart_scanner.report', smart.generate_report)
+
+        print("📷 SimpleScanner")
+        simple = SimpleScanner(str(pdf_path), render_cache=cache)
+        timer.run('simple_scanner.scan', simple.scan_pdf, pages)
+
+        print("✂️ AutoExtractor")
+        extractor = AutoExtractor()
+        regions = timer.run('auto_extractor.scan', extractor.scan_all_screenshots, pages,
+                            count_blocks=len)
+        _require_blocks('AutoExtractor', len(regions))
+
+        return {
+            'meta': {
+                'pages': pages,
+                'seed': seed,
+                'layout': layout,
+                'tesseract': has_tesseract,
+                'ocr_engine': ocr_engine,
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'pymupdf': fitz.VersionBind,
+                'timestamp': time.strftime('%Y-%m-%d %H:%M:%S'),
+            },
+            'stages': timer.stages,
+        }
+    finally:
+        os.chdir(previous_cwd)
+
+
+def compare_reports(current: Dict, baseline: Dict, threshold: float = 0.10) -> List[str]:
+    """逐階段比較耗時，回傳變慢超過門檻的階段"""
+    regressions = []
+    print(f"\n📊 與基準比較（門檻 {threshold:.0%}）")
+    for name, stage in current['stages'].items():
+        old = baseline.get('stages', {}).get(name)
+        if not old or not old['seconds']:
+            print(f"  {name}: 新階段")
+            continue
+        ratio = stage['seconds'] / old['seconds']
+        mark = '🔴' if ratio > 1 + threshold else ('🟢' if ratio < 1 - threshold else '⚪')
+        print(f"  {mark} {name}: {old['seconds']} → {stage['seconds']} 秒（x{ratio:.2f}）")
+        if ratio > 1 + threshold:
+            regressions.append(name)
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="提取流程效能基準")
+    parser.add_argument('--pages', type=int, default=40, help="合成教材頁數")
+    parser.add_argument('--seed', type=int, default=0, help="版面亂數種子")
+    parser.add_argument('--output', default="benchmark_report.json", help="報告輸出路徑")
+    parser.add_argument('--compare', help="與先前的報告比較")
+    parser.add_argument('--threshold', type=float, default=0.10, help="視為退步的變慢比例")
+    parser.add_argument('--workdir', help="工作目錄（預設為暫存目錄）")
+    args = parser.parse_args()
+
+    workdir = Path(args.workdir) if args.workdir else Path(tempfile.mkdtemp(prefix="gh_bench_"))
+    print(f"🏁 合成教材 {args.pages} 頁，工作目錄：{workdir}")
+    report = run_benchmark(args.pages, workdir, args.seed)
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"\n📄 報告已保存至：{args.output}")
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare_reports(report, baseline, args.threshold)
+        if regressions:
+            print(f"\n⚠️ 退步的階段：{', '.join(regressions)}")
+            sys.exit(1)
@@ -0,0 +1,329 @@
+#!/usr/bin/env python3
+"""
+程式碼全文索引
+以三字元組（trigram）建立持久化的SQLite索引，涵蓋提取出的程式碼、
+Line Description 說明與整理好的範例檔；子字串與識別字查詢只需讀取
+少數倒排清單，回傳頁碼與區塊參照，內容改變時只更新該筆文件
+
+用法：
+    python tools/code_index.py build --store extraction.db
+    python tools/code_index.py query CreateInterpolatedCurve --identifier
+    python tools/code_index.py query 內插曲線
+"""
+
+import re
+import json
+import time
+import sqlite3
+import hashlib
+import argparse
+from pathlib import Path
+from typing import Dict, Iterable, List
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS docs (
+    id       INTEGER PRIMARY KEY,
+    ref      TEXT NOT NULL UNIQUE,
+    kind     TEXT NOT NULL,
+    path     TEXT,
+    page     INTEGER,
+    block    TEXT,
+    content  TEXT NOT NULL,
+    hash     TEXT NOT NULL,
+    mtime    REAL
+);
+CREATE TABLE IF NOT EXISTS trigrams (
+    tri    TEXT NOT NULL,
+    doc_id INTEGER NOT NULL,
+    PRIMARY KEY (tri, doc_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_trigrams_doc ON trigrams (doc_id);
+CREATE INDEX IF NOT EXISTS idx_docs_path ON docs (path);
+"""
+
+# 預設索引的資料夾（相對於專案根目錄）
+DEFAULT_DIRS = ['test_extractions', 'core_examples', 'examples', 'extracted_codes']
+
+_PAGE_IN_NAME = re.compile(r'_p(\d+)')
+
+
+def trigrams(text: str) -> set:
+    """小寫後的所有三字元組（中文同樣以字元計）"""
+    text = text.lower()
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def _hash(content: str) -> str:
+    return hashlib.blake2b(content.encode('utf-8'), digest_size=16).hexdigest()
+
+
+class CodeIndex:
+    def __init__(self, path: str = "code_index.db"):
+        self.path = Path(path)
+        self.conn = sqlite3.connect(str(self.path))
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        self.added = 0
+        self.updated = 0
+        self.unchanged = 0
+
+    def close(self):
+        self.conn.commit()
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # ---- 寫入 ----
+
+    def add_document(self, ref: str, kind: str, content: str, path: str = None,
+                     page: int = None, block: str = None, mtime: float = None,
+                     commit: bool = True) -> bool:
+        """新增或更新一筆文件；內容沒變時不動索引，回傳是否有寫入"""
+        digest = _hash(content)
+        row = self.conn.execute("SELECT id, hash FROM docs WHERE ref = ?", (ref,)).fetchone()
+        if row and row['hash'] == digest:
+            if mtime is not None:
+                self.conn.execute("UPDATE docs SET mtime = ? WHERE id = ?", (mtime, row['id']))
+            self.unchanged += 1
+            return False
+
+        if row:
+            doc_id = row['id']
+            self.conn.execute("DELETE FROM trigrams WHERE doc_id = ?", (doc_id,))
+            self.conn.execute(
+                "UPDATE docs SET kind = ?, path = ?, page = ?, block = ?, content = ?, "
+                "hash = ?, mtime = ? WHERE id = ?",
+                (kind, path, page, block, content, digest, mtime, doc_id))
+            self.updated += 1
+        else:
+            doc_id = self.conn.execute(
+                "INSERT INTO docs (ref, kind, path, page, block, content, hash, mtime) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (ref, kind, path, page, block, content, digest, mtime)).lastrowid
+            self.added += 1
+
+        self.conn.executemany("INSERT INTO trigrams (tri, doc_id) VALUES (?, ?)",
+                              [(tri, doc_id) for tri in trigrams(content)])
+        if commit:
+            self.conn.commit()
+        return True
+
+    def remove(self, refs: Iterable[str]):
+        """移除文件與其三字元組"""
+        with self.conn:
+            for ref in refs:
+                row = self.conn.execute("SELECT id FROM docs WHERE ref = ?", (ref,)).fetchone()
+                if row:
+                    self.conn.execute("DELETE FROM trigrams WHERE doc_id = ?", (row['id'],))
+                    self.conn.execute("DELETE FROM docs WHERE id = ?", (row['id'],))
+
+    def add_block(self, prefix: str, page: int, block_key: str, block: Dict,
+                  path: str = None, commit: bool = True):
+        """索引一個提取出的區塊：程式碼與說明各為一筆文件"""
+        code = block.get('code') or '\n'.join(block.get('code_lines', []))
+        description = block.get('description') or ''
+        screenshot = path or block.get('screenshot') or block.get('image')
+        for kind, content in (('code', code), ('description', description)):
+            ref = f"{prefix}:{block_key}:{kind}"
+            if content.strip():
+                self.add_document(ref, kind, content, screenshot, page, block_key,
+                                  commit=False)
+            else:
+                self.remove([ref])
+        if commit:
+            self.conn.commit()
+
+    def add_page_blocks(self, prefix: str, page: int, blocks: List[Dict]):
+        """掃描器每完成一頁就呼叫，以該頁結果更新索引"""
+        for block in blocks:
+            self.add_block(prefix, page, f"{page}:{block.get('block', block.get('region', 1))}",
+                           block, commit=False)
+        self.conn.commit()
+
+    def sync_store(self, store) -> Dict:
+        """從 ExtractionStore 增量同步所有區塊，並移除資料庫中已刪除的區塊
+
+        參照格式與掃描器逐頁寫入的相同（工具:來源:區塊），
+        因此掃描時已索引過的區塊在同步時不會重複寫入。
+        """
+        seen = set()
+        for row in store.conn.execute("SELECT * FROM blocks"):
+            prefix = f"{row['tool']}:{row['source']}"
+            self.add_block(prefix, row['first_page'], row['block_key'],
+                           json.loads(row['data']), row['screenshot'], commit=False)
+            seen.update(f"{prefix}:{row['block_key']}:{kind}" for kind in ('code', 'description'))
+        self.conn.commit()
+
+        stale = [row['ref'] for row in self.conn.execute(
+            "SELECT ref FROM docs WHERE ref NOT LIKE 'file:%'") if row['ref'] not in seen]
+        self.remove(stale)
+        return self.stats()
+
+    def sync_files(self, roots: Iterable[str]) -> Dict:
+        """增量索引資料夾中的 .py、README.md 與含程式碼的 JSON；修改時間未變的檔案略過"""
+        seen_paths = set()
+        for root in map(Path, roots):
+            if not root.exists():
+                continue
+            for path in sorted(root.rglob('*')):
+                if path.suffix not in ('.py', '.md', '.json') or not path.is_file():
+                    continue
+                seen_paths.add(str(path))
+                mtime = path.stat().st_mtime
+                row = self.conn.execute("SELECT MAX(mtime) AS mtime FROM docs WHERE path = ?",
+                                        (str(path),)).fetchone()
+                if row['mtime'] == mtime:
+                    self.unchanged += 1
+                    continue
+                self._index_file(path, mtime)
+        self.conn.commit()
+
+        stale = [row['ref'] for row in self.conn.execute(
+            "SELECT ref, path FROM docs WHERE ref LIKE 'file:%'")
+            if row['path'] not in seen_paths]
+        self.remove(stale)
+        return self.stats()
+
+    def _index_file(self, path: Path, mtime: float):
+        text = path.read_text(encoding='utf-8', errors='replace')
+        match = _PAGE_IN_NAME.search(path.stem)
+        page = int(match.group(1)) if match else None
+
+        if path.suffix == '.py':
+            self.add_document(f"file:{path}", 'code', text, str(path), page,
+                              mtime=mtime, commit=False)
+        elif path.suffix == '.md':
+            self.add_document(f"file:{path}", 'description', text, str(path), page,
+                              mtime=mtime, commit=False)
+        else:
+            # 只索引提取結果格式的JSON（區塊清單，含 code 或 code_lines）
+            try:
+                entries = json.loads(text)
+            except ValueError:
+                return
+            if not isinstance(entries, list):
+                entries = []
+            marker = f"file:{path}:#"
+            current = {marker}
+            for i, entry in enumerate(entries):
+                if isinstance(entry, dict) and ('code' in entry or 'code_lines' in entry):
+                    block_key = f"{entry.get('page', 0)}:{entry.get('block', i + 1)}"
+                    self.add_block(f"file:{path}", entry.get('page'), block_key, entry,
+                                   str(path), commit=False)
+                    current.update(f"file:{path}:{block_key}:{kind}"
+                                   for kind in ('code', 'description'))
+            # 記下修改時間（沒有區塊的JSON下次也不必重新解析），並移除檔案中已不存在的區塊
+            self.add_document(marker, 'meta', '', str(path), mtime=mtime, commit=False)
+            stale = [row['ref'] for row in self.conn.execute(
+                "SELECT ref FROM docs WHERE path = ?", (str(path),))
+                if row['ref'] not in current]
+            self.remove(stale)
+
+    # ---- 查詢 ----
+
+    def search(self, query: str, identifier: bool = False, kind: str = None,
+               limit: int = 50) -> List[Dict]:
+        """子字串查詢（不分大小寫）；identifier=True 時比對完整且大小寫相同的識別字
+
+        三字元組索引一律小寫，只用來篩選候選文件；識別字模式再以原始大小寫驗證，
+        因此查詢 Curve 不會命中 curve 或 CURVE。
+
+        回傳每個符合位置的參照：ref、kind、path、page、block、行號與該行內容。
+        """
+        needle = query.lower()
+        grams = trigrams(needle)
+        if grams:
+            # 三字元組倒排清單取交集，再以實際內容驗證
+            marks = ','.join('?' * len(grams))
+            sql = (f"SELECT d.* FROM docs d JOIN ("
+                   f"  SELECT doc_id FROM trigrams WHERE tri IN ({marks})"
+                   f"  GROUP BY doc_id HAVING COUNT(*) = ?) t ON t.doc_id = d.id")
+            params = [*grams, len(grams)]
+        else:
+            # 少於三個字元無法用索引，直接掃描內容
+            sql = "SELECT * FROM docs d WHERE instr(lower(d.content), ?) > 0"
+            params = [needle]
+        if kind:
+            sql += " WHERE d.kind = ?" if grams else " AND d.kind = ?"
+            params.append(kind)
+        sql += " ORDER BY d.page IS NULL, d.page, d.ref"
+
+        pattern = None
+        if identifier:
+            pattern = re.compile(r'(?<![A-Za-z0-9_])' + re.escape(query) + r'(?![A-Za-z0-9_])')
+
+        hits = []
+        for row in self.conn.execute(sql, params):
+            for line_no, line in enumerate(row['content'].split('\n'), 1):
+                if pattern:
+                    if not pattern.search(line):
+                        continue
+                elif needle not in line.lower():
+                    continue
+                hits.append({
+                    'ref': row['ref'],
+                    'kind': row['kind'],
+                    'path': row['path'],
+                    'page': row['page'],
+                    'block': row['block'],
+                    'line': line_no,
+                    'text': line.strip()
+                })
+                if len(hits) >= limit:
+                    return hits
+        return hits
+
+    def stats(self) -> Dict:
+        docs = self.conn.execute("SELECT COUNT(*) FROM docs").fetchone()[0]
+        grams = self.conn.execute("SELECT COUNT(*) FROM trigrams").fetchone()[0]
+        return {
+            'documents': docs,
+            'trigrams': grams,
+            'added': self.added,
+            'updated': self.updated,
+            'unchanged': self.unchanged
+        }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="程式碼全文索引")
+    parser.add_argument('--index', default="code_index.db", help="索引檔路徑")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    build = commands.add_parser('build', help="建立或增量更新索引")
+    build.add_argument('dirs', nargs='*', default=DEFAULT_DIRS, help="要索引的資料夾")
+    build.add_argument('--store', help="同步 ExtractionStore 資料庫中的區塊")
+
+    search = commands.add_parser('query', help="查詢子字串或識別字")
+    search.add_argument('text', help="查詢字串")
+    search.add_argument('--identifier', action='store_true', help="只比對完整識別字")
+    search.add_argument('--kind', choices=['code', 'description'], help="只查程式碼或說明")
+    search.add_argument('--limit', type=int, default=50)
+    args = parser.parse_args()
+
+    with CodeIndex(args.index) as index:
+        if args.command == 'build':
+            start = time.perf_counter()
+            index.sync_files(args.dirs)
+            if args.store:
+                from extraction_store import ExtractionStore
+                with ExtractionStore(args.store) as store:
+                    index.sync_store(store)
+            stats = index.stats()
+            print(f"✅ 索引完成（{time.perf_counter() - start:.2f} 秒）：{stats['documents']} 筆文件，"
+                  f"新增 {stats['added']}、更新 {stats['updated']}、未變 {stats['unchanged']}")
+        else:
+            start = time.perf_counter()
+            hits = index.search(args.text, args.identifier, args.kind, args.limit)
+            elapsed = (time.perf_counter() - start) * 1000
+            for hit in hits:
+                page = f"第 {hit['page']} 頁" if hit['page'] else "—"
+                block = f" 區塊 {hit['block']}" if hit['block'] else ""
+                print(f"  {page}{block}  {hit['path']}:{hit['line']}  {hit['text'][:80]}")
+            print(f"🔎 {len(hits)} 筆結果（{elapsed:.1f} 毫秒）")
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+串流跨頁合併
+掃描進行中逐頁接收程式碼區塊，以行號連續性與區塊在頁面上的位置
+判斷是否接續上一頁，可串接任意長度的跨頁程式碼，單次線性處理
+"""
+
+import re
+from typing import Dict, List
+
+LINE_NO = re.compile(r'^\s*(\d+)')
+
+
+def line_number_range(code_lines: List[str]):
+    """程式碼行的第一個與最後一個行號，無法解析時為None"""
+    numbers = [int(m.group(1)) for m in map(LINE_NO.match, code_lines) if m]
+    if not numbers:
+        return None, None
+    return numbers[0], numbers[-1]
+
+
+class StreamingCodeMerger:
+    def __init__(self, bottom_ratio: float = 0.75, top_ratio: float = 0.25):
+        # 上一頁區塊需延伸到頁面下方，或下一頁區塊從頁面上方開始
+        self.bottom_ratio = bottom_ratio
+        self.top_ratio = top_ratio
+        self.chain: List[Dict] = []
+
+    def continues(self, prev: Dict, block: Dict) -> bool:
+        """block 是否為 prev 的下一頁延續"""
+        if block['page'] != prev['page'] + 1:
+            return False
+
+        prev_last = prev.get('last_line_no')
+        next_first = block.get('first_line_no')
+        if prev_last is None or next_first is None:
+            # 沒有行號可比對時沿用舊的頁底判斷
+            return bool(prev.get('is_continued'))
+        if next_first != prev_last + 1:
+            return False
+
+        prev_bottom = prev.get('bottom_ratio')
+        next_top = block.get('top_ratio')
+        if prev_bottom is None and next_top is None:
+            return True
+        return ((prev_bottom is not None and prev_bottom >= self.bottom_ratio) or
+                (next_top is not None and next_top <= self.top_ratio))
+
+    def feed(self, block: Dict) -> List[Dict]:
+        """加入一頁的區塊，回傳因此確定完成的區塊（可能為空）"""
+        if self.chain and self.continues(self.chain[-1], block):
+            self.chain.append(block)
+            return []
+
+        finished = self.close()
+        self.chain = [block]
+        return finished
+
+    def close(self) -> List[Dict]:
+        """結束目前的串接並回傳結果"""
+        if not self.chain:
+            return []
+        chain, self.chain = self.chain, []
+        if len(chain) == 1:
+            return chain
+        return [self._merge(chain)]
+
+    @staticmethod
+    def _merge(chain: List[Dict]) -> Dict:
+        """合併跨頁區塊，格式與 merge_continued_code 相同"""
+        descriptions = [b['description'] for b in chain if b.get('description')]
+        return {
+            'pages': [b['page'] for b in chain],
+            'screenshots': [b['screenshot'] for b in chain],
+            'code_lines': [line for b in chain for line in b['code_lines']],
+            'description': '\n'.join(descriptions),
+            'is_merged': True,
+            'line_count': sum(b['line_count'] for b in chain),
+            'has_description': any(b.get('has_description') for b in chain),
+            'first_line_no': chain[0].get('first_line_no'),
+            'last_line_no': chain[-1].get('last_line_no'),
+        }
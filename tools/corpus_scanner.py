@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+"""
+多文件語料掃描
+接受目錄或PDF清單，把每一頁當成工作排進行程池：
+先比優先權，同優先權時剩餘頁數少的文件先送（小文件不必排在大文件後面），
+每份文件的結果存在各自的輸出目錄，最後列出每份文件的處理速度
+
+用法：
+    python tools/corpus_scanner.py ../course_pdfs --workers 4
+    python tools/corpus_scanner.py a.pdf b.pdf --priority a.pdf=5 --vector
+"""
+
+import json
+import time
+import heapq
+import argparse
+from pathlib import Path
+from typing import Dict, List, Tuple
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+import fitz  # PyMuPDF
+
+from pdf_scanner import PDFCodeScanner
+from extraction_store import legacy_block
+
+# 每個工作行程對同一份PDF只建立一次掃描器
+_SCANNERS: Dict[str, PDFCodeScanner] = {}
+
+
+def _scan_page(pdf_path: str, page_index: int, doc_dir: str,
+               options: Dict) -> Tuple[float, List[Dict], List[Dict]]:
+    """在工作行程中處理單頁，回傳 (耗時, 程式碼區塊, 分流略過紀錄)"""
+    start = time.perf_counter()
+    scanner = _SCANNERS.get(pdf_path)
+    if scanner is None:
+        scanner = PDFCodeScanner(pdf_path,
+                                 output_dir=str(Path(doc_dir) / "extracted_codes"),
+                                 screenshots_dir=str(Path(doc_dir) / "screenshots"))
+        _SCANNERS[pdf_path] = scanner
+
+    results = []
+    try:
+        for _, page_results in scanner.iter_scan(queue_size=1, pages=[page_index], **options):
+            results.extend(page_results)
+    except Exception as exc:
+        # 有些例外（如 TesseractNotFoundError）無法在主行程還原，會讓整個行程池失效；
+        # 一律轉成只帶訊息的 RuntimeError 傳回
+        raise RuntimeError(f"{type(exc).__name__}: {exc}") from None
+    return time.perf_counter() - start, results, scanner.skipped_pages
+
+
+def find_pdfs(sources: List[str]) -> List[Path]:
+    """展開目錄與檔案清單為PDF路徑（依檔名排序、去除重複）"""
+    pdfs = []
+    for source in map(Path, sources):
+        if source.is_dir():
+            pdfs.extend(sorted(source.glob("*.pdf")))
+        elif source.suffix.lower() == '.pdf':
+            pdfs.append(source)
+    return list(dict.fromkeys(pdf.resolve() for pdf in pdfs))
+
+
+class CorpusScanner:
+    def __init__(self, pdf_paths: List, output_root: str = "corpus_output",
+                 priorities: Dict[str, int] = None, workers: int = 4):
+        self.output_root = Path(output_root)
+        self.output_root.mkdir(parents=True, exist_ok=True)
+        self.workers = workers
+        priorities = priorities or {}
+
+        self.documents = []
+        used_names = set()
+        for pdf_path in map(Path, pdf_paths):
+            # 打不開的文件記為失敗，不影響其他文件
+            error = None
+            try:
+                with fitz.open(str(pdf_path)) as doc:
+                    page_count = len(doc)
+            except Exception as exc:
+                page_count, error = 0, f"{type(exc).__name__}: {exc}"
+                print(f"⚠️ 無法開啟 {pdf_path}：{error}")
+
+            # 同名文件加上序號，避免輸出目錄互相覆蓋
+            name = pdf_path.stem
+            suffix = 2
+            while name in used_names:
+                name = f"{pdf_path.stem}_{suffix}"
+                suffix += 1
+            used_names.add(name)
+
+            self.documents.append({
+                'name': name,
+                'path': str(pdf_path),
+                'dir': str(self.output_root / name),
+                'pages': page_count,
+                # 優先權可用檔名、主檔名或完整路徑指定，數字越大越先處理
+                'priority': priorities.get(pdf_path.name,
+                                           priorities.get(pdf_path.stem,
+                                                          priorities.get(str(pdf_path), 0))),
+                'error': error,
+            })
+
+    def schedule(self) -> List[List]:
+        """建立排程堆積：(-優先權, 剩餘頁數, 文件序號, 下一頁)"""
+        heap = [[-doc['priority'], doc['pages'], index, 0]
+                for index, doc in enumerate(self.documents) if doc['pages']]
+        heapq.heapify(heap)
+        return heap
+
+    def run(self, triage: bool = True, vector: bool = False,
+            strip_bytes: int = None, detect_dpi: int = None) -> Dict:
+        """排程並執行所有頁面，回傳每份文件的統計"""
+        options = {'triage': triage, 'vector': vector, 'strip_bytes': strip_bytes,
+                   'detect_dpi': detect_dpi}
+        heap = self.schedule()
+        total_pages = sum(doc['pages'] for doc in self.documents)
+        print(f"📚 語料掃描：{len(self.documents)} 份文件，共 {total_pages} 頁，"
+              f"{self.workers} 個工作行程")
+
+        results = {index: {} for index in range(len(self.documents))}
+        stats = {index: {'started': None, 'finished': None, 'busy': 0.0, 'skipped': [],
+                         'failed': []}
+                 for index in range(len(self.documents))}
+        start = time.perf_counter()
+
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            running = {}
+
+            def submit_next():
+                # 取出目前最該處理的文件，送出它的下一頁後放回堆積
+                priority, remaining, index, page_index = heapq.heappop(heap)
+                doc = self.documents[index]
+                future = pool.submit(_scan_page, doc['path'], page_index, doc['dir'], options)
+                running[future] = (index, page_index)
+                if stats[index]['started'] is None:
+                    stats[index]['started'] = time.perf_counter() - start
+                if remaining > 1:
+                    heapq.heappush(heap, [priority, remaining - 1, index, page_index + 1])
+
+            # 送出的工作只比行程數多一些，新到的小文件才插得進來
+            while heap and len(running) < self.workers * 2:
+                submit_next()
+
+            while running:
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    index, page_index = running.pop(future)
+                    try:
+                        elapsed, page_results, skipped = future.result()
+                    except Exception as exc:
+                        # 單頁失敗（損壞的頁面、OCR例外）只記錄在該文件，其他頁面與文件繼續
+                        error = str(exc) or type(exc).__name__
+                        print(f"  ⚠️ {self.documents[index]['name']} "
+                              f"第 {page_index + 1} 頁失敗：{error}")
+                        stats[index]['failed'].append({'page': page_index + 1, 'error': error})
+                        elapsed, page_results, skipped = 0.0, [], []
+                    results[index][page_index] = page_results
+                    stats[index]['busy'] += elapsed
+                    stats[index]['skipped'].extend(skipped)
+                    if len(results[index]) == self.documents[index]['pages']:
+                        stats[index]['finished'] = time.perf_counter() - start
+                        self._save_document(index, results[index], stats[index])
+                    if heap:
+                        submit_next()
+
+        summary = self._summarize(stats, time.perf_counter() - start)
+        with open(self.output_root / "corpus_summary.json", 'w', encoding='utf-8') as f:
+            json.dump(summary, f, indent=2, ensure_ascii=False)
+        return summary
+
+    def _save_document(self, index: int, page_results: Dict, stats: Dict):
+        """文件所有頁面完成後，寫入該文件命名空間下的結果"""
+        doc = self.documents[index]
+        codes = [code for page_index in sorted(page_results)
+                 for code in page_results[page_index]]
+        doc['codes'] = len(codes)
+
+        output_file = Path(doc['dir']) / "extracted_codes" / "extracted_codes.json"
+        output_file.parent.mkdir(parents=True, exist_ok=True)
+        with open(output_file, 'w', encoding='utf-8') as f:
+            json.dump([legacy_block(code) for code in codes], f, indent=2, ensure_ascii=False)
+        mark = '⚠️' if stats['failed'] else '✅'
+        print(f"  {mark} {doc['name']}：{doc['pages']} 頁，{len(codes)} 個程式碼區塊，"
+              f"{stats['finished']:.1f} 秒完成"
+              + (f"，{len(stats['failed'])} 頁失敗" if stats['failed'] else ''))
+
+    def _summarize(self, stats: Dict, wall_time: float) -> Dict:
+        """每份文件的處理速度與整體統計"""
+        documents = []
+        print(f"\n📊 每份文件的處理速度：")
+        for index, doc in enumerate(self.documents):
+            doc_stats = stats[index]
+            finished = doc_stats['finished'] or 0.0
+            started = doc_stats['started'] or 0.0
+            span = finished - started
+            entry = {
+                'name': doc['name'],
+                'path': doc['path'],
+                'priority': doc['priority'],
+                'pages': doc['pages'],
+                'codes': doc.get('codes', 0),
+                'skipped_pages': len(doc_stats['skipped']),
+                'started_s': round(started, 3),
+                'finished_s': round(finished, 3),
+                'busy_s': round(doc_stats['busy'], 3),
+                'pages_per_s': round(doc['pages'] / span, 2) if span > 0 else None,
+                'status': 'failed' if doc['error'] or doc_stats['failed'] else 'done',
+                'error': doc['error'],
+                'failed_pages': doc_stats['failed'],
+            }
+            documents.append(entry)
+            print(f"  {entry['name']}（優先權 {entry['priority']}）：{entry['pages']} 頁，"
+                  f"{entry['codes']} 個區塊，{entry['finished_s']} 秒完成，"
+                  f"{entry['pages_per_s']} 頁/秒")
+
+        total_pages = sum(doc['pages'] for doc in self.documents)
+        print(f"  合計：{total_pages} 頁，{wall_time:.1f} 秒，"
+              f"{total_pages / wall_time if wall_time else 0:.2f} 頁/秒")
+        failed = [entry['name'] for entry in documents if entry['status'] == 'failed']
+        if failed:
+            print(f"  ⚠️ 失敗的文件：{', '.join(failed)}")
+        return {
+            'workers': self.workers,
+            'wall_time_s': round(wall_time, 3),
+            'total_pages': total_pages,
+            'pages_per_s': round(total_pages / wall_time, 2) if wall_time else None,
+            'failed_documents': failed,
+            'documents': documents
+        }
+
+
+def _parse_priorities(items: List[str]) -> Dict[str, int]:
+    priorities = {}
+    for item in items or []:
+        name, _, value = item.rpartition('=')
+        priorities[name] = int(value)
+    return priorities
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="多文件語料掃描")
+    parser.add_argument('sources', nargs='+', help="PDF檔案或包含PDF的目錄")
+    parser.add_argument('--workers', type=int, default=4, help="工作行程數")
+    parser.add_argument('--output', default="corpus_output", help="輸出根目錄")
+    parser.add_argument('--priority', action='append', metavar='NAME=N',
+                        help="文件優先權（數字越大越先處理），可重複指定")
+    parser.add_argument('--no-triage', action='store_true', help="不使用文字層分流")
+    parser.add_argument('--vector', action='store_true', help="從向量層偵測程式碼區塊")
+    parser.add_argument('--detect-dpi', type=int, metavar='DPI',
+                        help="以此低DPI偵測，只把程式碼區塊以高DPI重新渲染")
+    args = parser.parse_args()
+
+    pdfs = find_pdfs(args.sources)
+    if not pdfs:
+        print("❌ 找不到PDF檔案")
+        raise SystemExit(1)
+
+    corpus = CorpusScanner(pdfs, args.output, _parse_priorities(args.priority), args.workers)
+    corpus.run(triage=not args.no_triage, vector=args.vector, detect_dpi=args.detect_dpi)
@@ -10,11 +10,15 @@ import subprocess
 from pathlib import Path
 from typing import List, Dict, Tuple
 
+from line_classifier import LineKind, classify_line, strip_line_number
+from ocr_correction import OCRCorrector
+
 class CodeExtractor:
     def __init__(self, pdf_path: str, output_dir: str = "examples"):
         self.pdf_path = pdf_path
         self.output_dir = Path(output_dir)
         self.output_dir.mkdir(exist_ok=True)
+        self.corrector = OCRCorrector()
 
     def split_pdf(self) -> List[str]:
         """分割PDF為單頁"""
@@ -46,14 +50,7 @@ class CodeExtractor:
         # 特徵1：有行號（1, 2, 3...）
         # 特徵2：包含Python關鍵字（import, for, if, def）
         # 特徵3：縮排結構
-
-        patterns = [
-            r'^\d+\s+import\s+',  # import語句
-            r'^\d+\s+for\s+\w+\s+in\s+',  # for迴圈
-            r'^\d+\s+if\s+',  # if條件
-            r'^\d+\s+def\s+',  # 函數定義
-            r'^\d+\s+class\s+',  # 類別定義
-        ]
+        # 樣式由共用的 line_classifier 預先編譯
 
         lines = text.split('\n')
         code_start = None
@@ -61,8 +58,9 @@ class CodeExtractor:
 
         for i, line in enumerate(lines):
             # 檢查是否為程式碼行
-            is_code = any(re.match(pattern, line.strip()) for pattern in patterns)
-            has_line_number = re.match(r'^\d+\s+', line.strip())
+            kind = classify_line(line.strip())
+            is_code = kind & LineKind.CODE_STATEMENT
+            has_line_number = kind & LineKind.NUMBERED
 
             if has_line_number or is_code:
                 if code_start is None:
@@ -87,15 +85,11 @@ class CodeExtractor:
 
         for line in lines:
             # 移除行號（如：1, 2, 3...）
-            line = re.sub(r'^\d+\s+', '', line)
-            # 修正常見OCR錯誤
-            line = line.replace('．', '.')
-            line = line.replace('，', ',')
-            line = line.replace('（', '(')
-            line = line.replace('）', ')')
+            line = strip_line_number(line)
             cleaned.append(line)
 
-        return '\n'.join(cleaned)
+        # 修正常見OCR錯誤（全形標點、l/1、O/0、漏掉的冒號），以解析器驗證
+        return self.corrector.correct_code('\n'.join(cleaned))
 
     def save_example(self, code: str, example_num: int, description: str = ""):
         """儲存範例程式碼"""
@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""
+提取結果資料庫
+以單一SQLite檔記錄頁面、程式碼區塊、OCR文字、說明與截圖，
+逐筆 upsert 取代每次整份重寫JSON；依頁碼範圍、章節、狀態都有索引，
+並可匯出既有的 extracted_codes.json、code_analysis_report.json、
+ocr_tasks.json、code_regions.json 以保持相容
+"""
+
+import json
+import time
+import sqlite3
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS pages (
+    source      TEXT NOT NULL,
+    page        INTEGER NOT NULL,
+    chapter     TEXT,
+    status      TEXT NOT NULL,
+    reason      TEXT,
+    fingerprint TEXT,
+    screenshot  TEXT,
+    updated_at  REAL NOT NULL,
+    PRIMARY KEY (source, page)
+);
+CREATE TABLE IF NOT EXISTS blocks (
+    id              INTEGER PRIMARY KEY,
+    source          TEXT NOT NULL,
+    tool            TEXT NOT NULL,
+    block_key       TEXT NOT NULL,
+    first_page      INTEGER NOT NULL,
+    last_page       INTEGER NOT NULL,
+    chapter         TEXT,
+    status          TEXT NOT NULL,
+    line_count      INTEGER,
+    has_description INTEGER NOT NULL DEFAULT 0,
+    is_merged       INTEGER NOT NULL DEFAULT 0,
+    screenshot      TEXT,
+    ocr_text        TEXT,
+    code            TEXT,
+    description     TEXT,
+    data            TEXT NOT NULL,
+    updated_at      REAL NOT NULL,
+    UNIQUE (source, tool, block_key)
+);
+CREATE INDEX IF NOT EXISTS idx_pages_chapter ON pages (source, chapter);
+CREATE INDEX IF NOT EXISTS idx_pages_status ON pages (source, status);
+CREATE INDEX IF NOT EXISTS idx_blocks_page ON blocks (source, tool, first_page);
+CREATE INDEX IF NOT EXISTS idx_blocks_chapter ON blocks (source, chapter);
+CREATE INDEX IF NOT EXISTS idx_blocks_status ON blocks (source, tool, status);
+"""
+
+# 各工具在 blocks.tool 欄位與指標檔名（<工具>_metrics.json）使用的名稱
+PDF_SCANNER = 'pdf_scanner'
+SMART_SCANNER = 'smart_scanner'
+AUTO_EXTRACTOR = 'auto_extractor'
+SIMPLE_SCANNER = 'simple_scanner'
+
+
+def legacy_block(block: Dict) -> Dict:
+    """區塊在相容JSON中的樣子：OCR原文另存在 ocr_text 欄位，不放進舊格式"""
+    return {k: v for k, v in block.items() if k != 'raw_text'}
+
+
+def chapter_map(doc) -> List[Tuple[int, str]]:
+    """由PDF目錄取得 (起始頁, 章名)，依頁碼排序；沒有目錄時為空"""
+    chapters = [(page, title) for level, title, page in doc.get_toc() if level == 1 and page > 0]
+    return sorted(chapters)
+
+
+def chapter_for_page(chapters: List[Tuple[int, str]], page: int) -> Optional[str]:
+    """頁碼（1起算）所屬的章名"""
+    current = None
+    for start, title in chapters:
+        if start > page:
+            break
+        current = title
+    return current
+
+
+class ExtractionStore:
+    def __init__(self, path: str = "extraction.db"):
+        self.path = Path(path)
+        self.conn = sqlite3.connect(str(self.path))
+        self.conn.row_factory = sqlite3.Row
+        # WAL 讓讀取不必等寫入；逐頁 upsert 不需要每筆都同步到磁碟
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        self.chapters: Dict[str, List[Tuple[int, str]]] = {}
+
+    def close(self):
+        self.conn.commit()
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def set_chapters(self, source: str, doc):
+        """讀取並記住文件的章節目錄，之後寫入的頁面與區塊自動標上章名"""
+        self.chapters[source] = chapter_map(doc)
+
+    def _chapter(self, source: str, page: int) -> Optional[str]:
+        return chapter_for_page(self.chapters.get(source, []), page)
+
+    def upsert_page(self, source: str, page: int, status: str, reason: str = None,
+                    fingerprint: str = None, screenshot: str = None, commit: bool = True):
+        """新增或更新一頁的處理狀態"""
+        self.conn.execute(
+            """INSERT INTO pages (source, page, chapter, status, reason, fingerprint,
+                                  screenshot, updated_at)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+               ON CONFLICT (source, page) DO UPDATE SET
+                   chapter = excluded.chapter, status = excluded.status,
+                   reason = excluded.reason,
+                   fingerprint = COALESCE(excluded.fingerprint, pages.fingerprint),
+                   screenshot = COALESCE(excluded.screenshot, pages.screenshot),
+                   updated_at = excluded.updated_at""",
+            (source, page, self._chapter(source, page), status, reason, fingerprint,
+             screenshot, time.time()))
+        if commit:
+            self.conn.commit()
+
+    def upsert_block(self, source: str, tool: str, key: str, block: Dict,
+                     status: str, commit: bool = True):
+        """新增或更新一個區塊；block 存成相容格式的JSON供匯出，常用欄位另外展開建索引
+
+        block 的 raw_text（未清理的OCR原文）寫入 ocr_text 欄位，不進入匯出的JSON。
+        """
+        pages = block.get('pages') or [block.get('page', 0)]
+        screenshots = block.get('screenshots') or [block.get('screenshot') or block.get('image')]
+        self.conn.execute(
+            """INSERT INTO blocks (source, tool, block_key, first_page, last_page, chapter,
+                                   status, line_count, has_description, is_merged,
+                                   screenshot, ocr_text, code, description, data, updated_at)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+               ON CONFLICT (source, tool, block_key) DO UPDATE SET
+                   first_page = excluded.first_page, last_page = excluded.last_page,
+                   chapter = excluded.chapter, status = excluded.status,
+                   line_count = excluded.line_count,
+                   has_description = excluded.has_description,
+                   is_merged = excluded.is_merged, screenshot = excluded.screenshot,
+                   ocr_text = COALESCE(excluded.ocr_text, blocks.ocr_text),
+                   code = excluded.code, description = excluded.description,
+                   data = excluded.data, updated_at = excluded.updated_at""",
+            (source, tool, key, pages[0], pages[-1], self._chapter(source, pages[0]), status,
+             block.get('line_count'), int(bool(block.get('has_description') or
+                                                block.get('description'))),
+             int(bool(block.get('is_merged'))), screenshots[0], block.get('raw_text'),
+             block.get('code'), block.get('description'),
+             json.dumps(legacy_block(block), ensure_ascii=False), time.time()))
+        if commit:
+            self.conn.commit()
+
+    def replace_page_blocks(self, source: str, tool: str, page: int,
+                            blocks: Iterable[Tuple[str, Dict]], status: str):
+        """以一頁的新結果取代該頁舊區塊（同一交易內完成）"""
+        with self.conn:
+            self.conn.execute("DELETE FROM blocks WHERE source = ? AND tool = ? AND first_page = ?",
+                              (source, tool, page))
+            for key, block in blocks:
+                self.upsert_block(source, tool, key, block, status, commit=False)
+
+    def prune_blocks(self, source: str, tool: str, keep_keys: Iterable[str]):
+        """刪除此次結果中已不存在的區塊（例如重新合併後消失的跨頁區塊）"""
+        keep = set(keep_keys)
+        rows = self.conn.execute("SELECT id, block_key FROM blocks WHERE source = ? AND tool = ?",
+                                 (source, tool)).fetchall()
+        stale = [(row['id'],) for row in rows if row['block_key'] not in keep]
+        with self.conn:
+            self.conn.executemany("DELETE FROM blocks WHERE id = ?", stale)
+
+    def set_status(self, block_ids: Iterable[int], status: str):
+        with self.conn:
+            self.conn.executemany("UPDATE blocks SET status = ?, updated_at = ? WHERE id = ?",
+                                  [(status, time.time(), block_id) for block_id in block_ids])
+
+    def query_blocks(self, source: str, tool: str, pages: Tuple[int, int] = None,
+                     chapter: str = None, status=None) -> List[sqlite3.Row]:
+        """依頁碼範圍（含兩端）、章節、狀態查詢區塊，依頁碼排序"""
+        sql = "SELECT * FROM blocks WHERE source = ? AND tool = ?"
+        params = [source, tool]
+        if pages is not None:
+            sql += " AND first_page BETWEEN ? AND ?"
+            params.extend(pages)
+        if chapter is not None:
+            sql += " AND chapter = ?"
+            params.append(chapter)
+        if status is not None:
+            statuses = [status] if isinstance(status, str) else list(status)
+            sql += f" AND status IN ({','.join('?' * len(statuses))})"
+            params.extend(statuses)
+        sql += " ORDER BY first_page, id"
+        return self.conn.execute(sql, params).fetchall()
+
+    def query_pages(self, source: str, status: str = None,
+                    page: int = None) -> List[sqlite3.Row]:
+        sql = "SELECT * FROM pages WHERE source = ?"
+        params = [source]
+        if page is not None:
+            sql += " AND page = ?"
+            params.append(page)
+        if status is not None:
+            sql += " AND status = ?"
+            params.append(status)
+        return self.conn.execute(sql + " ORDER BY page", params).fetchall()
+
+    def blocks_data(self, source: str, tool: str, **filters) -> List[Dict]:
+        """查詢結果還原成原本的區塊字典"""
+        return [json.loads(row['data']) for row in self.query_blocks(source, tool, **filters)]
+
+    def chapter_counts(self, source: str, tool: str, status=None) -> Dict[str, int]:
+        sql = ("SELECT COALESCE(chapter, '') AS chapter, COUNT(*) AS n FROM blocks "
+               "WHERE source = ? AND tool = ?")
+        params = [source, tool]
+        if status is not None:
+            statuses = [status] if isinstance(status, str) else list(status)
+            sql += f" AND status IN ({','.join('?' * len(statuses))})"
+            params.extend(statuses)
+        rows = self.conn.execute(sql + " GROUP BY chapter ORDER BY MIN(first_page)", params)
+        return {row['chapter']: row['n'] for row in rows if row['chapter']}
+
+    def export_json(self, path, data):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+
+    def export_extracted_codes(self, source: str, path) -> List[Dict]:
+        """匯出與 PDFCodeScanner 相同格式的 extracted_codes.json"""
+        codes = self.blocks_data(source, PDF_SCANNER)
+        self.export_json(path, codes)
+        return codes
+
+    def export_code_regions(self, source: str, path) -> List[Dict]:
+        """匯出與 AutoExtractor 相同格式的 code_regions.json"""
+        regions = self.blocks_data(source, AUTO_EXTRACTOR)
+        self.export_json(path, regions)
+        return regions
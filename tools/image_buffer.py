@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+影像緩衝工具
+將 fitz.Pixmap 或任意緩衝區直接包成 NumPy 陣列（不複製），
+讓偵測器不必經過 PNG 編碼、寫檔、讀檔、解碼
+"""
+
+import math
+from pathlib import Path
+from typing import Iterator, List, Tuple
+import cv2
+import numpy as np
+import fitz  # PyMuPDF
+
+
+def buffer_to_array(buffer, width: int, height: int, channels: int = 1,
+                    stride: int = None) -> np.ndarray:
+    """將原始像素緩衝區包成陣列（零複製，唯讀緩衝區會得到唯讀陣列）"""
+    stride = stride or width * channels
+    if channels == 1:
+        return np.ndarray((height, width), dtype=np.uint8, buffer=buffer,
+                          strides=(stride, 1))
+    return np.ndarray((height, width, channels), dtype=np.uint8, buffer=buffer,
+                      strides=(stride, channels, 1))
+
+
+def pixmap_to_array(pix) -> np.ndarray:
+    """Pixmap → 陣列（零複製）；灰階為 HxW，彩色為 HxWxn（RGB順序）
+
+    陣列直接引用 Pixmap 的記憶體，不持有該緩衝區：呼叫端必須在陣列使用期間
+    （包括 .copy() 完成之前）保留 pix 的參照。Pixmap 被回收後緩衝區即釋放，
+    陣列會讀到其他配置的內容，因此不可寫成 pixmap_to_array(render_gray(...)).copy()。
+    """
+    # 新版PyMuPDF提供memoryview，舊版的samples會複製一份bytes
+    samples = getattr(pix, 'samples_mv', None)
+    if samples is None:
+        samples = pix.samples
+    return buffer_to_array(samples, pix.width, pix.height, pix.n, pix.stride)
+
+
+def load_gray(image) -> np.ndarray:
+    """取得灰階陣列：可傳入圖片路徑、Pixmap、灰階或BGR陣列
+
+    灰階 Pixmap 回傳的是零複製陣列，與 pixmap_to_array 相同，呼叫端須保留 Pixmap。
+    """
+    if isinstance(image, np.ndarray):
+        if image.ndim == 2:
+            return image
+        return cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+
+    if isinstance(image, (str, Path)):
+        return cv2.imread(str(image), cv2.IMREAD_GRAYSCALE)
+
+    # Pixmap 或其他具有 samples/width/height/n/stride 的物件
+    arr = pixmap_to_array(image)
+    if arr.ndim == 2:
+        return arr
+    if arr.shape[2] == 4:
+        return cv2.cvtColor(arr, cv2.COLOR_RGBA2GRAY)
+    return cv2.cvtColor(arr, cv2.COLOR_RGB2GRAY)
+
+
+def render_gray(page, dpi: int = 200, clip=None):
+    """直接渲染單通道、無alpha的Pixmap，省去cvtColor"""
+    mat = fitz.Matrix(dpi/72, dpi/72)
+    return page.get_pixmap(matrix=mat, colorspace=fitz.csGRAY, alpha=False, clip=clip)
+
+
+def iter_page_strips(page, dpi: int = 200, max_bytes: int = 8 * 1024 * 1024,
+                     overlap: int = 16) -> Iterator[Tuple[int, "fitz.Pixmap"]]:
+    """將頁面切成水平條帶逐一渲染（單通道），每條像素量不超過 max_bytes
+
+    產生 (條帶頂端的像素y座標, Pixmap)；相鄰條帶重疊 overlap 像素，
+    讓跨接縫的區塊在兩側都留有完整邊緣，之後以 merge_boxes 合併。
+    """
+    scale = dpi / 72
+    rect = page.rect
+    width_px = math.ceil(rect.width * scale)
+    height_px = math.ceil(rect.height * scale)
+    rows = max(2 * overlap + 1, max_bytes // max(1, width_px))
+
+    y = 0
+    while True:
+        bottom = min(y + rows, height_px)
+        clip = fitz.Rect(rect.x0, rect.y0 + y / scale, rect.x1, rect.y0 + bottom / scale)
+        yield y, render_gray(page, dpi, clip)
+        if bottom >= height_px:
+            break
+        y = bottom - overlap
+
+
+def merge_boxes(boxes: List[Tuple[int, int, int, int]],
+                gap: int = 2) -> List[Tuple[int, int, int, int]]:
+    """合併相交或相距 gap 像素內的方框 (x, y, w, h)，用於接回被條帶切開的區塊"""
+    merged = []
+    for box in sorted(boxes, key=lambda b: b[1]):
+        x, y, w, h = box
+        changed = True
+        while changed:
+            changed = False
+            for i, (mx, my, mw, mh) in enumerate(merged):
+                if (x <= mx + mw + gap and mx <= x + w + gap and
+                        y <= my + mh + gap and my <= y + h + gap):
+                    nx, ny = min(x, mx), min(y, my)
+                    w = max(x + w, mx + mw) - nx
+                    h = max(y + h, my + mh) - ny
+                    x, y = nx, ny
+                    del merged[i]
+                    changed = True
+                    break
+        merged.append((x, y, w, h))
+    return merged
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+共用的文字行分類器
+預先編譯所有樣式，並以單一交替式正規表示式一次掃過文字，
+標記每行是否為有行號的程式碼、關鍵字、Line Description 標記或GH API參考
+
+用法（微基準）：
+    python tools/line_classifier.py --megabytes 8
+"""
+
+import re
+import enum
+from typing import Dict, Iterator, List, Tuple
+
+PYTHON_KEYWORDS = ['import', 'for', 'if', 'def', 'class', 'print',
+                   'return', 'while', 'try', 'except']
+GH_WORDS = ['rhinoscriptsyntax', 'Rhino.Geometry', 'GhPython', 'Grasshopper']
+DESCRIPTION_MARKERS = ['Line Description', '說明']
+
+
+class LineKind(enum.IntFlag):
+    NONE = 0
+    NUMBERED = 1        # 行號開頭
+    CODE_STATEMENT = 2  # 行號後接 import/for/if/def/class
+    KEYWORD = 4         # 含Python關鍵字（子字串比對，與舊判斷一致）
+    DESCRIPTION = 8     # Line Description 標記
+    GH_REFERENCE = 16   # GH/Rhino API 名稱
+
+
+NUMBERED_LINE = re.compile(r'^\s*\d+\s+')
+CODE_STATEMENT = re.compile(r'^\s*\d+\s+(?:import\s+|for\s+\w+\s+in\s+|if\s+|def\s+|class\s+)')
+_NUMBERED_LINES = re.compile(r'^\s*\d+\s+', re.MULTILINE)
+_DESCRIPTION_MARKER = re.compile('|'.join(re.escape(m) for m in DESCRIPTION_MARKERS))
+
+# 每個字串對應的標記；被較長字串包含的關鍵字（Rhino.Geometry 內的 "try"）一併標上
+_WORD_KIND = {}
+for _word in PYTHON_KEYWORDS:
+    _WORD_KIND[_word] = LineKind.KEYWORD
+for _word in GH_WORDS:
+    _WORD_KIND[_word] = LineKind.GH_REFERENCE
+for _word in DESCRIPTION_MARKERS:
+    _WORD_KIND[_word] = LineKind.DESCRIPTION
+for _word in GH_WORDS + DESCRIPTION_MARKERS:
+    if any(keyword in _word for keyword in PYTHON_KEYWORDS):
+        _WORD_KIND[_word] |= LineKind.KEYWORD
+
+# 所有字串合成一個交替樣式（長的優先），一次掃描找出全部；
+# 只有關鍵字尾端與GH名稱開頭黏在一起（如 "forhinoscriptsyntax"）時會漏掉後者
+_WORDS = re.compile('|'.join(re.escape(w) for w in sorted(_WORD_KIND, key=len, reverse=True)))
+
+_PAGE_KINDS = LineKind.KEYWORD | LineKind.DESCRIPTION | LineKind.GH_REFERENCE
+
+
+def _word_kinds(text: str) -> LineKind:
+    kind = LineKind.NONE
+    for word in set(_WORDS.findall(text)):
+        kind |= _WORD_KIND[word]
+    return kind
+
+
+def classify_line(line: str) -> LineKind:
+    """標記單行的所有特徵"""
+    kind = _word_kinds(line)
+    if NUMBERED_LINE.match(line):
+        kind |= LineKind.NUMBERED
+        if CODE_STATEMENT.match(line):
+            kind |= LineKind.CODE_STATEMENT
+    return kind
+
+
+def classify_lines(text: str) -> Iterator[Tuple[str, LineKind]]:
+    """逐行產生 (行, 標記)"""
+    for line in text.split('\n'):
+        yield line, classify_line(line)
+
+
+def strip_line_number(line: str) -> str:
+    """移除行首的行號"""
+    return NUMBERED_LINE.sub('', line, count=1)
+
+
+def text_after_marker(text: str) -> str:
+    """回傳第一個 Line Description 標記之後的文字（沒有標記時回傳原文）"""
+    return _DESCRIPTION_MARKER.split(text, maxsplit=1)[-1]
+
+
+def page_features(text: str) -> Dict:
+    """掃描整頁文字，回傳行號行數（數到3即停）與各特徵是否出現"""
+    numbered = 0
+    for _ in _NUMBERED_LINES.finditer(text):
+        numbered += 1
+        if numbered > 2:
+            break
+
+    # 單次掃描，三類字串都出現後提早結束
+    kinds = LineKind.NONE
+    for match in _WORDS.finditer(text):
+        kinds |= _WORD_KIND[match.group()]
+        if kinds == _PAGE_KINDS:
+            break
+
+    return {
+        'numbered_lines': numbered,
+        'keyword': bool(kinds & LineKind.KEYWORD),
+        'description': bool(kinds & LineKind.DESCRIPTION),
+        'gh_reference': bool(kinds & LineKind.GH_REFERENCE),
+    }
+
+
+if __name__ == "__main__":
+    import time
+    import argparse
+
+    parser = argparse.ArgumentParser(description="行分類器微基準")
+    parser.add_argument('--megabytes', type=float, default=8, help="測試文字大小")
+    args = parser.parse_args()
+
+    sample = [
+        "1 import rhinoscriptsyntax as rs",
+        "2 for i in range(x):",
+        "3     pt = rs.AddPoint(i, 0, 0)",
+        "參數化設計透過程式描述幾何之間的關係，當輸入改變時整個模型會依規則更新。",
+        "Line Description",
+        "1 匯入 Rhino.Geometry 模組",
+        "Figure 3.2 shows the Grasshopper canvas with a GhPython component.",
+        "",
+    ]
+    block = '\n'.join(sample) + '\n'
+    text = block * max(1, int(args.megabytes * 1024 * 1024 / len(block.encode('utf-8'))))
+    lines = text.split('\n')
+    size_mb = len(text.encode('utf-8')) / (1024 * 1024)
+    print(f"🏁 {size_mb:.1f} MB，{len(lines)} 行")
+
+    def legacy_line(line):
+        # 舊版各工具對每行做的判斷：identify_code_blocks 的六個 re.match，
+        # clean_code 的標記檢查，以及關鍵字/GH名稱的逐一子字串比對
+        stripped = line.strip()
+        patterns = [r'^\d+\s+import\s+', r'^\d+\s+for\s+\w+\s+in\s+', r'^\d+\s+if\s+',
+                    r'^\d+\s+def\s+', r'^\d+\s+class\s+']
+        is_code = any(re.match(p, stripped) for p in patterns)
+        numbered = re.match(r'^\d+\s+', stripped)
+        marker = 'Line Description' in line or '說明' in line
+        keyword = any(k in line for k in PYTHON_KEYWORDS)
+        gh = any(w in line for w in GH_WORDS)
+        return is_code, numbered, marker, keyword, gh
+
+    def legacy_page(page):
+        # 舊版 has_code_features 對整頁掃四次
+        numbers = re.findall(r'^\s*(\d+)\s+', page, re.MULTILINE)
+        return (len(numbers) > 2, any(k in page for k in PYTHON_KEYWORDS),
+                'Line Description' in page or '說明' in page,
+                any(w in page for w in GH_WORDS))
+
+    pages = [block * 6] * (len(lines) // (len(sample) * 6))
+    # 無任何特徵的純文字頁是兩者都得掃完全文的最壞情況
+    prose_pages = [(sample[3] + '\n') * 48] * len(pages)
+
+    for name, func in [
+        ('逐行：舊版分散判斷', lambda: [legacy_line(l) for l in lines]),
+        ('逐行：classify_line', lambda: [classify_line(l) for l in lines]),
+        ('整頁：舊版四次掃描', lambda: [legacy_page(p) for p in pages]),
+        ('整頁：page_features', lambda: [page_features(p) for p in pages]),
+        ('純文字頁：舊版四次掃描', lambda: [legacy_page(p) for p in prose_pages]),
+        ('純文字頁：page_features', lambda: [page_features(p) for p in prose_pages]),
+    ]:
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        print(f"  ⏱️ {name}: {elapsed:.3f} 秒，{len(lines) / elapsed:,.0f} 行/秒")
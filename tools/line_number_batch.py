@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+批次行號驗證
+把多個區塊（可跨頁）的左側行號條帶垂直拼成一張圖，
+只啟動一次tesseract，再依y座標把結果對應回各區塊
+"""
+
+import time
+from bisect import bisect_right
+from collections import defaultdict
+from typing import Dict, Hashable, List
+import numpy as np
+import pytesseract
+
+from image_buffer import load_gray
+
+
+def left_strip(image) -> np.ndarray:
+    """取出行號所在的左側條帶（與 has_line_numbers 相同的範圍）"""
+    gray = load_gray(image)
+    height, width = gray.shape
+    return gray[:, :min(50, width//10)]
+
+
+class BatchLineNumberVerifier:
+    def __init__(self, min_numbers: int = 3, gap: int = 40,
+                 max_sprite_height: int = 30000, config: str = '--psm 6'):
+        self.min_numbers = min_numbers
+        self.gap = gap  # 條帶之間的白色間隔，避免相鄰行被合併
+        self.max_sprite_height = max_sprite_height  # tesseract 單張圖高度上限約 32767
+        self.config = config
+        self.pending = []  # [(key, strip)]
+        self.strips_checked = 0
+        self.ocr_calls = 0
+        self.wall_time = 0.0
+
+    def add(self, key: Hashable, image):
+        """加入待驗證的區塊影像"""
+        self.pending.append((key, left_strip(image)))
+
+    def flush(self) -> Dict[Hashable, bool]:
+        """對所有待驗證條帶執行批次OCR，回傳 {key: 是否含行號}"""
+        start = time.perf_counter()
+        results = {}
+
+        for batch in self._split_batches(self.pending):
+            results.update(self._verify_sprite(batch))
+
+        self.strips_checked += len(self.pending)
+        self.pending = []
+        self.wall_time += time.perf_counter() - start
+        return results
+
+    def _split_batches(self, strips: List) -> List[List]:
+        """依拼圖高度上限分批"""
+        batches, current, height = [], [], 0
+        for key, strip in strips:
+            needed = strip.shape[0] + self.gap
+            if current and height + needed > self.max_sprite_height:
+                batches.append(current)
+                current, height = [], 0
+            current.append((key, strip))
+            height += needed
+        if current:
+            batches.append(current)
+        return batches
+
+    def _verify_sprite(self, batch: List) -> Dict[Hashable, bool]:
+        """拼成一張圖並OCR一次"""
+        width = max(strip.shape[1] for _, strip in batch)
+        height = sum(strip.shape[0] + self.gap for _, strip in batch) + self.gap
+        sprite = np.full((height, width), 255, np.uint8)
+
+        offsets = []
+        y = self.gap
+        for _, strip in batch:
+            offsets.append(y)
+            sprite[y:y + strip.shape[0], :strip.shape[1]] = strip
+            y += strip.shape[0] + self.gap
+
+        results = {key: False for key, _ in batch}
+        try:
+            data = pytesseract.image_to_data(sprite, config=self.config,
+                                             output_type=pytesseract.Output.DICT)
+            self.ocr_calls += 1
+        except Exception:
+            return results
+
+        # 將同一行的文字合併，再以行中心的y座標找出所屬條帶
+        lines = defaultdict(lambda: {'words': [], 'centers': []})
+        for i, word in enumerate(data['text']):
+            if not word.strip():
+                continue
+            line_key = (data['block_num'][i], data['par_num'][i], data['line_num'][i])
+            lines[line_key]['words'].append(word.strip())
+            lines[line_key]['centers'].append(data['top'][i] + data['height'][i] / 2)
+
+        numbers = defaultdict(int)
+        for line in lines.values():
+            center = sum(line['centers']) / len(line['centers'])
+            index = bisect_right(offsets, center) - 1
+            if index >= 0 and ' '.join(line['words']).isdigit():
+                numbers[batch[index][0]] += 1
+
+        for key, count in numbers.items():
+            results[key] = count >= self.min_numbers
+        return results
+
+    def stats(self) -> Dict:
+        """統計：檢查的條帶數、實際OCR次數、節省的呼叫數與耗時"""
+        return {
+            'strips_checked': self.strips_checked,
+            'ocr_calls': self.ocr_calls,
+            'calls_saved': self.strips_checked - self.ocr_calls,
+            'wall_time': round(self.wall_time, 3)
+        }
@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+"""
+行號欄偵測（不需OCR）
+以垂直投影找出區塊最左側、與程式碼之間隔著空白欄的窄欄，
+再以水平投影切出文字列、以連通元件檢查每列是否為數字大小的字形，
+列距規律且對齊時即為行號欄；回傳0~1的信心分數。分數高直接判定有行號，
+找不到窄欄或分數低直接判定沒有，只有介於兩個門檻之間的區塊交給tesseract
+
+用法（基準：與OCR檢查比較 code_screenshots/ 中的候選區塊）：
+    python tools/line_number_detector.py code_screenshots --synthetic 20
+"""
+
+import time
+import json
+import shutil
+import argparse
+import tempfile
+from pathlib import Path
+from typing import Dict, List, Tuple
+import cv2
+import numpy as np
+import pytesseract
+
+from image_buffer import load_gray
+from line_number_batch import left_strip
+
+# 門檻以管線實際送來的區塊校準：code_screenshots/ 經 find_candidate_blocks 得到的
+# 67個灰底候選全是圖形與軟體截圖（書中程式碼在白底上），65個為0、最高 0.545（點陣圖）；
+# 合成教材的灰底程式碼區塊全為 1.0，人工框出的16段真實程式碼最低 0.727。
+# 達 CONFIDENT 判定有行號，低於 UNLIKELY 判定沒有，介於兩者之間才OCR
+CONFIDENT = 0.7
+UNLIKELY = 0.6
+INK_CONTRAST = 50  # 與背景相差超過此灰階值視為墨跡
+MIN_GLYPH_AREA = 4  # 像素數少於此值的連通元件視為雜點
+
+
+def _runs(mask: np.ndarray, max_gap: int = 0) -> List[Tuple[int, int]]:
+    """一維布林陣列中連續為真的區段 [start, end)，間隔不超過 max_gap 的區段合併"""
+    padded = np.concatenate(([False], mask, [False]))
+    edges = np.flatnonzero(padded[1:] != padded[:-1])
+    runs = []
+    for start, end in zip(edges[::2], edges[1::2]):
+        if runs and start - runs[-1][1] <= max_gap:
+            runs[-1] = (runs[-1][0], end)
+        else:
+            runs.append((start, end))
+    return runs
+
+
+def _left_column(ink: np.ndarray, gutter: int) -> Tuple[int, int]:
+    """最左側的墨跡欄：右側須接著至少 gutter 寬的空白欄，找不到時回傳None"""
+    # 以各欄有墨跡的文字列數投影：只出現在少數幾列的墨跡（標題、跨欄的文字）不會填掉空白欄
+    rows = _runs(ink.any(axis=1), max_gap=1)
+    counts = np.sum([ink[start:end].any(axis=0) for start, end in rows], axis=0)
+    runs = _runs(counts > 0.2 * counts.max(), max_gap=gutter - 1)
+    if not runs or runs[0][1] + gutter > ink.shape[1]:
+        return None  # 墨跡一路延伸到檢查範圍外，沒有獨立的欄
+    return runs[0]
+
+
+def _aligned_fraction(edges: np.ndarray, tolerance: float) -> float:
+    """與某一列邊緣相距不超過 tolerance 的最多列數佔全部列的比例"""
+    close = np.abs(edges[:, None] - edges[None, :]) <= tolerance
+    return float(close.sum(axis=1).max() / len(edges))
+
+
+def detect_line_numbers(image, min_numbers: int = 3) -> Dict:
+    """分析區塊左側是否有行號欄，回傳信心分數與各項特徵"""
+    gray = load_gray(image)
+    height, width = gray.shape
+    result = {'confidence': 0.0, 'rows': 0, 'digit_rows': 0,
+              'regularity': 0.0, 'alignment': 0.0, 'column': None}
+
+    # 行號與程式碼之間的空白欄落在左側四分之一內
+    region = gray[:, :min(width, max(60, width // 4))]
+    background = np.median(region)
+    ink = np.abs(region.astype(np.int16) - int(background)) > INK_CONTRAST
+    if not ink.any():
+        return result
+
+    # 去除掃描雜點：太小的連通元件不算墨跡，否則會填掉行號與程式碼之間的空白欄
+    _, labels, stats, _ = cv2.connectedComponentsWithStats(ink.astype(np.uint8), connectivity=8)
+    areas, heights = stats[:, cv2.CC_STAT_AREA], stats[:, cv2.CC_STAT_HEIGHT]
+    keep = areas >= MIN_GLYPH_AREA
+    keep[0] = False
+    if not keep.any():
+        return result
+    # 字高取面積加權中位數，雜點再多也不影響；再依字高提高雜點門檻
+    order = np.argsort(heights[keep])
+    weights = np.cumsum(areas[keep][order])
+    glyph_height = float(heights[keep][order][np.searchsorted(weights, weights[-1] / 2)])
+    keep &= areas >= max(MIN_GLYPH_AREA, 0.02 * glyph_height ** 2)
+    # 頁首分隔線、框線等細長水平線會橫跨行號與程式碼之間的空白欄，不算字形
+    widths = stats[:, cv2.CC_STAT_WIDTH]
+    keep &= ~((heights <= 0.5 * glyph_height) & (widths > 4 * glyph_height))
+    ink = keep[labels]
+
+    column = _left_column(ink, max(3, round(glyph_height * 0.6)))
+    if column is None or column[1] - column[0] > 4 * glyph_height:
+        return result  # 沒有窄欄（整段文字或圖形），不是行號
+    result['column'] = [int(column[0]), int(column[1])]
+
+    # 水平投影切出欄內的文字列
+    column_ink = ink[:, column[0]:column[1]]
+    rows = _runs(column_ink.any(axis=1), max_gap=1)
+    result['rows'] = len(rows)
+    if len(rows) < min_numbers:
+        return result
+    row_height = float(np.median([end - start for start, end in rows]))
+
+    # 數字列：高度一致，寬度不超過三四個數字；數字等高，每個字形都接近整列高度
+    # （小寫字母、項目符號、標點或橫線都會被排除）
+    digit_rows = []
+    for start, end in rows:
+        band_height = end - start
+        if not 0.6 * row_height <= band_height <= 1.5 * row_height:
+            continue
+        _, _, band_stats, _ = cv2.connectedComponentsWithStats(
+            column_ink[start:end].astype(np.uint8), connectivity=8)
+        parts = band_stats[1:][band_stats[1:, cv2.CC_STAT_AREA] >= 2]
+        if not 1 <= len(parts) <= 4:
+            continue
+        if np.any(parts[:, cv2.CC_STAT_HEIGHT] < 0.8 * band_height):
+            continue
+        if np.any(parts[:, cv2.CC_STAT_WIDTH] > 1.2 * parts[:, cv2.CC_STAT_HEIGHT]):
+            continue
+        left = int(parts[:, cv2.CC_STAT_LEFT].min())
+        right = int((parts[:, cv2.CC_STAT_LEFT] + parts[:, cv2.CC_STAT_WIDTH]).max())
+        if right - left > 3.5 * band_height:
+            continue
+        digit_rows.append(((start + end) / 2, left, right, start, end))
+    result['digit_rows'] = len(digit_rows)
+    if len(digit_rows) < min_numbers:
+        return result
+
+    # 數字頂端在大寫高度：與同一行程式碼最高的字形齊平，不會低到小寫字母的高度
+    code_rows = _runs(ink[:, column[1]:].any(axis=1), max_gap=1)
+    cap_checked = cap_matched = 0
+    for _, _, _, start, end in digit_rows:
+        overlaps = [(min(end, b) - max(start, a), a) for a, b in code_rows
+                    if min(end, b) > max(start, a)]
+        if overlaps:
+            cap_checked += 1
+            cap_matched += start <= max(overlaps)[1] + 0.2 * (end - start)
+    cap_height = float(cap_matched / cap_checked) if cap_checked else 1.0
+
+    # 列距規律：相鄰列距為基本列距的1~3倍（空行也可能沒有行號）
+    centers = np.array([row[0] for row in digit_rows])
+    gaps = np.diff(centers)
+    step = float(np.median(gaps))
+    multiples = np.round(gaps / step)
+    regular = (multiples >= 1) & (multiples <= 3) & (np.abs(gaps - multiples * step) <= 0.2 * step)
+    regularity = float(regular.mean())
+
+    # 對齊：行號靠右或靠左對齊，取對齊在同一位置的最多列所佔比例
+    tolerance = 0.5 * row_height
+    alignment = max(_aligned_fraction(np.array([row[1] for row in digit_rows]), tolerance),
+                    _aligned_fraction(np.array([row[2] for row in digit_rows]), tolerance))
+
+    # 列數多時更可信；欄內混有非數字列時降低分數
+    support = min(1.0, len(digit_rows) / (min_numbers + 2))
+    digit_fraction = len(digit_rows) / len(rows)
+    result.update({
+        'confidence': round(support * digit_fraction * regularity * alignment * cap_height, 3),
+        'regularity': round(regularity, 3),
+        'alignment': round(alignment, 3),
+        'cap_height': round(cap_height, 3),
+        'step': round(step, 1),
+    })
+    return result
+
+
+def ocr_line_numbers(image, min_numbers: int = 3) -> bool:
+    """以tesseract辨識左側條帶，至少 min_numbers 行是數字才算有行號"""
+    try:
+        text = pytesseract.image_to_string(left_strip(image), config='--psm 6')
+        lines = text.strip().split('\n')
+        numbers = [line.strip() for line in lines if line.strip().isdigit()]
+        return len(numbers) >= min_numbers
+    except Exception:
+        return False
+
+
+def decide(detection: Dict, min_numbers: int = 3):
+    """依偵測結果判定：True / False，模稜兩可時回傳None
+
+    找不到獨立窄欄、數字列不足或分數低於 UNLIKELY 都判定沒有行號，不再OCR。
+    """
+    if detection['confidence'] >= CONFIDENT:
+        return True
+    if (detection['column'] is None or detection['digit_rows'] < min_numbers
+            or detection['confidence'] < UNLIKELY):
+        return False
+    return None
+
+
+def _candidate_blocks(screenshots_dir: Path, synthetic_pages: int) -> List[Tuple[str, np.ndarray]]:
+    """收集候選灰底區塊：截圖目錄中的頁面，加上合成教材（含行號的正例）"""
+    from pdf_scanner import PDFCodeScanner
+    from render_cache import RenderCache
+    from ocr_cache import OCRCache
+    from benchmark_extraction import generate_textbook
+
+    # 合成教材與掃描器的輸出、快取都放在暫存目錄
+    workdir = Path(tempfile.mkdtemp(prefix="line_numbers_"))
+    try:
+        pdf_path = workdir / "synthetic.pdf"
+        scanner = PDFCodeScanner(str(pdf_path), RenderCache(str(workdir / "render_cache")),
+                                 output_dir=str(workdir / "out"),
+                                 screenshots_dir=str(workdir / "pages"),
+                                 ocr_cache=OCRCache(str(workdir / "ocr_cache")))
+        blocks = [(f"{path.name}#{i + 1}", block['image'])
+                  for path in sorted(screenshots_dir.glob("*.png"))
+                  for i, block in enumerate(scanner.find_candidate_blocks(str(path)))]
+        if synthetic_pages:
+            generate_textbook(pdf_path, synthetic_pages)
+            for path in scanner.pdf_to_images():
+                blocks.extend((f"synthetic/{path.name}#{i + 1}", block['image'])
+                              for i, block in enumerate(scanner.find_candidate_blocks(path)))
+        return blocks
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def benchmark(screenshots_dir: Path, synthetic_pages: int = 0) -> Dict:
+    """比較投影偵測與OCR檢查的速度與一致性"""
+    blocks = _candidate_blocks(screenshots_dir, synthetic_pages)
+    has_tesseract = shutil.which('tesseract') is not None
+    print(f"🔍 候選區塊 {len(blocks)} 個（tesseract：{'有' if has_tesseract else '未安裝'}）")
+
+    start = time.perf_counter()
+    detections = [detect_line_numbers(image) for _, image in blocks]
+    projection_time = time.perf_counter() - start
+    decisions = [decide(d) for d in detections]
+
+    report = {
+        'blocks': len(blocks),
+        'projection_s': round(projection_time, 4),
+        'projection_ms_per_block': round(projection_time * 1000 / max(1, len(blocks)), 3),
+        'positive': decisions.count(True),
+        'negative': decisions.count(False),
+        'ambiguous': decisions.count(None),
+        'tesseract': has_tesseract,
+        'details': [{'block': name, 'confidence': d['confidence'], 'decision': decision}
+                    for (name, _), d, decision in zip(blocks, detections, decisions)],
+    }
+
+    if has_tesseract:
+        start = time.perf_counter()
+        ocr = [ocr_line_numbers(image) for _, image in blocks]
+        ocr_time = time.perf_counter() - start
+
+        # 混合模式：只有模稜兩可的區塊才OCR
+        hybrid = [decision if decision is not None else ocr_result
+                  for decision, ocr_result in zip(decisions, ocr)]
+        hybrid_time = projection_time + ocr_time * decisions.count(None) / max(1, len(blocks))
+        decided = [(decision, ocr_result) for decision, ocr_result in zip(decisions, ocr)
+                   if decision is not None]
+        report.update({
+            'ocr_s': round(ocr_time, 4),
+            'ocr_ms_per_block': round(ocr_time * 1000 / max(1, len(blocks)), 3),
+            'hybrid_s_estimate': round(hybrid_time, 4),
+            'speedup': round(ocr_time / hybrid_time, 1) if hybrid_time else None,
+            'agreement_decided': round(sum(a == b for a, b in decided) / max(1, len(decided)), 3),
+            'agreement_hybrid': round(sum(a == b for a, b in zip(hybrid, ocr)) /
+                                      max(1, len(blocks)), 3),
+        })
+        for detail, ocr_result in zip(report['details'], ocr):
+            detail['ocr'] = ocr_result
+
+    print(f"  投影偵測：{report['projection_ms_per_block']} 毫秒/區塊，"
+          f"有行號 {report['positive']}、沒有 {report['negative']}、"
+          f"模稜兩可 {report['ambiguous']}")
+    if has_tesseract:
+        print(f"  OCR檢查：{report['ocr_ms_per_block']} 毫秒/區塊")
+        print(f"  混合模式估計 {report['hybrid_s_estimate']} 秒（x{report['speedup']}），"
+              f"與OCR一致率 {report['agreement_hybrid']:.1%}")
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="行號欄偵測基準（投影偵測 vs. OCR）")
+    parser.add_argument('screenshots', nargs='?', default="code_screenshots",
+                        help="頁面截圖目錄")
+    parser.add_argument('--synthetic', type=int, default=0,
+                        help="另外加入的合成教材頁數（提供含行號的正例）")
+    parser.add_argument('--output', default="line_number_benchmark.json", help="報告輸出路徑")
+    args = parser.parse_args()
+
+    report = benchmark(Path(args.screenshots), args.synthetic)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"📄 報告已保存至：{args.output}")
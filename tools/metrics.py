@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+各階段計時與統計
+在 render / text / detect / ocr / cleanup / io 各階段計時，累計頁數、區塊、
+OCR呼叫、快取命中等計數，每階段保留延遲直方圖；
+結束時輸出JSON與Prometheus文字格式，看出整本書的時間花在哪裡
+
+    metrics = Metrics('pdf_scanner')
+    with metrics.timer('detect'):
+        ...
+    metrics.count('pages')
+    metrics.export('extracted_codes')  # pdf_scanner_metrics.json / .prom
+"""
+
+import json
+import time
+import threading
+from pathlib import Path
+from contextlib import contextmanager
+from typing import Dict
+
+# 直方圖上界（秒），最後一格為 +Inf
+BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+class Metrics:
+    def __init__(self, tool: str):
+        self.tool = tool
+        self.started = time.perf_counter()
+        self.counters: Dict[str, int] = {}
+        self.histograms: Dict[str, Dict] = {}
+        # 串流管線與執行緒池會從多個執行緒同時記錄
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def timer(self, stage: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start)
+
+    def observe(self, stage: str, seconds: float):
+        """記錄一次階段耗時"""
+        with self._lock:
+            histogram = self.histograms.get(stage)
+            if histogram is None:
+                histogram = self.histograms[stage] = {
+                    'count': 0, 'sum': 0.0, 'max': 0.0, 'buckets': [0] * (len(BUCKETS) + 1)}
+            histogram['count'] += 1
+            histogram['sum'] += seconds
+            histogram['max'] = max(histogram['max'], seconds)
+            index = next((i for i, bound in enumerate(BUCKETS) if seconds <= bound),
+                         len(BUCKETS))
+            histogram['buckets'][index] += 1
+
+    def count(self, name: str, n: int = 1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def set_count(self, name: str, value: int):
+        """直接設定計數（例如由快取物件本身累計的命中數）"""
+        with self._lock:
+            self.counters[name] = value
+
+    def snapshot(self) -> Dict:
+        """目前的計數與各階段統計（依總耗時排序）"""
+        with self._lock:
+            stages = {}
+            for stage, histogram in sorted(self.histograms.items(),
+                                           key=lambda item: -item[1]['sum']):
+                stages[stage] = {
+                    'count': histogram['count'],
+                    'total_s': round(histogram['sum'], 4),
+                    'mean_s': round(histogram['sum'] / histogram['count'], 4),
+                    'max_s': round(histogram['max'], 4),
+                    'buckets': dict(zip([str(bound) for bound in BUCKETS] + ['+Inf'],
+                                        histogram['buckets'])),
+                }
+            return {
+                'tool': self.tool,
+                'wall_time_s': round(time.perf_counter() - self.started, 4),
+                'counters': dict(self.counters),
+                'stages': stages,
+            }
+
+    def to_prometheus(self) -> str:
+        """Prometheus文字格式：階段直方圖（累計桶）與計數"""
+        snapshot = self.snapshot()
+        label = f'tool="{self.tool}"'
+        lines = ['# HELP extraction_stage_seconds Time spent per extraction stage.',
+                 '# TYPE extraction_stage_seconds histogram']
+        for stage, stats in snapshot['stages'].items():
+            labels = f'{label},stage="{stage}"'
+            cumulative = 0
+            for bound, n in stats['buckets'].items():
+                cumulative += n
+                lines.append(f'extraction_stage_seconds_bucket{{{labels},le="{bound}"}} '
+                             f'{cumulative}')
+            lines.append(f'extraction_stage_seconds_sum{{{labels}}} '
+                         f'{self.histograms[stage]["sum"]:.6f}')
+            lines.append(f'extraction_stage_seconds_count{{{labels}}} {stats["count"]}')
+
+        for name, value in sorted(snapshot['counters'].items()):
+            lines.append(f'# TYPE extraction_{name}_total counter')
+            lines.append(f'extraction_{name}_total{{{label}}} {value}')
+
+        lines.append('# TYPE extraction_wall_time_seconds gauge')
+        lines.append(f'extraction_wall_time_seconds{{{label}}} {snapshot["wall_time_s"]}')
+        return '\n'.join(lines) + '\n'
+
+    def export(self, output_dir='.') -> Dict:
+        """寫出 <tool>_metrics.json 與 <tool>_metrics.prom，並列出耗時最多的階段"""
+        output_dir = Path(output_dir)
+        output_dir.mkdir(parents=True, exist_ok=True)
+        snapshot = self.snapshot()
+        with open(output_dir / f"{self.tool}_metrics.json", 'w', encoding='utf-8') as f:
+            json.dump(snapshot, f, indent=2, ensure_ascii=False)
+        with open(output_dir / f"{self.tool}_metrics.prom", 'w', encoding='utf-8') as f:
+            f.write(self.to_prometheus())
+
+        print(f"⏱️ 各階段耗時（總計 {snapshot['wall_time_s']:.1f} 秒）：")
+        for stage, stats in snapshot['stages'].items():
+            print(f"  - {stage}：{stats['total_s']:.2f} 秒，{stats['count']} 次，"
+                  f"平均 {stats['mean_s'] * 1000:.1f} 毫秒")
+        return snapshot
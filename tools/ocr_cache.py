@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+OCR結果快取
+以截圖像素的雜湊加上OCR引擎、設定與版本作為鍵，把辨識文字存在磁碟上；
+重跑或部分重掃時，內容沒變的區塊直接取用結果，超過容量時依LRU淘汰
+"""
+
+import os
+import hashlib
+import subprocess
+from pathlib import Path
+from typing import Dict, Optional
+import cv2
+import numpy as np
+
+from render_cache import cache_size, evict_lru
+
+_VERSIONS: Dict[str, str] = {}
+
+
+def tesseract_version() -> str:
+    """tesseract 版本（每個行程只查一次）"""
+    if 'tesseract' not in _VERSIONS:
+        try:
+            import pytesseract
+            _VERSIONS['tesseract'] = str(pytesseract.get_tesseract_version())
+        except Exception:
+            _VERSIONS['tesseract'] = 'unavailable'
+    return _VERSIONS['tesseract']
+
+
+def dots_version(python: str) -> str:
+    """Dots OCR 版本：在其環境中查詢一次，查不到時以直譯器路徑識別"""
+    key = f"dots:{python}"
+    if key not in _VERSIONS:
+        try:
+            result = subprocess.run(
+                [python, "-c", "import importlib.metadata as m; print(m.version('dots_ocr'))"],
+                capture_output=True, text=True, timeout=30)
+            _VERSIONS[key] = result.stdout.strip() or 'unknown'
+        except (OSError, subprocess.TimeoutExpired):
+            _VERSIONS[key] = 'unavailable'
+    return _VERSIONS[key]
+
+
+def read_pixels(image) -> np.ndarray:
+    """取得截圖像素：可傳入陣列或圖片路徑（保留原始通道）"""
+    if isinstance(image, np.ndarray):
+        return image
+    return cv2.imread(str(image), cv2.IMREAD_UNCHANGED)
+
+
+class OCRCache:
+    def __init__(self, cache_dir: str = ".ocr_cache", max_bytes: int = 64 * 1024 * 1024):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(exist_ok=True)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._size = cache_size(self.cache_dir, "*.txt")
+
+    def key(self, image, engine: str, config: str = '', version: str = '') -> Optional[str]:
+        """像素內容（含尺寸與通道）＋引擎、設定、版本的雜湊；讀不到圖片時回傳None"""
+        pixels = read_pixels(image)
+        if pixels is None:
+            return None
+        digest = hashlib.sha256()
+        digest.update(f"{engine}\0{config}\0{version}\0{pixels.shape}\0{pixels.dtype}\0".encode())
+        digest.update(np.ascontiguousarray(pixels).tobytes())
+        return digest.hexdigest()[:32]
+
+    def get(self, *keys: Optional[str]) -> Optional[str]:
+        """依序查詢多個鍵，回傳第一個命中的文字（整次查詢計一次命中或未命中）"""
+        for key in keys:
+            if key is None:
+                continue
+            path = self.cache_dir / f"{key}.txt"
+            try:
+                text = path.read_text(encoding='utf-8')
+            except FileNotFoundError:
+                continue
+            os.utime(path)  # 命中時更新LRU時間
+            self.hits += 1
+            return text
+        self.misses += 1
+        return None
+
+    def put(self, key: Optional[str], text: str):
+        """寫入結果（先寫暫存檔再改名，平行寫入不會讀到一半的檔案）"""
+        if key is None:
+            return
+        path = self.cache_dir / f"{key}.txt"
+        tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+        tmp_path.write_text(text, encoding='utf-8')
+        size = tmp_path.stat().st_size  # 改名後其他行程可能立即淘汰
+        os.replace(tmp_path, path)
+
+        self._size += size
+        if self._size > self.max_bytes:
+            self._size -= evict_lru(self.cache_dir, int(self.max_bytes * 0.9), "*.txt")
+
+    def stats(self) -> Dict:
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / total, 3) if total else None
+        }
@@ -0,0 +1,318 @@
+#!/usr/bin/env python3
+"""
+OCR程式碼修正
+能解析的程式碼原樣保留，只把未定義、換掉 1/0 後是內建名稱的識別字改回來（pr1nt → print）；
+無法解析時，以一張轉換表把字串與註解以外的全形標點換成ASCII，再針對無法解析的行
+產生常見OCR混淆（l/1、O/0、漏掉的冒號）的候選修正，交給Python解析器挑出能解析的版本；
+每行的決定以雜湊記住，大批次與重跑幾乎不必重新判斷
+"""
+
+import io
+import re
+import ast
+import json
+import hashlib
+import keyword
+import builtins
+import textwrap
+import tokenize
+import warnings
+from pathlib import Path
+from typing import Callable, Dict, List, Tuple
+
+# 全形字元 → ASCII（U+FF01-FF5E 與 ASCII 一一對應）
+TRANSLATION = {code: code - 0xFEE0 for code in range(0xFF01, 0xFF5F)}
+TRANSLATION.update({
+    ord('　'): ' ',   # 全形空白
+    ord('、'): ',',
+    ord('。'): '.',
+    ord('“'): '"', ord('”'): '"',
+    ord('‘'): "'", ord('’'): "'",
+    ord('—'): '-', ord('–'): '-',
+})
+
+BLOCK_KEYWORDS = ('if', 'elif', 'else', 'for', 'while', 'def', 'class',
+                  'try', 'except', 'finally', 'with')
+# 這些子句不能單獨解析，前面補一個 if/try 讓它們有所依附
+_CONTINUATION_PREFIX = {
+    'elif': 'if 1:\n    pass\n',
+    'else': 'if 1:\n    pass\n',
+    'except': 'try:\n    pass\n',
+    'finally': 'try:\n    pass\n',
+}
+
+# 數字與易混淆字母混在一起的字（如 1O、l0、O.5）
+_MIXED_NUMBER = re.compile(r'(?<![\w.])[\dlIO](?:[\dlIO.]*[\dlIO])?(?![\w])')
+# 識別字開頭或夾在字母之間的 1/0（如 1en、e1se）；結尾的數字（pt1）視為正常
+_DIGIT_WORD = re.compile(r'\b[10]+[A-Za-z_]\w*|\b[A-Za-z_]\w*?[10]+[A-Za-z]\w*')
+_TO_DIGIT = str.maketrans('lIO', '110')
+_TO_LETTER = [str.maketrans('10', 'lO'), str.maketrans('10', 'lo'),
+              str.maketrans('10', 'io'), str.maketrans('10', 'Io')]
+_IDENTIFIER = re.compile(r'\b[A-Za-z_]\w*')
+# 多個候選都能解析時，偏好認得的名稱（pr1nt → print 而不是 prlnt）
+KNOWN_NAMES = set(dir(builtins)) | set(keyword.kwlist) | {'rs', 'rg', 'ghenv', 'Rhino'}
+
+MAX_CANDIDATES = 32
+
+# 字串與註解的內容原樣保留（3.12起f-string的文字部分是FSTRING_MIDDLE）
+_LITERALS = {tokenize.STRING, tokenize.COMMENT,
+             getattr(tokenize, 'FSTRING_MIDDLE', tokenize.STRING)}
+
+
+def normalize(text: str) -> str:
+    """以單一轉換表把全形標點換成ASCII"""
+    return text.translate(TRANSLATION)
+
+
+def literal_spans(text: str) -> Tuple[List[Tuple[int, int]], bool]:
+    """字串與註解token的字元範圍；回傳 (範圍, 是否完整斷詞)，斷詞失敗時只有失敗前的範圍"""
+    offsets = [0]
+    for line in text.splitlines(keepends=True):
+        offsets.append(offsets[-1] + len(line))
+    spans = []
+    try:
+        for token in tokenize.generate_tokens(io.StringIO(text).readline):
+            if token.type in _LITERALS:
+                spans.append((offsets[token.start[0] - 1] + token.start[1],
+                              offsets[token.end[0] - 1] + token.end[1]))
+    except (tokenize.TokenError, SyntaxError):
+        return spans, False
+    return spans, True
+
+
+def outside_literals(func: Callable[[str], str], text: str) -> str:
+    """只對字串與註解以外的部分套用 func；整段無法斷詞時逐行處理"""
+    spans, complete = literal_spans(text)
+    if not complete and '\n' in text.rstrip('\n'):
+        return '\n'.join(outside_literals(func, line) for line in text.split('\n'))
+    pieces, pos = [], 0
+    for start, end in spans:
+        pieces += [func(text[pos:start]), text[start:end]]
+        pos = end
+    pieces.append(func(text[pos:]))
+    return ''.join(pieces)
+
+
+def normalize_code(text: str) -> str:
+    """把字串與註解以外的全形字元換成ASCII（字串內的「“你好”」不動）"""
+    return outside_literals(normalize, text)
+
+
+def parses(source: str) -> bool:
+    """程式碼能否被Python解析"""
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')  # 例如無效跳脫字元的SyntaxWarning
+            compile(source, '<ocr>', 'exec', ast.PyCF_ONLY_AST)
+        return True
+    except (SyntaxError, ValueError):
+        return False
+
+
+def statement_parses(line: str) -> bool:
+    """單行敘述能否解析：區塊開頭補上本體，elif/else/except 補上前導區塊"""
+    stmt = line.strip()
+    if not stmt or stmt.startswith('#'):
+        return True
+    first = re.match(r'\w+', stmt)
+    prefix = _CONTINUATION_PREFIX.get(first.group() if first else '', '')
+    body = '\n    pass' if stmt.endswith(':') else ''
+    return parses(prefix + stmt + body)
+
+
+def _balanced(line: str) -> bool:
+    """括號是否成對；不成對的行屬於多行敘述，單獨解析沒有意義"""
+    depth = 0
+    for ch in re.sub(r'(["\']).*?\1|#.*', '', line):
+        if ch in '([{':
+            depth += 1
+        elif ch in ')]}':
+            depth -= 1
+    return depth == 0
+
+
+def _known_spelling(word: str) -> str:
+    """把字中的 1/0 換成字母，優先選擇認得的名稱"""
+    spellings = [word.translate(table) for table in _TO_LETTER]
+    return next((w for w in spellings if w in KNOWN_NAMES), spellings[0])
+
+
+def _bound_names(tree: ast.AST) -> set:
+    """程式碼中自己定義的名稱（賦值、函式、類別、參數、import）"""
+    names = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Name) and not isinstance(node.ctx, ast.Load):
+            names.add(node.id)
+        elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            names.add(node.name)
+        elif isinstance(node, ast.arg):
+            names.add(node.arg)
+        elif isinstance(node, ast.alias):
+            names.add((node.asname or node.name).split('.')[0])
+    return names
+
+
+def fix_identifiers(code: str) -> str:
+    """能解析的程式碼中，未定義且把 1/0 換成字母後是認得名稱的識別字改回來（pr1nt → print）"""
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            tree = ast.parse(textwrap.dedent(code))
+    except (SyntaxError, ValueError):
+        return code
+    bound = _bound_names(tree)
+    renames = {}
+    for node in ast.walk(tree):
+        if (isinstance(node, ast.Name) and node.id not in bound
+                and _DIGIT_WORD.fullmatch(node.id)):
+            spelling = _known_spelling(node.id)
+            if spelling in KNOWN_NAMES:
+                renames[node.id] = spelling
+    if not renames:
+        return code
+
+    # 以token位置替換，屬性（obj.pr1nt）、字串與註解內的同名文字不動
+    edits, previous = [], None
+    try:
+        for token in tokenize.generate_tokens(io.StringIO(code).readline):
+            if (token.type == tokenize.NAME and token.string in renames
+                    and not (previous and previous.string == '.')):
+                edits.append(token)
+            if token.type not in (tokenize.NL, tokenize.NEWLINE, tokenize.COMMENT,
+                                  tokenize.INDENT, tokenize.DEDENT):
+                previous = token
+    except (tokenize.TokenError, SyntaxError):
+        return code
+
+    lines = code.split('\n')
+    for token in reversed(edits):
+        row, col = token.start
+        line = lines[row - 1]
+        lines[row - 1] = line[:col] + renames[token.string] + line[col + len(token.string):]
+    fixed = '\n'.join(lines)
+    return fixed if parses(textwrap.dedent(fixed)) else code
+
+
+def candidates(stmt: str) -> List[str]:
+    """依編輯量由小到大產生候選修正（只改字串與註解以外的部分）"""
+    fixes = []
+
+    # 數字中的 l/I/O → 1/0
+    digits = outside_literals(lambda part: _MIXED_NUMBER.sub(
+        lambda m: m.group().translate(_TO_DIGIT) if re.search(r'\d', m.group()) else m.group(),
+        part), stmt)
+    if digits != stmt:
+        fixes.append(digits)
+
+    # 識別字中的 1/0 → l/O：先逐字挑認得的名稱，再試各種一致的替換
+    letters = outside_literals(
+        lambda part: _DIGIT_WORD.sub(lambda m: _known_spelling(m.group()), part), stmt)
+    if letters != stmt:
+        fixes.append(letters)
+    for table in _TO_LETTER:
+        letters = outside_literals(
+            lambda part: _DIGIT_WORD.sub(lambda m: m.group().translate(table), part), stmt)
+        if letters != stmt:
+            fixes.append(letters)
+
+    # 區塊開頭漏掉冒號
+    for base in [stmt] + fixes:
+        first = re.match(r'\w+', base)
+        if first and first.group() in BLOCK_KEYWORDS and not base.rstrip().endswith(':'):
+            code, _, comment = base.partition('  #')
+            fixed = code.rstrip() + ':' + (f'  #{comment}' if comment else '')
+            fixes.append(fixed)
+
+    return list(dict.fromkeys(fixes))[:MAX_CANDIDATES]
+
+
+class OCRCorrector:
+    def __init__(self, cache_path: str = None):
+        self.cache_path = Path(cache_path) if cache_path else None
+        self.decisions: Dict[str, str] = {}  # 行雜湊 → 修正後的行（去除縮排）
+        self.hits = 0
+        self.misses = 0
+        self.lines_fixed = 0
+        if self.cache_path and self.cache_path.exists():
+            with open(self.cache_path, 'r', encoding='utf-8') as f:
+                self.decisions = json.load(f)
+
+    @staticmethod
+    def _key(stmt: str) -> str:
+        return hashlib.blake2b(stmt.encode('utf-8'), digest_size=16).hexdigest()
+
+    def correct_line(self, line: str) -> str:
+        """修正單行（保留縮排）"""
+        return self._correct_normalized(normalize_code(line))
+
+    def _correct_normalized(self, line: str) -> str:
+        stmt = line.strip()
+        if not stmt:
+            return line
+        indent = line[:len(line) - len(line.lstrip())]
+
+        key = self._key(stmt)
+        fixed = self.decisions.get(key)
+        if fixed is None:
+            self.misses += 1
+            fixed = self._decide(stmt)
+            self.decisions[key] = fixed
+        else:
+            self.hits += 1
+
+        if fixed != stmt:
+            self.lines_fixed += 1
+        return indent + fixed
+
+    def _decide(self, stmt: str) -> str:
+        """原行能解析就保留，否則取能解析且認得最多名稱的候選"""
+        if statement_parses(stmt) or not _balanced(stmt):
+            return stmt
+        valid = [c for c in candidates(stmt) if statement_parses(c)]
+        if not valid:
+            return stmt
+        return max(valid, key=lambda c: sum(name in KNOWN_NAMES
+                                            for name in _IDENTIFIER.findall(c)))
+
+    def correct_code(self, code: str) -> str:
+        """修正整段程式碼；已能解析的程式碼原樣保留（只修正未定義的識別字）"""
+        if parses(textwrap.dedent(code)):
+            return self._fix_identifiers(code)
+
+        code = normalize_code(code)
+        # 多行字串的續行屬於字串內容，不逐行修正
+        spans, _ = literal_spans(code)
+        corrected, offset = [], 0
+        for line in code.split('\n'):
+            inside = any(start < offset < end for start, end in spans)
+            corrected.append(line if inside else self._correct_normalized(line))
+            offset += len(line) + 1
+        code = '\n'.join(corrected)
+        return self._fix_identifiers(code) if parses(textwrap.dedent(code)) else code
+
+    def _fix_identifiers(self, code: str) -> str:
+        fixed = fix_identifiers(code)
+        if fixed != code:
+            self.lines_fixed += sum(a != b for a, b in zip(code.split('\n'), fixed.split('\n')))
+        return fixed
+
+    def correct_batch(self, codes: List[str]) -> List[str]:
+        """批次修正，重複的行只判斷一次"""
+        return [self.correct_code(code) for code in codes]
+
+    def stats(self) -> Dict:
+        return {
+            'lines_fixed': self.lines_fixed,
+            'cache_hits': self.hits,
+            'cache_misses': self.misses,
+            'cached_decisions': len(self.decisions)
+        }
+
+    def save(self):
+        """把決定寫入快取檔（未指定路徑時不做事）"""
+        if not self.cache_path:
+            return
+        tmp = self.cache_path.with_suffix('.tmp')
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(self.decisions, f, ensure_ascii=False)
+        tmp.replace(self.cache_path)
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+非同步OCR分派器
+在背景執行緒的 asyncio 事件迴圈中同時執行多個 Dots OCR 行程：
+以號誌限制同時進行的數量，每個工作有逾時、有限次數重試與指數退避，
+全部失敗時改用pytesseract；呼叫端拿到的是 Future，依送出順序取回結果
+
+用法：
+    dispatcher = OCRDispatcher(concurrency=4, timeout=60, retries=2)
+    futures = [dispatcher.submit(path) for path in paths]
+    texts = [future.result()[1] for future in futures]
+"""
+
+import os
+import signal
+import asyncio
+import threading
+from pathlib import Path
+from typing import Dict, List, Tuple
+from concurrent.futures import Future
+
+from ocr_worker import DOTS_PYTHON
+
+
+class OCRDispatcher:
+    def __init__(self, concurrency: int = 4, timeout: float = 120, retries: int = 2,
+                 backoff: float = 1.0, python: str = DOTS_PYTHON):
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.python = python
+        self.counters = {'submitted': 0, 'retries': 0, 'timeouts': 0,
+                         'fallbacks': 0, 'failures': 0}
+        self._processes = set()  # 執行中的Dots OCR行程，關閉時整個行程群組一起終止
+
+        # 事件迴圈在自己的執行緒中執行，同步的掃描程式只需送出工作、等待Future
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self._thread.start()
+        self._slots = asyncio.run_coroutine_threadsafe(self._make_slots(), self.loop).result()
+
+    async def _make_slots(self) -> asyncio.Semaphore:
+        # 號誌必須在事件迴圈內建立
+        return asyncio.Semaphore(self.concurrency)
+
+    def submit(self, image_path) -> Future:
+        """送出一張截圖，Future 的結果為 (引擎, 文字)；引擎為 None 表示全部失敗"""
+        self.counters['submitted'] += 1
+        return asyncio.run_coroutine_threadsafe(self._recognize(str(image_path)), self.loop)
+
+    def recognize(self, image_paths: List) -> List[str]:
+        """同時辨識多張截圖，回傳順序與輸入相同"""
+        futures = [self.submit(path) for path in image_paths]
+        return [future.result()[1] for future in futures]
+
+    async def _recognize(self, image_path: str) -> Tuple[str, str]:
+        for attempt in range(self.retries + 1):
+            if attempt:
+                self.counters['retries'] += 1
+                # 退避等待時不佔用號誌，其他工作可以用這個名額
+                await asyncio.sleep(self.backoff * 2 ** (attempt - 1))
+            async with self._slots:
+                try:
+                    return 'dots.ocr', await self._run_dots(image_path)
+                except asyncio.TimeoutError:
+                    self.counters['timeouts'] += 1
+                except RuntimeError:
+                    pass  # 非零結束碼：重試
+                except OSError:
+                    break  # 找不到Dots OCR環境，重試也沒有用
+
+        # 備用方案：使用pytesseract（同樣有逾時，不讓單一區塊卡住整個掃描）
+        self.counters['fallbacks'] += 1
+        async with self._slots:
+            try:
+                return 'tesseract', await asyncio.to_thread(_tesseract, image_path, self.timeout)
+            except Exception as exc:
+                self.counters['failures'] += 1
+                print(f"  ⚠️ OCR失敗，略過 {Path(image_path).name}：{exc}")
+                return None, ''
+
+    async def _run_dots(self, image_path: str) -> str:
+        """執行一次Dots OCR；逾時則終止行程並拋出TimeoutError"""
+        process = await asyncio.create_subprocess_exec(
+            self.python, "-m", "dots.ocr", image_path,
+            stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE,
+            start_new_session=True)
+        self._processes.add(process)
+        try:
+            stdout, stderr = await asyncio.wait_for(process.communicate(), self.timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError):
+            # 逾時或關閉時整個行程群組一起終止，子行程若還握著管線，wait() 會一直等下去
+            _kill_group(process)
+            await process.wait()
+            raise
+        finally:
+            self._processes.discard(process)
+        if process.returncode != 0:
+            raise RuntimeError(stderr.decode('utf-8', 'replace').strip()[-200:])
+        return stdout.decode('utf-8', 'replace')
+
+    def stats(self) -> Dict:
+        return dict(self.counters, concurrency=self.concurrency)
+
+    async def _shutdown(self):
+        """終止執行中的Dots OCR行程群組，取消尚未完成的工作並等它們結束"""
+        for process in list(self._processes):
+            _kill_group(process)
+        tasks = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def close(self):
+        """取消未完成的工作、終止OCR行程後停止事件迴圈"""
+        asyncio.run_coroutine_threadsafe(self._shutdown(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join()
+        self.loop.close()
+
+
+def _kill_group(process):
+    try:
+        os.killpg(process.pid, signal.SIGKILL)
+    except ProcessLookupError:
+        pass
+
+
+def _tesseract(image_path: str, timeout: float) -> str:
+    import pytesseract
+    return pytesseract.image_to_string(image_path, timeout=timeout)
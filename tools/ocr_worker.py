@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+"""
+常駐OCR工作行程
+在 dots_ocr 環境中常駐，模型只在啟動時載入一次；透過 stdin/stdout 以JSON行格式
+接收批次圖片，每張圖片回傳 (引擎, 文字)，改用備用方案時呼叫端看得到
+
+伺服端（在 dots_ocr 環境中執行）：
+    python tools/ocr_worker.py --serve
+用戶端：
+    pool = OCRWorkerPool(workers=2)
+    results = pool.recognize_batch(["a.png", "b.png"])  # [(引擎, 文字), ...]
+"""
+
+import os
+import sys
+import json
+import signal
+import tempfile
+import importlib.util
+import queue
+import threading
+import itertools
+import subprocess
+from pathlib import Path
+from typing import Callable, List, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
+
+DOTS_PYTHON = "/opt/homebrew/Caskroom/miniconda/base/envs/dots_ocr/bin/python"
+
+
+def _dots_available() -> bool:
+    try:
+        return importlib.util.find_spec('dots.ocr') is not None
+    except ImportError:
+        return False
+
+
+def _load_dots() -> Optional[Callable[[str, float], str]]:
+    """在工作行程內載入一次 Dots OCR 模型，回傳 辨識(圖片, 逾時) 函式
+
+    使用 dots_ocr 套件的 DotsOCRParser（use_hf=True 在本行程內載入模型），
+    之後每張圖片只做推論；套件不在時退回 python -m dots.ocr 命令列（每張重新載入模型），
+    兩者都沒有時回傳 None。
+    """
+    try:
+        from dots_ocr.parser import DotsOCRParser
+    except ImportError:
+        if not _dots_available():
+            return None
+        print("⚠️ 找不到 dots_ocr.parser，改為每張圖片執行 python -m dots.ocr（每次重新載入模型）",
+              file=sys.stderr)
+        return _dots_cli
+
+    parser = DotsOCRParser(use_hf=True)
+
+    def recognize(path: str, timeout: float) -> str:
+        with tempfile.TemporaryDirectory() as output_dir:
+            results = parser.parse_file(str(path), output_dir=output_dir,
+                                        prompt_mode='prompt_ocr')
+            return Path(results[0]['md_content_path']).read_text(encoding='utf-8')
+    return recognize
+
+
+def _dots_cli(path: str, timeout: float) -> str:
+    """Dots OCR 命令列入口：python -m dots.ocr <圖片>，辨識結果在stdout
+
+    子行程留在工作行程的行程群組中，用戶端終止工作行程群組時一併結束。
+    """
+    try:
+        result = subprocess.run([sys.executable, "-m", "dots.ocr", str(path)],
+                                capture_output=True, text=True, timeout=timeout)
+    except subprocess.TimeoutExpired:
+        raise RuntimeError(f"逾時（{timeout} 秒）")
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip()[-200:] or f"結束碼 {result.returncode}")
+    return result.stdout
+
+
+def _recognize(path: str, dots, timeout: float) -> Tuple[str, str]:
+    """辨識一張圖片，回傳 (引擎, 文字)；Dots OCR 失敗時記錄原因並改用pytesseract"""
+    if dots:
+        try:
+            return 'dots.ocr', dots(path, timeout)
+        except Exception as exc:
+            print(f"⚠️ Dots OCR 失敗，{Path(path).name} 改用pytesseract：{exc}", file=sys.stderr)
+    return 'tesseract', _tesseract_fallback(path)
+
+
+def serve():
+    """伺服端主迴圈：每行一個請求 {"id", "images"}，回覆 {"id", "results"} 或 {"id", "error"}"""
+    # 引擎可能自行print，stdout只保留給協定使用
+    protocol_out = sys.stdout
+    sys.stdout = sys.stderr
+
+    dots = _load_dots()
+    if not dots:
+        print(f"⚠️ {sys.executable} 找不到 dots.ocr，所有圖片改用pytesseract", file=sys.stderr)
+    protocol_out.write(json.dumps({'ready': 'dots.ocr' if dots else 'tesseract'}) + '\n')
+    protocol_out.flush()
+
+    for line in sys.stdin:
+        if not line.strip():
+            continue
+        request = json.loads(line)
+        timeout = request.get('timeout', 120)
+        try:
+            response = {'id': request['id'],
+                        'results': [_recognize(path, dots, timeout)
+                                    for path in request['images']]}
+        except Exception as exc:
+            response = {'id': request['id'], 'error': repr(exc)}
+        protocol_out.write(json.dumps(response, ensure_ascii=False) + '\n')
+        protocol_out.flush()
+
+
+class OCRWorker:
+    def __init__(self, python: str = DOTS_PYTHON, startup_timeout: float = 300):
+        self.python = python
+        self.startup_timeout = startup_timeout
+        self.engine = None
+        self._ids = itertools.count(1)
+        self._start()
+
+    def _start(self):
+        """啟動工作行程並等待模型載入完成"""
+        self.process = subprocess.Popen(
+            [self.python, str(Path(__file__).resolve()), '--serve'],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+            text=True, encoding='utf-8', bufsize=1,
+            start_new_session=True)  # 自成行程群組，關閉時連同它啟動的OCR子行程一起終止
+        self._responses = queue.Queue()
+        threading.Thread(target=self._read_responses, args=(self.process, self._responses),
+                         daemon=True).start()
+
+        try:
+            ready = self._responses.get(timeout=self.startup_timeout)
+        except queue.Empty:
+            self.close()
+            raise TimeoutError("OCR工作行程載入模型逾時")
+        if ready is None:
+            self.close()
+            raise RuntimeError("OCR工作行程啟動失敗")
+        self.engine = ready.get('ready')
+
+    @staticmethod
+    def _read_responses(process, responses: queue.Queue):
+        """背景執行緒：逐行讀取回覆；行程結束時放入None"""
+        for line in process.stdout:
+            responses.put(json.loads(line))
+        responses.put(None)
+
+    def recognize(self, images: List[str], timeout: float = 120) -> List[Tuple[str, str]]:
+        """送出一批圖片，回傳 [(引擎, 文字)]；逾時則重啟工作行程並拋出TimeoutError"""
+        request_id = next(self._ids)
+        self.process.stdin.write(json.dumps({'id': request_id, 'timeout': timeout,
+                                             'images': [str(p) for p in images]}) + '\n')
+        self.process.stdin.flush()
+
+        while True:
+            try:
+                response = self._responses.get(timeout=timeout)
+            except queue.Empty:
+                self.restart()
+                raise TimeoutError(f"OCR請求 {request_id} 逾時（{timeout} 秒）")
+            if response is None:
+                self.restart()
+                raise RuntimeError("OCR工作行程意外結束")
+            if response.get('id') == request_id:
+                break  # 較早逾時請求的遲到回覆直接丟棄
+
+        if 'error' in response:
+            raise RuntimeError(response['error'])
+        return [tuple(result) for result in response['results']]
+
+    def restart(self):
+        """終止並重新啟動工作行程"""
+        self.close()
+        self._start()
+
+    def close(self):
+        """終止工作行程所在的整個行程群組（包括仍在執行的OCR子行程）"""
+        try:
+            os.killpg(self.process.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+        self.process.wait()
+
+
+class OCRWorkerPool:
+    def __init__(self, workers: int = 1, python: str = DOTS_PYTHON,
+                 timeout: float = 120, batch_size: int = 8):
+        self.python = python
+        self.timeout = timeout
+        self.batch_size = batch_size
+        self.workers = []
+        try:
+            for _ in range(workers):
+                self.workers.append(OCRWorker(python))
+        except BaseException:
+            # 後面的工作行程啟動失敗時，關閉已啟動的，不留下孤兒行程
+            self.close()
+            raise
+        self.fallbacks = 0
+        self._idle = queue.Queue()
+        for worker in self.workers:
+            self._idle.put(worker)
+
+    def _run_batch(self, images: List[str]) -> List[Tuple[str, str]]:
+        """取用一個閒置工作行程處理一批；失敗時改用pytesseract"""
+        worker = self._idle.get()
+        try:
+            return worker.recognize(images, timeout=self.timeout)
+        except (TimeoutError, RuntimeError, OSError) as exc:
+            print(f"  ⚠️ OCR工作行程失敗，改用pytesseract：{exc}")
+            self.fallbacks += 1
+            return [('tesseract', _tesseract_fallback(path)) for path in images]
+        finally:
+            self._idle.put(worker)
+
+    def recognize_batch(self, images: List[str]) -> List[Tuple[str, str]]:
+        """將圖片分批分派給各工作行程，回傳 [(引擎, 文字)]，順序與輸入相同"""
+        batches = [images[i:i + self.batch_size]
+                   for i in range(0, len(images), self.batch_size)]
+        with ThreadPoolExecutor(max_workers=len(self.workers)) as executor:
+            results = executor.map(self._run_batch, batches)
+        return [result for batch in results for result in batch]
+
+    def close(self):
+        """關閉所有工作行程"""
+        for worker in self.workers:
+            worker.close()
+
+
+def _tesseract_fallback(path: str) -> str:
+    """備用方案：使用pytesseract"""
+    import pytesseract
+    return pytesseract.image_to_string(str(path))
+
+
+if __name__ == "__main__":
+    if '--serve' in sys.argv:
+        serve()
+    else:
+        print("用法：python tools/ocr_worker.py --serve")
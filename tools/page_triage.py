@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+"""
+頁面分流
+渲染前先讀取文字層，判斷頁面是否可能含有程式碼
+"""
+
+from typing import Optional, Tuple
+
+from line_classifier import PYTHON_KEYWORDS, GH_WORDS, page_features
+
+
+def code_feature_reason(text: str) -> Optional[str]:
+    """回傳頁面文字中符合的程式碼特徵名稱，沒有則回傳None"""
+    features = page_features(text)
+
+    # 特徵1：有行號（連續的 1, 2, 3...）且包含Python關鍵字
+    if features['numbered_lines'] > 2 and features['keyword']:
+        return 'line_numbers'
+
+    # 特徵2：包含Line Description標記
+    if features['description']:
+        return 'line_description'
+
+    # 特徵3：包含Grasshopper相關內容
+    if features['gh_reference']:
+        return 'gh_reference'
+
+    return None
+
+
+def triage_text(text: str) -> Tuple[bool, str]:
+    """分流判斷，回傳 (是否需要渲染, 原因)"""
+    # 沒有文字層（掃描頁）無法從文字判斷，必須渲染
+    if not text.strip():
+        return True, 'no_text_layer'
+
+    reason = code_feature_reason(text)
+    if reason is None:
+        return False, 'no_code_features'
+    return True, reason
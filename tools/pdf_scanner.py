@@ -5,51 +5,311 @@ PDF自動掃描與程式碼提取系統
 """
 
 import os
+import math
 import subprocess
 import json
+import time
+import queue
+import threading
+from collections import deque
 from pathlib import Path
-from typing import List, Dict, Tuple
+from typing import List, Dict, Tuple, Iterator
+from concurrent.futures import ProcessPoolExecutor
 import cv2
 import numpy as np
 from PIL import Image
 import fitz  # PyMuPDF
 import pytesseract
 
+from image_buffer import load_gray, render_gray, iter_page_strips, merge_boxes
+from page_triage import triage_text
+from line_classifier import LineKind, classify_line, strip_line_number
+from render_cache import RenderCache
+from line_number_batch import BatchLineNumberVerifier
+from line_number_detector import detect_line_numbers, ocr_line_numbers, decide
+from ocr_worker import DOTS_PYTHON, OCRWorkerPool
+from vector_detector import find_gray_rects, is_scanned_page
+from text_layer import extract_block_code, extract_description
+from scan_manifest import ScanManifest, page_fingerprint
+from ocr_correction import OCRCorrector
+from extraction_store import ExtractionStore, PDF_SCANNER, legacy_block
+from code_index import CodeIndex
+from perceptual_hash import DuplicateGrouper
+from ocr_cache import OCRCache, read_pixels, dots_version, tesseract_version
+from ocr_dispatcher import OCRDispatcher
+from metrics import Metrics
+
+
+def _render_pages(pdf_path: str, page_indices: List[int], dpi: int, output_dir: str,
+                  cache: RenderCache, report_progress: bool = False,
+                  colorspace: str = 'rgb', metrics: Metrics = None) -> List[Path]:
+    """渲染指定頁面（0起算；可在子行程中執行，各自開啟文件）"""
+    doc = fitz.open(pdf_path)
+    image_paths = []
+
+    for page_num in page_indices:
+        image_path = Path(output_dir) / f"page_{page_num+1:03d}.png"
+        start = time.perf_counter()
+        cache.render_to(doc, page_num, dpi, image_path, colorspace=colorspace)
+        if metrics:
+            metrics.observe('render', time.perf_counter() - start)
+        image_paths.append(image_path)
+
+        if report_progress and (page_num + 1) % 10 == 0:
+            print(f"  已處理 {page_num + 1} 頁...")
+
+    doc.close()
+    return image_paths
+
+
+# 串流管線的結束標記
+_END = object()
+
+
+class _StageError:
+    """包裝管線階段的例外，沿佇列傳到消費端再拋出"""
+    def __init__(self, error: BaseException):
+        self.error = error
+
+
+def _put(outbox: queue.Queue, item, stop: threading.Event) -> bool:
+    """放入佇列；佇列滿時定期檢查 stop，已要求停止則放棄並回傳False"""
+    while not stop.is_set():
+        try:
+            outbox.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            pass
+    return False
+
+
+def _get(inbox: queue.Queue, stop: threading.Event):
+    """從佇列取出項目；已要求停止時回傳 _END"""
+    while not stop.is_set():
+        try:
+            return inbox.get(timeout=0.1)
+        except queue.Empty:
+            pass
+    return _END
+
+
+def _feed_stage(source, outbox: queue.Queue, stop: threading.Event):
+    """將產生器的項目依序放入佇列，停止時關閉產生器（連帶關閉其開啟的文件）"""
+    try:
+        for item in source:
+            if not _put(outbox, item, stop):
+                break
+    except BaseException as exc:
+        _put(outbox, _StageError(exc), stop)
+    finally:
+        source.close()
+    _put(outbox, _END, stop)
+
+
+def _run_stage(func, inbox: queue.Queue, outbox: queue.Queue, stop: threading.Event):
+    """從inbox取出項目處理後放入outbox，錯誤直接往下游傳遞"""
+    for item in iter(lambda: _get(inbox, stop), _END):
+        if isinstance(item, _StageError):
+            result = item
+        else:
+            try:
+                result = func(item)
+            except BaseException as exc:
+                result = _StageError(exc)
+        if not _put(outbox, result, stop):
+            return
+    _put(outbox, _END, stop)
+
+
 class PDFCodeScanner:
-    def __init__(self, pdf_path: str):
+    def __init__(self, pdf_path: str, render_cache: RenderCache = None,
+                 ocr_workers: int = 0, ocr_timeout: float = 120,
+                 correction_cache: str = None, output_dir: str = "extracted_codes",
+                 screenshots_dir: str = "screenshots", store: ExtractionStore = None,
+                 code_index: CodeIndex = None, dedup_threshold: int = None,
+                 ocr_cache: OCRCache = None, ocr_concurrency: int = 0,
+                 ocr_retries: int = 2, metrics: Metrics = None):
         self.pdf_path = pdf_path
-        self.output_dir = Path("extracted_codes")
-        self.output_dir.mkdir(exist_ok=True)
-        self.screenshots_dir = Path("screenshots")
-        self.screenshots_dir.mkdir(exist_ok=True)
+        self.metrics = metrics or Metrics(PDF_SCANNER)
+        self.render_cache = render_cache or RenderCache()
+        self.ocr_cache = ocr_cache or OCRCache()
+        self.output_dir = Path(output_dir)
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        self.screenshots_dir = Path(screenshots_dir)
+        self.screenshots_dir.mkdir(parents=True, exist_ok=True)
+        self.skipped_pages = []
+        self.line_number_verifier = BatchLineNumberVerifier()
+        self.corrector = OCRCorrector(correction_cache)
+        self.store = store
+        self.code_index = code_index  # 每完成一頁即更新全文索引
+        # 指定漢明距離門檻時，近似重複的區塊只OCR一次
+        self.deduplicator = (DuplicateGrouper(dedup_threshold)
+                             if dedup_threshold is not None else None)
+        self.source = str(Path(pdf_path).resolve())
+        self.ocr_timeout = ocr_timeout
+        self.ocr_workers = ocr_workers
+        self.ocr_concurrency = ocr_concurrency
+        self.ocr_retries = ocr_retries
+        # 常駐工作行程與分派器在 open_ocr()、with 區塊或 scan_entire_pdf 開始時才啟動
+        self.ocr_pool = None
+        self.ocr_dispatcher = None
+
+    def open_ocr(self) -> bool:
+        """啟動常駐OCR工作行程或分派器（已啟動則不動），回傳這次是否有啟動新的"""
+        if self.ocr_pool or self.ocr_dispatcher:
+            return False
+        if self.ocr_workers > 0:
+            try:
+                self.ocr_pool = OCRWorkerPool(self.ocr_workers, timeout=self.ocr_timeout)
+            except (OSError, RuntimeError, TimeoutError) as exc:
+                print(f"⚠️ 無法啟動常駐OCR工作行程，改為逐區塊呼叫：{exc}")
+        # 沒有常駐工作行程時，可改由非同步分派器同時執行多個OCR行程
+        if self.ocr_concurrency > 0 and self.ocr_pool is None:
+            self.ocr_dispatcher = OCRDispatcher(self.ocr_concurrency, timeout=self.ocr_timeout,
+                                                retries=self.ocr_retries)
+        return bool(self.ocr_pool or self.ocr_dispatcher)
+
+    def close(self):
+        """關閉常駐OCR工作行程與分派器的事件迴圈（可重複呼叫）"""
+        if self.ocr_pool:
+            self.ocr_pool.close()
+            self.ocr_pool = None
+        if self.ocr_dispatcher:
+            self.ocr_dispatcher.close()
+            self.ocr_dispatcher = None
+
+    def __enter__(self):
+        self.open_ocr()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def pdf_to_images(self, dpi: int = 200, workers: int = 1, triage: bool = False,
+                      pages: List[int] = None, colorspace: str = 'rgb') -> List[Path]:
+        """將PDF轉換為圖片（workers > 1 時以多行程分段渲染）
 
-    def pdf_to_images(self, dpi: int = 200) -> List[Path]:
-        """將PDF轉換為圖片"""
+        triage=True 時先讀文字層，只渲染可能含程式碼的頁面，
+        略過的頁面與原因記錄在 self.skipped_pages。
+        pages 可指定只渲染部分頁面（0起算）。
+        colorspace='gray' 輸出單通道無alpha圖片，記憶體與檔案約為RGB的1/3。
+        """
         print("📄 將PDF轉換為圖片...")
-        doc = fitz.open(self.pdf_path)
+        if triage:
+            page_indices = self.triage_pages(pages)
+        else:
+            if pages is None:
+                doc = fitz.open(self.pdf_path)
+                pages = range(len(doc))
+                doc.close()
+            page_indices = list(pages)
+            self.skipped_pages = []
+
+        if workers > 1 and len(page_indices) > 1:
+            image_paths = self._render_parallel(page_indices, dpi, workers, colorspace)
+        else:
+            image_paths = _render_pages(self.pdf_path, page_indices, dpi,
+                                        str(self.screenshots_dir), self.render_cache,
+                                        report_progress=True, colorspace=colorspace,
+                                        metrics=self.metrics)
+
+        print(f"✅ 完成：共 {len(image_paths)} 頁")
+        return image_paths
+
+    def _render_parallel(self, page_indices: List[int], dpi: int, workers: int,
+                         colorspace: str = 'rgb') -> List[Path]:
+        """將頁面清單切成連續區段，每個行程自行開啟fitz文件渲染"""
+        workers = min(workers, len(page_indices))
+        chunk = -(-len(page_indices) // workers)  # 無條件進位
+        shares = [page_indices[start:start + chunk]
+                  for start in range(0, len(page_indices), chunk)]
+
         image_paths = []
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(_render_pages, self.pdf_path, share, dpi,
+                                   str(self.screenshots_dir), self.render_cache,
+                                   colorspace=colorspace)
+                       for share in shares]
+            # 依區段順序收集，輸出順序與單行程相同（子行程無法回報，以等待時間計入render）
+            for future, share in zip(futures, shares):
+                with self.metrics.timer('render'):
+                    image_paths.extend(future.result())
+                print(f"  已處理第 {share[0] + 1}-{share[-1] + 1} 頁...")
 
-        for page_num in range(len(doc)):
-            page = doc[page_num]
-            mat = fitz.Matrix(dpi/72, dpi/72)
-            pix = page.get_pixmap(matrix=mat)
+        return image_paths
 
-            image_path = self.screenshots_dir / f"page_{page_num+1:03d}.png"
-            pix.save(str(image_path))
-            image_paths.append(image_path)
+    def triage_pages(self, pages: List[int] = None) -> List[int]:
+        """讀取文字層分流，回傳需要渲染的頁面（0起算）"""
+        doc = fitz.open(self.pdf_path)
+        self.skipped_pages = []
+        page_indices = []
 
-            if (page_num + 1) % 10 == 0:
-                print(f"  已處理 {page_num + 1} 頁...")
+        for page_num in (range(len(doc)) if pages is None else pages):
+            with self.metrics.timer('text'):
+                keep, reason = triage_text(doc[page_num].get_text())
+            if keep:
+                page_indices.append(page_num)
+            else:
+                self.skipped_pages.append({'page': page_num + 1, 'reason': reason})
 
+        print(f"  🔎 文字層分流：{len(page_indices)} 頁需渲染，"
+              f"略過 {len(self.skipped_pages)} 頁")
         doc.close()
-        print(f"✅ 完成：共 {len(image_paths)} 頁")
-        return image_paths
+        return page_indices
+
+    def detect_code_blocks(self, image) -> List[Dict]:
+        """檢測圖片中的程式碼區塊（灰色背景）
+
+        image 可為圖片路徑、fitz.Pixmap 或陣列；Pixmap 直接包成陣列不複製。
+        """
+        return [block for block in self.find_candidate_blocks(image)
+                if self.has_line_numbers(block['image'])]
+
+    def detect_code_blocks_batch(self, images: List) -> List[List[Dict]]:
+        """檢測多頁的程式碼區塊，所有候選區塊的行號一次批次OCR驗證"""
+        candidates = [self.find_candidate_blocks(image) for image in images]
+
+        # 投影偵測能確定的區塊不送OCR，其餘拼成一張圖批次驗證
+        decided = {}
+        for page_index, blocks in enumerate(candidates):
+            for block_index, block in enumerate(blocks):
+                decision = self._projected_line_numbers(block['image'])
+                if decision is None:
+                    self.line_number_verifier.add((page_index, block_index), block['image'])
+                else:
+                    decided[(page_index, block_index)] = decision
+        verified = self.line_number_verifier.flush() if self.line_number_verifier.pending else {}
+        verified.update(decided)
+
+        return [[block for block_index, block in enumerate(blocks)
+                 if verified.get((page_index, block_index))]
+                for page_index, blocks in enumerate(candidates)]
 
-    def detect_code_blocks(self, image_path: Path) -> List[Dict]:
-        """檢測圖片中的程式碼區塊（灰色背景）"""
-        img = cv2.imread(str(image_path))
-        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    def _timed_detect(self, image) -> List[Dict]:
+        with self.metrics.timer('detect'):
+            return self.detect_code_blocks(image)
 
+    def find_candidate_blocks(self, image) -> List[Dict]:
+        """找出灰色背景的候選區塊（尚未驗證行號）"""
+        gray = load_gray(image)
+
+        code_blocks = []
+        for x, y, w, h in self.find_gray_boxes(gray):
+            # 過濾太小的區域（可能是噪音）
+            if w > 200 and h > 50:  # 最小寬度200px，高度50px
+                # 複製裁切區域，使其不依賴整頁Pixmap的生命週期
+                code_blocks.append({
+                    'x': x,
+                    'y': y,
+                    'width': w,
+                    'height': h,
+                    'image': gray[y:y+h, x:x+w].copy()
+                })
+
+        return code_blocks
+
+    def find_gray_boxes(self, gray: np.ndarray) -> List[Tuple[int, int, int, int]]:
+        """灰階圖中灰色背景區域的外框 (x, y, w, h)，未過濾大小"""
         # 檢測灰色背景區域（程式碼區塊通常是灰色背景）
         # 灰色值範圍：230-245
         lower_gray = np.array([230])
@@ -63,15 +323,37 @@ class PDFCodeScanner:
 
         # 找到輪廓
         contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        return [cv2.boundingRect(contour) for contour in contours]
 
-        code_blocks = []
-        for contour in contours:
-            x, y, w, h = cv2.boundingRect(contour)
+    def detect_code_blocks_strips(self, page, dpi: int = 200,
+                                  max_bytes: int = 8 * 1024 * 1024) -> List[Dict]:
+        """低記憶體偵測：整頁以單通道水平條帶逐條渲染、偵測
 
-            # 過濾太小的區域（可能是噪音）
-            if w > 200 and h > 50:  # 最小寬度200px，高度50px
-                # 檢查是否包含行號（1, 2, 3...）
-                roi = img[y:y+h, x:x+w]
+        任何時刻只保留一條不超過 max_bytes 的條帶，與頁面尺寸和DPI無關；
+        跨條帶的區塊合併外框後，再以clip單獨渲染該區塊做行號驗證。
+        區塊本身超過 max_bytes 時降低該區塊的渲染DPI，讓單一區塊的影像也不超過上限。
+        """
+        boxes = []
+        for y_offset, pix in iter_page_strips(page, dpi, max_bytes):
+            boxes.extend((x, y + y_offset, w, h)
+                         for x, y, w, h in self.find_gray_boxes(load_gray(pix)))
+            del pix
+
+        scale = dpi / 72
+        origin = page.rect.tl
+        code_blocks = []
+        for x, y, w, h in merge_boxes(boxes):
+            if w > 200 and h > 50:  # 與整頁偵測相同的大小門檻
+                clip = fitz.Rect(origin.x + x / scale, origin.y + y / scale,
+                                 origin.x + (x + w) / scale, origin.y + (y + h) / scale)
+                # 區塊需整塊交給OCR，無法再切條帶；改以降低DPI限制像素量
+                clip_dpi = min(dpi, int(dpi * math.sqrt(max_bytes / (w * h))))
+                if clip_dpi < dpi:
+                    self.metrics.count('roi_downscaled')
+                # 陣列引用 Pixmap 的記憶體，複製完成前須保留 pix
+                pix = render_gray(page, clip_dpi, clip)
+                roi = load_gray(pix).copy()
+                del pix
                 if self.has_line_numbers(roi):
                     code_blocks.append({
                         'x': x,
@@ -83,38 +365,206 @@ class PDFCodeScanner:
 
         return code_blocks
 
+    def detect_code_blocks_two_pass(self, page, dpi: int = 200,
+                                    detect_dpi: int = 72) -> List[Dict]:
+        """兩段解析度：以低DPI整頁渲染找灰色區塊，再以clip只把區塊渲染成 dpi 供驗證與OCR
+
+        偵測只需要區塊輪廓，72 DPI 的像素量約為 200 DPI 的1/8；
+        區塊直接從PDF以目標DPI重新渲染，OCR輸入與整頁高解析度裁切相同（或更高DPI時更清楚）。
+        """
+        low = render_gray(page, detect_dpi)
+        self.metrics.count('pixels_rendered', low.width * low.height)
+        gray = load_gray(low)
+
+        low_scale = detect_dpi / 72
+        scale = dpi / 72
+        origin = page.rect.tl
+        min_width, min_height = 200 * detect_dpi / dpi, 50 * detect_dpi / dpi
+        code_blocks = []
+        for x, y, w, h in self.find_gray_boxes(gray):
+            if w > min_width and h > min_height:  # 與整頁偵測相同的大小門檻（換算到低DPI）
+                # 外擴一個低DPI像素，補償低解析度外框的捨入誤差
+                clip = fitz.Rect(origin.x + (x - 1) / low_scale, origin.y + (y - 1) / low_scale,
+                                 origin.x + (x + w + 1) / low_scale,
+                                 origin.y + (y + h + 1) / low_scale) & page.rect
+                pix = render_gray(page, dpi, clip)
+                self.metrics.count('pixels_rendered', pix.width * pix.height)
+                roi = load_gray(pix).copy()
+                if self.has_line_numbers(roi):
+                    code_blocks.append({
+                        'x': round((clip.x0 - origin.x) * scale),
+                        'y': round((clip.y0 - origin.y) * scale),
+                        'width': roi.shape[1],
+                        'height': roi.shape[0],
+                        'rect': tuple(clip),
+                        'image': roi
+                    })
+        del gray, low
+
+        return code_blocks
+
+    def detect_code_blocks_vector(self, page, dpi: int = 200,
+                                  text_layer: bool = True) -> List[Dict]:
+        """向量層偵測：直接讀取灰色填滿矩形，只渲染區塊本身做行號驗證
+
+        text_layer=True 時先從文字層重建程式碼：有3個以上行號即確認為程式碼，
+        不需OCR；只有文字層缺失或亂碼的區塊才以OCR驗證與辨識。
+        掃描頁沒有向量資訊，改回整頁點陣偵測。
+        """
+        if is_scanned_page(page):
+            return self.detect_code_blocks(render_gray(page, dpi))
+
+        scale = dpi / 72
+        origin = page.rect.tl
+        rects = find_gray_rects(page)
+        code_blocks = []
+        for i, rect in enumerate(rects):
+            extracted = extract_block_code(page, rect) if text_layer else None
+            if extracted is not None and len(extracted['line_numbers']) < 3:
+                continue  # 文字層可讀但沒有行號：不是程式碼區塊
+
+            # 陣列引用 Pixmap 的記憶體，複製完成前須保留 pix
+            pix = render_gray(page, dpi, rect)
+            roi = load_gray(pix).copy()
+            del pix
+            if extracted is None and not self.has_line_numbers(roi):
+                continue
+
+            block = {
+                'x': round((rect.x0 - origin.x) * scale),
+                'y': round((rect.y0 - origin.y) * scale),
+                'width': roi.shape[1],
+                'height': roi.shape[0],
+                'rect': tuple(rect),
+                'image': roi
+            }
+            if extracted is not None:
+                # 說明文字在區塊下方，到下一個灰色區塊為止
+                stop_y = rects[i + 1].y0 if i + 1 < len(rects) else None
+                block['text_layer'] = {
+                    'code': extracted['code'],
+                    'description': extract_description(page, rect, stop_y)
+                }
+            code_blocks.append(block)
+
+        return code_blocks
+
+    def page_detector(self, dpi: int = 200, strip_bytes: int = None, vector: bool = False,
+                      detect_dpi: int = None):
+        """依模式回傳直接作用於PDF頁面的偵測函式；整頁點陣模式回傳None"""
+        if vector:
+            return lambda page: self.detect_code_blocks_vector(page, dpi)
+        if strip_bytes:
+            return lambda page: self.detect_code_blocks_strips(page, dpi, strip_bytes)
+        if detect_dpi:
+            return lambda page: self.detect_code_blocks_two_pass(page, dpi, detect_dpi)
+        return None
+
+    def iter_detected_pages(self, detect, triage: bool = False,
+                            pages: List[int] = None) -> Iterator[Tuple[int, List[Dict]]]:
+        """逐頁以 detect(page) 直接從PDF頁面偵測，產生 (頁碼, 程式碼區塊)"""
+        doc = fitz.open(self.pdf_path)
+        self.skipped_pages = []
+        try:
+            for page_num in (range(len(doc)) if pages is None else pages):
+                page = doc[page_num]
+                if triage:
+                    with self.metrics.timer('text'):
+                        keep, reason = triage_text(page.get_text())
+                    if not keep:
+                        self.skipped_pages.append({'page': page_num + 1, 'reason': reason})
+                        continue
+                with self.metrics.timer('detect'):
+                    code_blocks = detect(page)
+                yield page_num + 1, code_blocks
+        finally:
+            doc.close()
+
     def has_line_numbers(self, image) -> bool:
-        """檢查圖片是否包含行號"""
-        # 轉換為灰度圖
-        if len(image.shape) == 3:
-            gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        """檢查圖片是否包含行號（先以投影偵測，模稜兩可時才OCR）"""
+        decision = self._projected_line_numbers(image)
+        if decision is not None:
+            return decision
+        self.metrics.count('line_number_ocr')
+        return ocr_line_numbers(image)  # 至少有3個行號
+
+    def _projected_line_numbers(self, image):
+        """不需OCR的行號欄偵測；模稜兩可時回傳None"""
+        decision = decide(detect_line_numbers(image))
+        if decision is not None:
+            self.metrics.count('line_number_projection')
+        return decision
+
+    def _scan_settings(self, **options) -> Dict:
+        """會影響輸出的掃描參數，任何一項改變時清單中的舊結果都不可沿用"""
+        if self.ocr_pool:
+            ocr_engine = {'mode': 'pool', 'python': self.ocr_pool.python}
+        elif self.ocr_dispatcher:
+            ocr_engine = {'mode': 'dispatcher', 'python': DOTS_PYTHON}
         else:
-            gray = image
+            ocr_engine = {'mode': 'direct', 'python': DOTS_PYTHON}
+        return {
+            **options,
+            'dedup_threshold': (self.deduplicator.threshold
+                                if self.deduplicator else None),
+            'ocr_engine': ocr_engine,
+        }
 
-        # 提取左側區域（行號通常在左側）
-        height, width = gray.shape
-        left_region = gray[:, :min(50, width//10)]
+    def _ocr_cache_keys(self, image, python: str = DOTS_PYTHON) -> Dict[str, str]:
+        """Dots OCR 與備用 tesseract 各自的快取鍵（依實際產生文字的引擎寫入）"""
+        pixels = read_pixels(image)
+        return {'dots.ocr': self.ocr_cache.key(pixels, 'dots.ocr', '', dots_version(python)),
+                'tesseract': self.ocr_cache.key(pixels, 'tesseract', '', tesseract_version())}
 
-        # OCR識別
-        try:
-            text = pytesseract.image_to_string(left_region, config='--psm 6')
-            # 檢查是否包含數字行號
-            lines = text.strip().split('\n')
-            numbers = [line.strip() for line in lines if line.strip().isdigit()]
-            return len(numbers) > 2  # 至少有3個行號
-        except:
-            return False
+    def extract_code_with_dots(self, image_path: Path, image=None) -> str:
+        """使用Dots OCR提取程式碼（結果依截圖像素快取，可傳入已解碼的 image）"""
+        keys = self._ocr_cache_keys(image if image is not None else image_path)
+        dots_key, tesseract_key = keys['dots.ocr'], keys['tesseract']
+
+        # 只查Dots OCR的結果；備用方案的結果要等這次Dots OCR也失敗才取用，
+        # 一次暫時性的失敗不會讓這張截圖永遠停在品質較差的結果
+        text = self.ocr_cache.get(dots_key)
+        if text is not None:
+            return text
 
-    def extract_code_with_dots(self, image_path: Path) -> str:
-        """使用Dots OCR提取程式碼"""
         # 這裡呼叫Dots OCR
-        cmd = f"/opt/homebrew/Caskroom/miniconda/base/envs/dots_ocr/bin/python -m dots.ocr {image_path}"
-        try:
-            result = subprocess.run(cmd, shell=True, capture_output=True, text=True)
-            return result.stdout
-        except:
-            # 備用方案：使用pytesseract
-            return pytesseract.image_to_string(str(image_path))
+        self.metrics.count('ocr_calls')
+        cmd = [DOTS_PYTHON, "-m", "dots.ocr", str(image_path)]
+        with self.metrics.timer('ocr'):
+            try:
+                result = subprocess.run(cmd, capture_output=True, text=True,
+                                        timeout=self.ocr_timeout)
+                if result.returncode == 0:
+                    self.ocr_cache.put(dots_key, result.stdout)
+                    return result.stdout
+                reason = result.stderr.strip()[-200:] or f"結束碼 {result.returncode}"
+            except (OSError, subprocess.TimeoutExpired) as exc:
+                reason = exc
+
+            # 備用方案：使用pytesseract（非零結束碼與逾時、找不到環境同樣處理，不讓區塊被默默丟掉）
+            print(f"  ⚠️ Dots OCR 失敗，{Path(image_path).name} 改用pytesseract：{reason}")
+            text = self.ocr_cache.get(tesseract_key)
+            if text is None:
+                text = pytesseract.image_to_string(str(image_path))
+                self.ocr_cache.put(tesseract_key, text)
+            return text
+
+    def _recognize_with_pool(self, images: List, paths: List[Path]) -> List[str]:
+        """常駐工作行程批次OCR，只送出快取未命中的區塊"""
+        # 工作行程與逐區塊呼叫使用同一個 Dots OCR 入口，共用快取鍵
+        keys = [self._ocr_cache_keys(image, self.ocr_pool.python) for image in images]
+        texts = [self.ocr_cache.get(key['dots.ocr']) for key in keys]
+        missing = [i for i, text in enumerate(texts) if text is None]
+        if not missing:
+            return texts
+
+        self.metrics.count('ocr_calls', len(missing))
+        with self.metrics.timer('ocr'):
+            recognized = self.ocr_pool.recognize_batch([str(paths[i]) for i in missing])
+        for i, (engine, text) in zip(missing, recognized):
+            texts[i] = text
+            self.ocr_cache.put(keys[i][engine], text)  # 記在實際產生文字的引擎下
+        return texts
 
     def clean_code(self, raw_text: str) -> Tuple[str, str]:
         """清理提取的程式碼，分離程式碼和說明"""
@@ -126,14 +576,13 @@ class PDFCodeScanner:
 
         for line in lines:
             # 檢測"Line Description"標記
-            if 'Line Description' in line or '說明' in line:
+            if classify_line(line) & LineKind.DESCRIPTION:
                 in_description = True
                 continue
 
             if not in_description:
                 # 移除行號
-                import re
-                cleaned = re.sub(r'^\s*\d+\s+', '', line)
+                cleaned = strip_line_number(line)
                 if cleaned.strip():
                     code_lines.append(cleaned)
             else:
@@ -143,14 +592,34 @@ class PDFCodeScanner:
         code = '\n'.join(code_lines)
         description = '\n'.join(description_lines)
 
-        # 修正常見OCR錯誤
-        code = code.replace('．', '.')
-        code = code.replace('，', ',')
-        code = code.replace('（', '(')
-        code = code.replace('）', ')')
+        # 修正常見OCR錯誤（全形標點、l/1、O/0、漏掉的冒號），以解析器驗證
+        code = self.corrector.correct_code(code)
 
         return code, description
 
+    def _dispatch_ocr(self, images: List, paths: List[Path]) -> List:
+        """快取命中的直接回傳文字，其餘送交分派器，回傳 (Future, 快取鍵)"""
+        texts = []
+        for image, path in zip(images, paths):
+            keys = self._ocr_cache_keys(image)
+            text = self.ocr_cache.get(keys['dots.ocr'])
+            if text is None:
+                self.metrics.count('ocr_calls')
+                text = (self.ocr_dispatcher.submit(path), keys)
+            texts.append(text)
+        return texts
+
+    def _resolve_ocr(self, text) -> str:
+        """等待分派器的結果並寫入對應引擎的快取鍵"""
+        if not isinstance(text, tuple):
+            return text
+        future, keys = text
+        with self.metrics.timer('ocr'):  # 主執行緒實際等待OCR的時間
+            engine, text = future.result()
+        if engine is not None:
+            self.ocr_cache.put(keys[engine], text)
+        return text
+
     def process_page(self, page_num: int, image_path: Path) -> List[Dict]:
         """處理單頁"""
         print(f"📄 處理第 {page_num} 頁...")
@@ -158,58 +627,393 @@ class PDFCodeScanner:
         # 檢測程式碼區塊
         code_blocks = self.detect_code_blocks(image_path)
 
-        results = []
+        ocr_outputs = self.ocr_blocks(page_num, code_blocks)
+        return self.clean_blocks(page_num, ocr_outputs)
+
+    def ocr_blocks(self, page_num: int, code_blocks: List[Dict]) -> List[Dict]:
+        """儲存區塊截圖並執行OCR，回傳原始文字"""
+        return self.finish_ocr(self.submit_ocr(page_num, code_blocks))
+
+    def submit_ocr(self, page_num: int, code_blocks: List[Dict]) -> Dict:
+        """儲存區塊截圖並送出OCR；使用分派器時不等待結果，由 finish_ocr 取回"""
+        block_paths = []
         for i, block in enumerate(code_blocks):
             # 儲存程式碼區塊截圖
             block_path = self.screenshots_dir / f"page_{page_num:03d}_block_{i+1}.png"
-            cv2.imwrite(str(block_path), block['image'])
+            with self.metrics.timer('io'):
+                cv2.imwrite(str(block_path), block['image'])
+            block_paths.append(block_path)
+
+        # 已由文字層取得程式碼的區塊不需OCR
+        ocr_indices = [i for i, block in enumerate(code_blocks) if 'text_layer' not in block]
+
+        # 近似重複的區塊沿用同組代表的OCR結果
+        groups = {}
+        if self.deduplicator:
+            for i in ocr_indices:
+                groups[i] = self.deduplicator.assign(code_blocks[i]['image'], str(block_paths[i]))
+            ocr_indices = [i for i in ocr_indices if not groups[i][1]]
+        ocr_paths = [block_paths[i] for i in ocr_indices]
+
+        # 提取程式碼：有常駐工作行程時整批送出（先查快取），
+        # 有分派器時同時執行、稍後取回，否則逐區塊呼叫
+        images = [code_blocks[i]['image'] for i in ocr_indices]
+        if self.ocr_pool and ocr_paths:
+            raw_texts = self._recognize_with_pool(images, ocr_paths)
+        elif self.ocr_dispatcher:
+            raw_texts = self._dispatch_ocr(images, ocr_paths)
+        else:
+            raw_texts = [self.extract_code_with_dots(path, image)
+                         for path, image in zip(ocr_paths, images)]
+        raw_by_index = dict(zip(ocr_indices, raw_texts))
+
+        for i, (group_id, duplicate) in groups.items():
+            if not duplicate:
+                # 代表區塊的結果可能尚未完成，後續重複區塊在 finish_ocr 時才取用
+                self.deduplicator.set_text(group_id, raw_by_index[i])
+
+        return {'page': page_num, 'blocks': code_blocks, 'paths': block_paths,
+                'groups': groups, 'texts': raw_by_index}
+
+    def finish_ocr(self, pending: Dict) -> List[Dict]:
+        """等待 submit_ocr 送出的OCR完成，回傳原始文字"""
+        code_blocks, block_paths = pending['blocks'], pending['paths']
+        raw_by_index = {i: self._resolve_ocr(text) for i, text in pending['texts'].items()}
+
+        for i, (group_id, duplicate) in pending['groups'].items():
+            if duplicate:
+                raw_by_index[i] = self._resolve_ocr(self.deduplicator.text(group_id))
+                self.deduplicator.ocr_avoided += 1
+            else:
+                self.deduplicator.set_text(group_id, raw_by_index[i])
+
+        ocr_outputs = []
+        for i, (block, block_path) in enumerate(zip(code_blocks, block_paths)):
+            output = {'block': i + 1, 'screenshot': str(block_path)}
+            if 'text_layer' in block:
+                output.update(block['text_layer'])
+            else:
+                output['raw_text'] = raw_by_index[i]
+            ocr_outputs.append(output)
+
+        return ocr_outputs
 
-            # 提取程式碼
-            raw_text = self.extract_code_with_dots(block_path)
-            code, description = self.clean_code(raw_text)
+    def clean_blocks(self, page_num: int, ocr_outputs: List[Dict]) -> List[Dict]:
+        """清理OCR文字，保留含程式碼的區塊"""
+        with self.metrics.timer('cleanup'):
+            return self._clean_blocks(page_num, ocr_outputs)
+
+    def _clean_blocks(self, page_num: int, ocr_outputs: List[Dict]) -> List[Dict]:
+        results = []
+        for output in ocr_outputs:
+            if 'raw_text' in output:
+                code, description = self.clean_code(output['raw_text'])
+            else:
+                code, description = output['code'], output['description']
 
             if code.strip():
-                results.append({
+                result = {
                     'page': page_num,
-                    'block': i + 1,
+                    'block': output['block'],
                     'code': code,
                     'description': description,
-                    'screenshot': str(block_path)
-                })
+                    'screenshot': output['screenshot']
+                }
+                if 'raw_text' in output:
+                    result['raw_text'] = output['raw_text']  # 存入資料庫的 ocr_text
+                results.append(result)
 
-                print(f"  ✅ 找到程式碼區塊 {i+1}")
+                print(f"  ✅ 找到程式碼區塊 {output['block']}")
 
         return results
 
-    def scan_entire_pdf(self) -> Dict:
-        """掃描整個PDF"""
+    def iter_rendered_pages(self, dpi: int = 200, debug_dir: Path = None,
+                            triage: bool = False,
+                            pages: List[int] = None) -> Iterator[Tuple[int, "fitz.Pixmap"]]:
+        """逐頁渲染為灰階Pixmap；PNG僅在指定 debug_dir 時輸出"""
+        doc = fitz.open(self.pdf_path)
+        self.skipped_pages = []
+        try:
+            for page_num in (range(len(doc)) if pages is None else pages):
+                page = doc[page_num]
+                if triage:
+                    with self.metrics.timer('text'):
+                        keep, reason = triage_text(page.get_text())
+                    if not keep:
+                        self.skipped_pages.append({'page': page_num + 1, 'reason': reason})
+                        continue
+
+                with self.metrics.timer('render'):
+                    pix = render_gray(page, dpi)
+                self.metrics.count('pixels_rendered', pix.width * pix.height)
+                if debug_dir is not None:
+                    pix.save(str(Path(debug_dir) / f"page_{page_num+1:03d}.png"))
+                yield page_num + 1, pix
+        finally:
+            doc.close()
+
+    def iter_scan(self, dpi: int = 200, queue_size: int = 4, debug_dir: Path = None,
+                  triage: bool = False, pages: List[int] = None,
+                  strip_bytes: int = None, vector: bool = False,
+                  detect_dpi: int = None) -> Iterator[Tuple[int, List[Dict]]]:
+        """串流管線：render → detect → OCR → clean
+
+        各階段在獨立執行緒中以有界佇列相連，佇列滿時上游會等待，
+        因此同時存在記憶體中的頁面數量固定；每頁完成即輸出 (頁碼, 結果)。
+        指定 strip_bytes、vector 或 detect_dpi 時，偵測直接作用在PDF頁面上，
+        與渲染在同一階段內進行（fitz文件不跨執行緒共用）。
+        消費端提早停止或發生例外時，通知各階段停止、清空佇列並等待執行緒結束。
+        """
+        rendered = queue.Queue(maxsize=queue_size)
+        detected = queue.Queue(maxsize=queue_size)
+        recognized = queue.Queue(maxsize=queue_size)
+        stop = threading.Event()
+
+        detect = self.page_detector(dpi, strip_bytes, vector, detect_dpi)
+        if detect:
+            stages = [
+                (_feed_stage, (self.iter_detected_pages(detect, triage, pages), detected)),
+            ]
+        else:
+            stages = [
+                (_feed_stage, (self.iter_rendered_pages(dpi, debug_dir, triage, pages),
+                               rendered)),
+                (_run_stage, (lambda item: (item[0], self._timed_detect(item[1])),
+                              rendered, detected)),
+            ]
+        # OCR階段只送出工作；使用分派器時，佇列中的各頁OCR同時進行
+        stages.append((_run_stage, (lambda item: self.submit_ocr(*item),
+                                    detected, recognized)))
+        threads = [threading.Thread(target=target, args=(*args, stop), daemon=True)
+                   for target, args in stages]
+        for thread in threads:
+            thread.start()
+
+        try:
+            for item in iter(recognized.get, _END):
+                if isinstance(item, _StageError):
+                    raise item.error
+                page_num, ocr_outputs = item['page'], self.finish_ocr(item)
+                print(f"📄 完成第 {page_num} 頁")
+                yield page_num, self.clean_blocks(page_num, ocr_outputs)
+        finally:
+            stop.set()
+            for thread in threads:
+                thread.join()
+            # 釋放仍留在佇列中的頁面影像
+            for pending in (rendered, detected, recognized):
+                while not pending.empty():
+                    pending.get_nowait()
+
+    def scan_entire_pdf(self, workers: int = 1, streaming: bool = False,
+                        queue_size: int = 4, triage: bool = False,
+                        batch_pages: int = 0, resume: bool = False,
+                        strip_bytes: int = None, vector: bool = False,
+                        detect_dpi: int = None, ocr_dpi: int = 200) -> Dict:
+        """掃描整個PDF（streaming=True 時使用串流管線，不落地整頁PNG）
+
+        batch_pages > 0 時，每 batch_pages 頁的候選區塊行號合併成一次OCR驗證。
+        resume=True 時依逐頁清單只處理內容改變或未完成的頁面，再合併全部結果。
+        strip_bytes 指定時使用低記憶體條帶模式，每條渲染不超過此位元組數。
+        vector=True 時從向量層讀取灰色矩形，掃描頁才退回點陣偵測。
+        detect_dpi 指定時以此低DPI整頁偵測，只把區塊以 ocr_dpi 重新渲染（兩段解析度）。
+        OCR工作行程與分派器已關閉時重新啟動；掃描結束（包括發生例外）後
+        只關閉這次呼叫啟動的，同一個掃描器可以再次掃描。
+        """
+        opened = self.open_ocr()
+        try:
+            return self._scan_entire_pdf(workers, streaming, queue_size, triage, batch_pages,
+                                         resume, strip_bytes, vector, detect_dpi, ocr_dpi)
+        finally:
+            if opened:
+                self.close()
+
+    def _scan_entire_pdf(self, workers: int, streaming: bool, queue_size: int, triage: bool,
+                         batch_pages: int, resume: bool, strip_bytes: int, vector: bool,
+                         detect_dpi: int, ocr_dpi: int) -> Dict:
         print("🔍 開始掃描PDF...")
 
-        # 轉換PDF為圖片
-        image_paths = self.pdf_to_images()
+        doc = fitz.open(self.pdf_path)
+        page_count = len(doc)
+        if self.store:
+            self.store.set_chapters(self.source, doc)
+        manifest = None
+        pages = None
+        if resume:
+            fingerprints = [page_fingerprint(page) for page in doc]
+            manifest = ScanManifest(self.output_dir / "scan_manifest.json",
+                                    settings=self._scan_settings(
+                                        triage=triage, batch_pages=batch_pages,
+                                        strip_bytes=strip_bytes, vector=vector,
+                                        detect_dpi=detect_dpi, ocr_dpi=ocr_dpi))
+            manifest.prune(page_count)
+            pages = manifest.pending_pages(fingerprints)
+            print(f"  ♻️ 沿用 {page_count - len(pages)} 頁既有結果，重新處理 {len(pages)} 頁")
+        doc.close()
+
+        page_results = {}
+        try:
+            for page_num, results in self._iter_page_results(workers, streaming, queue_size,
+                                                             triage, batch_pages, pages,
+                                                             strip_bytes, vector,
+                                                             detect_dpi, ocr_dpi):
+                page_results[page_num] = results
+                self.metrics.count('pages')
+                self.metrics.count('blocks', len(results))
+                with self.metrics.timer('io'):
+                    if manifest:
+                        manifest.record(page_num, fingerprints[page_num - 1], results)
+                    if self.store:
+                        self._store_page(page_num, results)
+                    if self.code_index:
+                        self.code_index.add_page_blocks(f"{PDF_SCANNER}:{self.source}",
+                                                        page_num, results)
+        except BaseException:
+            # 中斷時先寫出尚未存檔的頁面，下次續跑不必重做
+            if manifest and manifest.unsaved:
+                manifest.save()
+            raise
+
+        if manifest:
+            # 分流略過的頁面也記錄為完成，下次不必重新判斷
+            for skipped in self.skipped_pages:
+                manifest.record(skipped['page'], fingerprints[skipped['page'] - 1], [],
+                                save=False)
+            manifest.save()
+            processed = set(page_results)
+            page_results = {n: manifest.results(n) or [] for n in range(1, page_count + 1)}
+            if self.store:
+                # 沿用的頁面也補進資料庫（新建的資料庫才會缺）
+                for page_num in set(page_results) - processed:
+                    if not self.store.query_pages(self.source, page=page_num):
+                        self._store_page(page_num, page_results[page_num])
 
-        all_codes = []
-        for i, image_path in enumerate(image_paths):
-            page_results = self.process_page(i + 1, image_path)
-            all_codes.extend(page_results)
+        if self.store:
+            for skipped in self.skipped_pages:
+                self.store.upsert_page(self.source, skipped['page'], 'skipped',
+                                       reason=skipped['reason'], commit=False)
 
-        # 儲存結果
+        all_codes = [code for page_num in sorted(page_results)
+                     for code in page_results[page_num]]
+
+        self.corrector.save()
+
+        # 儲存結果（有資料庫時由資料庫匯出相容的JSON）
         output_file = self.output_dir / "extracted_codes.json"
-        with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(all_codes, f, indent=2, ensure_ascii=False)
+        with self.metrics.timer('io'):
+            if self.store:
+                self.store.export_extracted_codes(self.source, output_file)
+            else:
+                with open(output_file, 'w', encoding='utf-8') as f:
+                    json.dump([legacy_block(code) for code in all_codes], f,
+                              indent=2, ensure_ascii=False)
 
         print(f"\n✅ 掃描完成！")
         print(f"📊 統計：")
-        print(f"  - 總頁數：{len(image_paths)}")
+        print(f"  - 總頁數：{page_count}")
+        print(f"  - 分流略過：{len(self.skipped_pages)} 頁")
+        if batch_pages > 0:
+            stats = self.line_number_verifier.stats()
+            print(f"  - 行號批次驗證：{stats['strips_checked']} 個區塊，"
+                  f"OCR {stats['ocr_calls']} 次（省下 {stats['calls_saved']} 次，"
+                  f"{stats['wall_time']} 秒）")
+        print(f"  - OCR修正：{self.corrector.stats()['lines_fixed']} 行")
+        projected = self.metrics.counters.get('line_number_projection', 0)
+        if projected:
+            print(f"  - 行號偵測：{projected} 個區塊以投影判定，"
+                  f"{self.metrics.counters.get('line_number_ocr', 0)} 個交給OCR")
+        ocr_cache_stats = self.ocr_cache.stats()
+        if ocr_cache_stats['hits'] or ocr_cache_stats['misses']:
+            print(f"  - OCR快取：命中 {ocr_cache_stats['hits']} 次，"
+                  f"未命中 {ocr_cache_stats['misses']} 次")
+        if self.ocr_dispatcher:
+            stats = self.ocr_dispatcher.stats()
+            print(f"  - OCR分派：同時 {stats['concurrency']} 個，逾時 {stats['timeouts']} 次，"
+                  f"重試 {stats['retries']} 次，改用pytesseract {stats['fallbacks']} 次，"
+                  f"失敗 {stats['failures']} 次")
+        if self.deduplicator:
+            stats = self.deduplicator.stats()
+            print(f"  - 重複區塊：{stats['checked']} 個區塊分成 {stats['groups']} 組，"
+                  f"省下 {stats['ocr_avoided']} 次OCR")
         print(f"  - 找到程式碼區塊：{len(all_codes)}")
         print(f"  - 結果儲存在：{output_file}")
 
+        # 快取命中數由快取物件自行累計（平行渲染的子行程命中無法回報）
+        self.metrics.set_count('ocr_cache_hits', self.ocr_cache.hits)
+        self.metrics.set_count('render_cache_hits', self.render_cache.hits)
+        metrics = self.metrics.export(self.output_dir)
+
         return {
-            'total_pages': len(image_paths),
+            'total_pages': page_count,
             'total_codes': len(all_codes),
+            'skipped_pages': self.skipped_pages,
+            'line_number_batch': self.line_number_verifier.stats(),
+            'ocr_correction': self.corrector.stats(),
+            'dedup': self.deduplicator.stats() if self.deduplicator else None,
+            'ocr_cache': self.ocr_cache.stats(),
+            'ocr_dispatch': self.ocr_dispatcher.stats() if self.ocr_dispatcher else None,
+            'metrics': metrics,
             'codes': all_codes
         }
 
+    def _store_page(self, page_num: int, results: List[Dict]):
+        """以一頁的結果取代資料庫中該頁的舊區塊"""
+        self.store.replace_page_blocks(
+            self.source, PDF_SCANNER, page_num,
+            [(f"{page_num}:{result['block']}", result) for result in results], 'ocr_done')
+        self.store.upsert_page(self.source, page_num, 'done')
+
+    def _iter_page_results(self, workers: int, streaming: bool, queue_size: int,
+                           triage: bool, batch_pages: int, pages: List[int] = None,
+                           strip_bytes: int = None, vector: bool = False,
+                           detect_dpi: int = None,
+                           ocr_dpi: int = 200) -> Iterator[Tuple[int, List[Dict]]]:
+        """依選擇的模式逐頁產生 (頁碼, 結果)"""
+        if streaming:
+            yield from self.iter_scan(dpi=ocr_dpi, queue_size=queue_size, triage=triage,
+                                      pages=pages, strip_bytes=strip_bytes, vector=vector,
+                                      detect_dpi=detect_dpi)
+            return
+
+        # 有分派器時，最多 queue_size 頁的OCR同時進行，偵測繼續往下跑
+        window = queue_size if self.ocr_dispatcher else 1
+        detect = self.page_detector(ocr_dpi, strip_bytes, vector, detect_dpi)
+        if detect:
+            yield from self._ocr_in_order(self.iter_detected_pages(detect, triage, pages),
+                                          window)
+            return
+
+        # 轉換PDF為圖片
+        image_paths = self.pdf_to_images(workers=workers, triage=triage, pages=pages)
+        page_nums = [int(path.stem.split('_')[1]) for path in image_paths]
+
+        if batch_pages > 0:
+            def detected_pages():
+                for start in range(0, len(image_paths), batch_pages):
+                    chunk = image_paths[start:start + batch_pages]
+                    with self.metrics.timer('detect'):
+                        blocks_per_page = self.detect_code_blocks_batch(chunk)
+                    yield from zip(page_nums[start:], blocks_per_page)
+        else:
+            def detected_pages():
+                for page_num, image_path in zip(page_nums, image_paths):
+                    yield page_num, self._timed_detect(image_path)
+        yield from self._ocr_in_order(detected_pages(), window)
+
+    def _ocr_in_order(self, detected: Iterator[Tuple[int, List[Dict]]],
+                      window: int) -> Iterator[Tuple[int, List[Dict]]]:
+        """送出各頁OCR後繼續偵測下一頁，依頁碼順序取回結果（最多 window 頁等待中）"""
+        pending = deque()
+        for page_num, code_blocks in detected:
+            print(f"📄 處理第 {page_num} 頁...")
+            pending.append(self.submit_ocr(page_num, code_blocks))
+            if len(pending) >= window:
+                item = pending.popleft()
+                yield item['page'], self.clean_blocks(item['page'], self.finish_ocr(item))
+        while pending:
+            item = pending.popleft()
+            yield item['page'], self.clean_blocks(item['page'], self.finish_ocr(item))
+
     def generate_examples(self, scan_results: Dict):
         """根據掃描結果生成範例檔案"""
         examples_dir = Path("examples")
@@ -271,10 +1075,9 @@ if __name__ == "__main__":
     print("brew install tesseract")
     print()
 
-    scanner = PDFCodeScanner("../GH_Python_2020_04_19_23_52_15.pdf")
-
-    # 執行掃描
-    # results = scanner.scan_entire_pdf()
-    # scanner.generate_examples(results)
+    with PDFCodeScanner("../GH_Python_2020_04_19_23_52_15.pdf") as scanner:
+        # 執行掃描
+        # results = scanner.scan_entire_pdf(workers=os.cpu_count())
+        # scanner.generate_examples(results)
 
-    print("準備就緒！執行 scanner.scan_entire_pdf() 開始掃描")
\ No newline at end of file
+        print("準備就緒！執行 scanner.scan_entire_pdf() 開始掃描")
\ No newline at end of file
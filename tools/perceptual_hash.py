@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+感知雜湊去重
+對偵測出的程式碼截圖計算 dHash/pHash，把近似重複的區塊（重複的標頭、
+相同的 import 區塊、不同章節的同一段程式）分成一組，每組只OCR代表區塊，
+其餘沿用代表的結果
+"""
+
+from typing import Dict, List, Optional, Tuple
+import cv2
+import numpy as np
+
+from image_buffer import load_gray
+
+
+def dhash(image, hash_size: int = 16) -> int:
+    """差異雜湊：縮成 (hash_size+1)×hash_size，比較左右相鄰像素"""
+    gray = load_gray(image)
+    small = cv2.resize(gray, (hash_size + 1, hash_size), interpolation=cv2.INTER_AREA)
+    bits = (small[:, 1:] > small[:, :-1]).flatten()
+    return int(''.join('1' if b else '0' for b in bits), 2)
+
+
+def phash(image, hash_size: int = 16, highfreq: int = 4) -> int:
+    """DCT雜湊：縮成 (hash_size×highfreq) 方形取低頻係數，與中位數比較"""
+    gray = load_gray(image)
+    size = hash_size * highfreq
+    small = cv2.resize(gray, (size, size), interpolation=cv2.INTER_AREA).astype(np.float32)
+    low = cv2.dct(small)[:hash_size, :hash_size].flatten()
+    bits = low > np.median(low[1:])  # 不讓直流分量影響門檻
+    return int(''.join('1' if b else '0' for b in bits), 2)
+
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count('1')
+
+
+HASHES = {'dhash': dhash, 'phash': phash}
+THUMB_WIDTH = 256
+CHANGED_LEVEL = 48  # 縮圖像素差超過此值視為內容不同
+
+
+class DuplicateGrouper:
+    def __init__(self, threshold: int = 10, method: str = 'dhash', hash_size: int = 16,
+                 size_tolerance: float = 0.05, max_changed_pixels: int = 2):
+        # threshold 為漢明距離上限（hash_size² 位元中可不同的位元數）
+        self.threshold = threshold
+        self.hash_func = HASHES[method]
+        self.hash_size = hash_size
+        self.bits = hash_size * hash_size
+        self.size_tolerance = size_tolerance
+        # 雜湊只看整體輪廓，只差一個字元的兩段程式也會很接近；
+        # 因此再比對縮圖，明顯不同的像素超過此數量就不算重複
+        self.max_changed_pixels = max_changed_pixels
+
+        # 鴿籠原理：距離 ≤ threshold 的兩個雜湊，切成 threshold+1 段後至少一段完全相同
+        self.chunks = min(threshold + 1, self.bits)
+        self.chunk_bits = -(-self.bits // self.chunks)
+        self.buckets: List[Dict[int, List[int]]] = [{} for _ in range(self.chunks)]
+
+        self.groups: List[Dict] = []  # 代表區塊：hash、尺寸、縮圖、OCR結果
+        self.checked = 0
+        self.ocr_avoided = 0
+
+    def _chunk_keys(self, value: int) -> List[int]:
+        mask = (1 << self.chunk_bits) - 1
+        return [(value >> (i * self.chunk_bits)) & mask for i in range(self.chunks)]
+
+    @staticmethod
+    def _thumbnail(gray: np.ndarray) -> np.ndarray:
+        # 固定寬度的縮圖，用來在雜湊相近時再確認像素內容
+        height, width = gray.shape
+        thumb_height = max(1, round(height * THUMB_WIDTH / max(1, width)))
+        return cv2.resize(gray, (THUMB_WIDTH, thumb_height), interpolation=cv2.INTER_AREA)
+
+    def _same_size(self, a, b) -> bool:
+        return all(abs(x - y) <= self.size_tolerance * max(x, y) for x, y in zip(a, b))
+
+    def assign(self, image, source: str = None) -> Tuple[int, bool]:
+        """回傳 (群組編號, 是否為重複)；沒有近似的群組時以此區塊建立新群組"""
+        gray = load_gray(image)
+        self.checked += 1
+        value = self.hash_func(gray, self.hash_size)
+        thumb = self._thumbnail(gray)
+
+        group_id = self._match(value, gray.shape, thumb)
+        if group_id is not None:
+            return group_id, True
+
+        group_id = len(self.groups)
+        self.groups.append({'hash': value, 'shape': gray.shape, 'thumb': thumb,
+                            'source': source, 'text': None})
+        for bucket, key in zip(self.buckets, self._chunk_keys(value)):
+            bucket.setdefault(key, []).append(group_id)
+        return group_id, False
+
+    def _match(self, value: int, shape, thumb: np.ndarray) -> Optional[int]:
+        # 只比對至少一段雜湊完全相同的群組，再以尺寸與縮圖像素確認
+        candidates = set()
+        for bucket, key in zip(self.buckets, self._chunk_keys(value)):
+            candidates.update(bucket.get(key, ()))
+
+        for group_id in sorted(candidates):
+            group = self.groups[group_id]
+            if hamming(value, group['hash']) > self.threshold:
+                continue
+            if not self._same_size(shape, group['shape']):
+                continue
+            other = group['thumb']
+            if thumb.shape != other.shape:
+                # 尺寸差一兩個像素的同一區塊，縮放到相同大小再比
+                other = cv2.resize(other, (thumb.shape[1], thumb.shape[0]),
+                                   interpolation=cv2.INTER_AREA)
+            diff = np.abs(thumb.astype(np.int16) - other.astype(np.int16))
+            if np.count_nonzero(diff > CHANGED_LEVEL) <= self.max_changed_pixels:
+                return group_id
+        return None
+
+    def set_text(self, group_id: int, text: str):
+        self.groups[group_id]['text'] = text
+
+    def text(self, group_id: int) -> Optional[str]:
+        return self.groups[group_id]['text']
+
+    def stats(self) -> Dict:
+        return {
+            'checked': self.checked,
+            'groups': len(self.groups),
+            'ocr_avoided': self.ocr_avoided
+        }
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+共用渲染快取
+以 (PDF內容雜湊, 頁碼, DPI, 裁切範圍, 色彩空間) 為鍵保存渲染結果，
+各掃描器的輸出檔以硬連結指向快取，同一頁不會重複渲染
+"""
+
+import os
+import shutil
+import hashlib
+import struct
+from pathlib import Path
+from typing import Dict, Tuple
+import fitz  # PyMuPDF
+
+COLORSPACES = {
+    'rgb': fitz.csRGB,
+    'gray': fitz.csGRAY,
+}
+
+
+def cache_size(cache_dir: Path, pattern: str = "*") -> int:
+    """快取目錄目前的總位元組數（略過列出後才被其他行程淘汰的檔案）"""
+    total = 0
+    for path in cache_dir.glob(pattern):
+        try:
+            total += path.stat().st_size
+        except FileNotFoundError:
+            continue
+    return total
+
+
+def evict_lru(cache_dir: Path, max_bytes: int, pattern: str = "*") -> int:
+    """依最後存取時間（mtime）淘汰最舊的檔案，直到總量低於上限，回傳釋放的位元組"""
+    entries = []
+    total = 0
+    for path in cache_dir.glob(pattern):
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            continue  # 其他行程剛刪除
+        entries.append((stat.st_mtime, stat.st_size, path))
+        total += stat.st_size
+
+    freed = 0
+    entries.sort()
+    for _, size, path in entries:
+        if total - freed <= max_bytes:
+            break
+        try:
+            path.unlink()
+            freed += size
+        except FileNotFoundError:
+            pass
+    return freed
+
+
+def png_size(path: Path) -> Tuple[int, int]:
+    """從PNG的IHDR讀取寬高，不需解碼圖片"""
+    with open(path, 'rb') as f:
+        header = f.read(24)
+    width, height = struct.unpack('>II', header[16:24])
+    return width, height
+
+
+class RenderCache:
+    def __init__(self, cache_dir: str = ".render_cache", max_bytes: int = 512 * 1024 * 1024):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(exist_ok=True)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._pdf_hashes: Dict[Tuple, str] = {}
+        self._size = cache_size(self.cache_dir, "*.png")
+
+    def pdf_hash(self, pdf_path: str) -> str:
+        """PDF內容雜湊（依路徑、大小、修改時間記憶，避免重複讀檔）"""
+        stat = os.stat(pdf_path)
+        memo_key = (os.path.abspath(pdf_path), stat.st_size, stat.st_mtime)
+        if memo_key not in self._pdf_hashes:
+            digest = hashlib.sha256()
+            with open(pdf_path, 'rb') as f:
+                for chunk in iter(lambda: f.read(1 << 20), b''):
+                    digest.update(chunk)
+            self._pdf_hashes[memo_key] = digest.hexdigest()
+        return self._pdf_hashes[memo_key]
+
+    def key(self, pdf_hash: str, page_index: int, dpi: int, clip=None,
+            colorspace: str = 'rgb') -> str:
+        """組合快取鍵"""
+        clip_key = None if clip is None else tuple(round(v, 2) for v in clip)
+        raw = f"{pdf_hash}:{page_index}:{dpi}:{clip_key}:{colorspace}"
+        return hashlib.sha256(raw.encode()).hexdigest()[:32]
+
+    def render(self, doc, page_index: int, dpi: int, clip=None,
+               colorspace: str = 'rgb') -> Path:
+        """取得頁面渲染結果的快取路徑，未命中時才渲染"""
+        path = self.cache_dir / f"{self.key(self.pdf_hash(doc.name), page_index, dpi, clip, colorspace)}.png"
+
+        try:
+            os.utime(path)  # 命中時更新LRU時間
+            self.hits += 1
+            return path
+        except FileNotFoundError:
+            pass
+
+        self.misses += 1
+        mat = fitz.Matrix(dpi/72, dpi/72)
+        pix = doc[page_index].get_pixmap(matrix=mat, clip=clip,
+                                         colorspace=COLORSPACES[colorspace], alpha=False)
+
+        # 先寫暫存檔再改名，平行渲染時不會讀到寫到一半的檔案
+        tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+        pix.save(str(tmp_path), output="png")
+        size = tmp_path.stat().st_size  # 改名後其他行程可能立即淘汰
+        os.replace(tmp_path, path)
+
+        self._size += size
+        if self._size > self.max_bytes:
+            self._size -= evict_lru(self.cache_dir, int(self.max_bytes * 0.9), "*.png")
+
+        return path
+
+    def materialize(self, cached_path: Path, dest: Path) -> Path:
+        """將快取檔以硬連結放到掃描器的輸出位置（不支援時改為複製）"""
+        dest = Path(dest)
+        if dest.exists():
+            if dest.samefile(cached_path):
+                return dest
+            dest.unlink()
+        try:
+            os.link(cached_path, dest)
+        except OSError:
+            shutil.copyfile(cached_path, dest)
+        return dest
+
+    def render_to(self, doc, page_index: int, dpi: int, dest: Path, clip=None,
+                  colorspace: str = 'rgb') -> Path:
+        """渲染（或取用快取）並放到指定輸出路徑"""
+        return self.materialize(self.render(doc, page_index, dpi, clip, colorspace), dest)
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+逐頁掃描清單
+記錄每頁內容串流的指紋與偵測/OCR結果，中斷後或換新版PDF時
+只重新處理指紋改變或尚未完成的頁面
+"""
+
+import os
+import json
+import hashlib
+from pathlib import Path
+from typing import Dict, List
+
+
+def page_fingerprint(page) -> str:
+    """頁面指紋：內容串流 + 頁面尺寸 + 所用圖片的原始串流"""
+    digest = hashlib.sha256()
+    digest.update(page.read_contents())
+    digest.update(repr(tuple(page.rect)).encode())
+    for image in page.get_images(full=True):
+        digest.update(page.parent.xref_stream_raw(image[0]) or b'')
+    return digest.hexdigest()
+
+
+class ScanManifest:
+    def __init__(self, path: str, settings: Dict = None, save_every: int = 20):
+        self.path = Path(path)
+        self.settings = settings or {}
+        self.pages: Dict[str, Dict] = {}
+        # 每記錄 save_every 頁才整份重寫一次，避免大檔每頁重寫造成 O(頁數²) 的寫入
+        self.save_every = max(1, save_every)
+        self.unsaved = 0
+
+        if self.path.exists():
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            # 掃描參數改變時舊結果不可沿用
+            if data.get('settings') == self.settings:
+                self.pages = data.get('pages', {})
+
+    def is_done(self, page_num: int, fingerprint: str) -> bool:
+        """該頁是否已完成且內容未改變"""
+        entry = self.pages.get(str(page_num))
+        return bool(entry and entry['status'] == 'done'
+                    and entry['fingerprint'] == fingerprint)
+
+    def record(self, page_num: int, fingerprint: str, results, status: str = 'done',
+               save: bool = True):
+        """記錄單頁結果，累積 save_every 頁後寫檔，中斷時最多重做這一批"""
+        self.pages[str(page_num)] = {
+            'fingerprint': fingerprint,
+            'status': status,
+            'results': results
+        }
+        self.unsaved += 1
+        if save and self.unsaved >= self.save_every:
+            self.save()
+
+    def results(self, page_num: int):
+        """取得單頁已記錄的結果"""
+        entry = self.pages.get(str(page_num))
+        return entry['results'] if entry else None
+
+    def prune(self, page_count: int):
+        """移除超出目前頁數的舊紀錄（新版PDF頁數變少時）"""
+        self.pages = {k: v for k, v in self.pages.items() if int(k) <= page_count}
+
+    def save(self):
+        """以暫存檔加改名的方式寫入，避免寫到一半的清單"""
+        tmp_path = self.path.with_suffix('.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'settings': self.settings, 'pages': self.pages},
+                      f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+        self.unsaved = 0
+
+    def pending_pages(self, fingerprints: List[str]) -> List[int]:
+        """回傳需要重新處理的頁面（0起算）"""
+        return [i for i, fingerprint in enumerate(fingerprints)
+                if not self.is_done(i + 1, fingerprint)]
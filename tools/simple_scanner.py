@@ -10,11 +10,18 @@ from pathlib import Path
 from PIL import Image
 import io
 
+from render_cache import RenderCache, png_size
+from extraction_store import SIMPLE_SCANNER
+from metrics import Metrics
+
 class SimpleScanner:
-    def __init__(self, pdf_path: str):
+    def __init__(self, pdf_path: str, render_cache: RenderCache = None,
+                 metrics: Metrics = None, output_dir: str = "extracted_codes"):
         self.pdf_path = pdf_path
-        self.output_dir = Path("extracted_codes")
-        self.output_dir.mkdir(exist_ok=True)
+        self.render_cache = render_cache or RenderCache()
+        self.metrics = metrics or Metrics(SIMPLE_SCANNER)
+        self.output_dir = Path(output_dir)
+        self.output_dir.mkdir(parents=True, exist_ok=True)
 
     def scan_pdf(self, start_page: int = 1, end_page: int = None):
         """掃描PDF並截取所有圖片"""
@@ -27,23 +34,18 @@ class SimpleScanner:
 
         screenshots = []
         for page_num in range(start_page - 1, min(end_page, len(doc))):
-            page = doc[page_num]
-
-            # 取得頁面截圖
-            mat = fitz.Matrix(2, 2)  # 2x放大
-            pix = page.get_pixmap(matrix=mat)
-            img_data = pix.tobytes("png")
-
-            # 儲存截圖
+            # 取得頁面截圖（2x放大 = 144 DPI，已渲染過則直接取用快取）
             img_path = self.output_dir / f"page_{page_num + 1:03d}.png"
-            with open(img_path, 'wb') as f:
-                f.write(img_data)
+            with self.metrics.timer('render'):
+                self.render_cache.render_to(doc, page_num, 144, img_path)
+            width, height = png_size(img_path)
+            self.metrics.count('pages')
 
             screenshots.append({
                 'page': page_num + 1,
                 'path': str(img_path),
-                'width': pix.width,
-                'height': pix.height
+                'width': width,
+                'height': height
             })
 
             print(f"  ✅ 第 {page_num + 1} 頁已截圖")
@@ -52,13 +54,16 @@ class SimpleScanner:
 
         # 儲存索引
         index_file = self.output_dir / "screenshots_index.json"
-        with open(index_file, 'w') as f:
-            json.dump(screenshots, f, indent=2)
+        with self.metrics.timer('io'):
+            with open(index_file, 'w') as f:
+                json.dump(screenshots, f, indent=2)
 
         print(f"\n✅ 完成！共截取 {len(screenshots)} 頁")
         print(f"📁 截圖儲存在：{self.output_dir}")
         print(f"📄 索引檔案：{index_file}")
 
+        self.metrics.set_count('render_cache_hits', self.render_cache.hits)
+        self.metrics.export(self.output_dir)
         return screenshots
 
     def extract_specific_pages(self, page_list: list):
@@ -68,12 +73,10 @@ class SimpleScanner:
         results = []
         for page_num in page_list:
             if page_num <= len(doc):
-                page = doc[page_num - 1]
-                mat = fitz.Matrix(2, 2)
-                pix = page.get_pixmap(matrix=mat)
-
                 img_path = self.output_dir / f"code_page_{page_num:03d}.png"
-                pix.save(str(img_path))
+                with self.metrics.timer('render'):
+                    self.render_cache.render_to(doc, page_num - 1, 144, img_path)
+                self.metrics.count('pages')
 
                 results.append({
                     'page': page_num,
@@ -83,6 +86,9 @@ class SimpleScanner:
                 print(f"✅ 已提取第 {page_num} 頁")
 
         doc.close()
+
+        self.metrics.set_count('render_cache_hits', self.render_cache.hits)
+        self.metrics.export(self.output_dir)
         return results
 
 # 測試腳本
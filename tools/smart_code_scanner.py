@@ -12,69 +12,174 @@ from pathlib import Path
 from typing import List, Dict, Tuple
 import re
 
+from page_triage import code_feature_reason
+from line_classifier import LineKind, NUMBERED_LINE, classify_line, strip_line_number
+from render_cache import RenderCache
+from scan_manifest import ScanManifest, page_fingerprint
+from code_merger import StreamingCodeMerger, line_number_range
+from extraction_store import ExtractionStore, SMART_SCANNER
+from metrics import Metrics
+
 class SmartCodeScanner:
-    def __init__(self, pdf_path: str):
+    def __init__(self, pdf_path: str, render_cache: RenderCache = None,
+                 store: ExtractionStore = None, metrics: Metrics = None,
+                 output_dir: str = "."):
         self.pdf_path = pdf_path
+        # 報告、OCR任務清單、掃描清單與指標都寫在 output_dir
+        self.output_dir = Path(output_dir)
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        self.metrics = metrics or Metrics(SMART_SCANNER)
         self.doc = fitz.open(pdf_path)
+        self.render_cache = render_cache or RenderCache()
         self.code_blocks = []
         self.screenshots_dir = Path("code_screenshots")
         self.screenshots_dir.mkdir(exist_ok=True)
-
-    def analyze_entire_pdf(self):
-        """分析整本PDF，找出所有程式碼區塊"""
+        # 提供資料庫時，報告與OCR任務改為查詢，不必每次重建
+        self.store = store
+        self.source = str(Path(pdf_path).resolve())
+        if store:
+            store.set_chapters(self.source, self.doc)
+
+    def analyze_entire_pdf(self, resume: bool = False, streaming_merge: bool = False):
+        """分析整本PDF，找出所有程式碼區塊
+
+        resume=True 時沿用清單中指紋未變的頁面結果，只重新分析其餘頁面。
+        streaming_merge=True 時邊掃描邊以行號連續性合併跨頁程式碼，不需第二輪。
+        """
         print("📚 開始分析整本PDF...")
         print(f"總頁數：{len(self.doc)}")
 
-        for page_num in range(len(self.doc)):
-            page = self.doc[page_num]
-            text = page.get_text()
-
-            # 檢查是否包含程式碼特徵
-            if self.has_code_features(text):
-                # 提取頁面圖片
-                mat = fitz.Matrix(2, 2)  # 2x放大
-                pix = page.get_pixmap(matrix=mat)
-                img_data = pix.tobytes("png")
-
-                # 保存頁面截圖
-                img_path = self.screenshots_dir / f"page_{page_num + 1:03d}.png"
-                with open(img_path, 'wb') as f:
-                    f.write(img_data)
-
-                # 分析頁面內容
-                code_info = self.analyze_page(page_num + 1, text, img_path)
-                if code_info:
-                    self.code_blocks.append(code_info)
+        manifest = ScanManifest(self.output_dir / "code_analysis_manifest.json") if resume else None
+        if manifest:
+            manifest.prune(len(self.doc))
+        merger = StreamingCodeMerger() if streaming_merge else None
+        reused = 0
+
+        try:
+            for page_num in range(len(self.doc)):
+                page = self.doc[page_num]
+
+                if manifest:
+                    fingerprint = page_fingerprint(page)
+                    if manifest.is_done(page_num + 1, fingerprint):
+                        code_info = manifest.results(page_num + 1)
+                        self._collect(code_info, merger)
+                        self._record_page(page_num + 1, code_info)
+                        reused += 1
+                        continue
 
-            # 進度顯示
-            if (page_num + 1) % 10 == 0:
-                print(f"  已分析 {page_num + 1}/{len(self.doc)} 頁...")
+                code_info = self.analyze_single_page(page_num)
+                self._collect(code_info, merger)
+                self._record_page(page_num + 1, code_info)
+                if manifest:
+                    with self.metrics.timer('io'):
+                        manifest.record(page_num + 1, fingerprint, code_info)
+                self.metrics.count('pages')
+
+                # 進度顯示
+                if (page_num + 1) % 10 == 0:
+                    print(f"  已分析 {page_num + 1}/{len(self.doc)} 頁...")
+        finally:
+            # 清單分批寫檔；結束或中斷時寫出剩下的頁面
+            if manifest:
+                with self.metrics.timer('io'):
+                    manifest.save()
+
+        if manifest:
+            print(f"  ♻️ 沿用 {reused} 頁既有結果")
 
         # 處理跨頁程式碼
-        self.merge_continued_code()
+        with self.metrics.timer('cleanup'):
+            if merger:
+                self.code_blocks.extend(merger.close())
+                print(f"  合併跨頁後：{len(self.code_blocks)} 個程式碼區塊")
+            else:
+                self.merge_continued_code()
+
+        if self.store:
+            with self.metrics.timer('io'):
+                self.save_to_store()
 
         print(f"\n✅ 分析完成！找到 {len(self.code_blocks)} 個程式碼區塊")
+        self.metrics.set_count('blocks', len(self.code_blocks))
+        self.metrics.set_count('render_cache_hits', self.render_cache.hits)
+        self.metrics.set_count('pages_reused', reused)
+        self.metrics.export(self.output_dir)
         return self.code_blocks
 
-    def has_code_features(self, text: str) -> bool:
-        """檢查頁面是否包含程式碼特徵"""
-        # 特徵1：有行號（連續的 1, 2, 3...）
-        line_numbers = re.findall(r'^\s*(\d+)\s+', text, re.MULTILINE)
-        has_line_numbers = len(line_numbers) > 2
-
-        # 特徵2：包含Python關鍵字
-        python_keywords = ['import', 'for', 'if', 'def', 'class', 'print',
-                          'return', 'while', 'try', 'except']
-        has_keywords = any(keyword in text for keyword in python_keywords)
-
-        # 特徵3：包含Line Description標記
-        has_line_desc = 'Line Description' in text or '說明' in text
+    def _record_page(self, page_num: int, code_info: Dict):
+        """記錄頁面狀態到資料庫（整批分析結束時一起提交）"""
+        if self.store:
+            self.store.upsert_page(self.source, page_num,
+                                   'code' if code_info else 'no_code',
+                                   screenshot=code_info['screenshot'] if code_info else None,
+                                   commit=False)
+
+    def save_to_store(self):
+        """把目前的區塊 upsert 到資料庫，並刪除這次已不存在的舊區塊"""
+        keys = []
+        for block in self.code_blocks:
+            pages = block.get('pages', [block.get('page', 0)])
+            key = f"{pages[0]}-{pages[-1]}"
+            status = 'code' if self.is_true_code_block(block) else 'no_code'
+            self.store.upsert_block(self.source, SMART_SCANNER, key, block, status,
+                                    commit=False)
+            keys.append(key)
+        self.store.prune_blocks(self.source, SMART_SCANNER, keys)
+
+    def _collect(self, code_info: Dict, merger: StreamingCodeMerger = None):
+        """收集單頁結果；串流合併時只保留已確定完成的區塊"""
+        if not code_info:
+            return
+        if merger:
+            self.code_blocks.extend(merger.feed(code_info))
+        else:
+            self.code_blocks.append(code_info)
+
+    def analyze_single_page(self, page_num: int) -> Dict:
+        """分析單頁（0起算），沒有程式碼時回傳None"""
+        page = self.doc[page_num]
+        with self.metrics.timer('text'):
+            text = page.get_text()
 
-        # 特徵4：包含Grasshopper相關內容
-        has_gh = any(word in text for word in ['rhinoscriptsyntax', 'Rhino.Geometry',
-                                                'GhPython', 'Grasshopper'])
+        # 檢查是否包含程式碼特徵
+        with self.metrics.timer('detect'):
+            if not self.has_code_features(text):
+                return None
+
+        # 保存頁面截圖（2x放大 = 144 DPI，經由共用渲染快取）
+        img_path = self.screenshots_dir / f"page_{page_num + 1:03d}.png"
+        with self.metrics.timer('render'):
+            self.render_cache.render_to(self.doc, page_num, 144, img_path)
+
+        # 分析頁面內容
+        with self.metrics.timer('detect'):
+            code_info = self.analyze_page(page_num + 1, text, img_path)
+            if code_info:
+                code_info.update(self.code_line_position(page))
+        return code_info
+
+    def code_line_position(self, page) -> Dict:
+        """有行號的文字行在頁面上的垂直範圍（佔頁高的比例），供跨頁判斷"""
+        tops, bottoms = [], []
+        for block in page.get_text("dict")["blocks"]:
+            for line in block.get("lines", []):
+                text = ''.join(span["text"] for span in line["spans"])
+                if NUMBERED_LINE.match(text):
+                    tops.append(line["bbox"][1])
+                    bottoms.append(line["bbox"][3])
+
+        if not tops:
+            return {}
+        height = page.rect.height
+        return {
+            'top_ratio': round((min(tops) - page.rect.y0) / height, 3),
+            'bottom_ratio': round((max(bottoms) - page.rect.y0) / height, 3)
+        }
 
-        return (has_line_numbers and has_keywords) or has_line_desc or has_gh
+    def has_code_features(self, text: str) -> bool:
+        """檢查頁面是否包含程式碼特徵"""
+        return code_feature_reason(text) is not None
 
     def analyze_page(self, page_num: int, text: str, img_path: Path) -> Dict:
         """分析單頁內容，提取程式碼資訊"""
@@ -88,15 +193,17 @@ class SmartCodeScanner:
         in_description = False
 
         for i, line in enumerate(lines):
+            kind = classify_line(line)
+
             # 檢測行號開頭的程式碼行
-            if re.match(r'^\s*\d+\s+', line):
+            if kind & LineKind.NUMBERED:
                 if code_start is None:
                     code_start = i
                 code_end = i
                 code_lines.append(line)
 
             # 檢測Line Description
-            elif 'Line Description' in line or '說明' in line:
+            elif kind & LineKind.DESCRIPTION:
                 in_description = True
 
             elif in_description:
@@ -106,10 +213,14 @@ class SmartCodeScanner:
             # 檢查是否為跨頁（程式碼在頁面底部）
             is_continued = code_end and code_end > len(lines) - 5
 
+            first_line_no, last_line_no = line_number_range(code_lines)
+
             return {
                 'page': page_num,
                 'screenshot': str(img_path),
                 'code_lines': code_lines,
+                'first_line_no': first_line_no,
+                'last_line_no': last_line_no,
                 'description': '\n'.join(description_lines),
                 'is_continued': is_continued,
                 'line_count': len(code_lines),
@@ -153,26 +264,25 @@ class SmartCodeScanner:
 
     def identify_true_code_blocks(self) -> List[Dict]:
         """識別真正的程式碼區塊（包含行號和程式碼內容）"""
-        true_blocks = []
+        return [block for block in self.code_blocks if self.is_true_code_block(block)]
 
-        for block in self.code_blocks:
-            # 檢查是否為真正的程式碼
-            has_valid_code = False
-
-            for line in block['code_lines']:
-                # 移除行號後檢查是否有實際程式碼
-                code_part = re.sub(r'^\s*\d+\s+', '', line)
-                if code_part.strip() and not code_part.startswith('#'):
-                    has_valid_code = True
-                    break
-
-            if has_valid_code:
-                true_blocks.append(block)
-
-        return true_blocks
+    def is_true_code_block(self, block: Dict) -> bool:
+        """區塊是否含有實際程式碼（不只是行號或註解）"""
+        for line in block['code_lines']:
+            # 移除行號後檢查是否有實際程式碼
+            code_part = strip_line_number(line)
+            if code_part.strip() and not code_part.startswith('#'):
+                return True
+        return False
 
     def generate_report(self):
         """生成程式碼清單報告"""
+        if self.store:
+            report = self.report_from_store()
+            with open(self.output_dir / 'code_analysis_report.json', 'w', encoding='utf-8') as f:
+                json.dump(report, f, indent=2, ensure_ascii=False)
+            return report
+
         report = {
             'total_pages': len(self.doc),
             'code_blocks': [],
@@ -206,11 +316,38 @@ class SmartCodeScanner:
                 report['statistics']['cross_page'] += 1
 
         # 保存報告
-        with open('code_analysis_report.json', 'w', encoding='utf-8') as f:
+        with open(self.output_dir / 'code_analysis_report.json', 'w', encoding='utf-8') as f:
             json.dump(report, f, indent=2, ensure_ascii=False)
 
         return report
 
+    def report_from_store(self) -> Dict:
+        """以資料庫查詢組出與 generate_report 相同格式的報告"""
+        rows = self.store.query_blocks(self.source, SMART_SCANNER)
+        report = {
+            'total_pages': len(self.doc),
+            'code_blocks': [],
+            'statistics': {
+                'total_blocks': len(rows),
+                'with_description': sum(row['has_description'] for row in rows),
+                'cross_page': sum(row['is_merged'] for row in rows),
+                'by_chapter': self.store.chapter_counts(self.source, SMART_SCANNER)
+            }
+        }
+
+        for row in rows:
+            block = json.loads(row['data'])
+            report['code_blocks'].append({
+                'id': len(report['code_blocks']) + 1,
+                'pages': block.get('pages', [block.get('page', 0)]),
+                'line_count': block['line_count'],
+                'has_description': block.get('has_description', False),
+                'preview': '\n'.join(block['code_lines'][:3]),
+                'screenshot': block.get('screenshot', '')
+            })
+
+        return report
+
     def display_summary(self):
         """顯示分析摘要"""
         print("\n" + "="*60)
@@ -228,23 +365,31 @@ class SmartCodeScanner:
         print("\n📑 程式碼清單：")
         for i, block in enumerate(true_blocks[:10], 1):  # 顯示前10個
             pages = block.get('pages', [block.get('page', 0)])
-            page_str = f"第 {pages[0]} 頁" if len(pages) == 1 else f"第 {pages[0]}-{pages[1]} 頁"
+            page_str = f"第 {pages[0]} 頁" if len(pages) == 1 else f"第 {pages[0]}-{pages[-1]} 頁"
             print(f"{i:2d}. {page_str}: {block['line_count']} 行程式碼")
 
             # 顯示預覽
             if block['code_lines']:
                 preview = block['code_lines'][0]
-                preview = re.sub(r'^\s*\d+\s+', '', preview)  # 移除行號
+                preview = strip_line_number(preview)  # 移除行號
                 print(f"    預覽: {preview[:50]}...")
 
         if len(true_blocks) > 10:
             print(f"\n... 還有 {len(true_blocks) - 10} 個程式碼區塊")
 
     def prepare_for_ocr(self):
-        """準備OCR處理清單"""
+        """準備OCR處理清單（有資料庫時查詢尚未OCR的程式碼區塊並標記為待處理）"""
         ocr_tasks = []
 
-        for i, block in enumerate(self.identify_true_code_blocks()):
+        if self.store:
+            rows = self.store.query_blocks(self.source, SMART_SCANNER,
+                                           status=('code', 'ocr_pending'))
+            blocks = [json.loads(row['data']) for row in rows]
+            self.store.set_status([row['id'] for row in rows], 'ocr_pending')
+        else:
+            blocks = self.identify_true_code_blocks()
+
+        for i, block in enumerate(blocks):
             task = {
                 'id': i + 1,
                 'pages': block.get('pages', [block.get('page', 0)]),
@@ -256,7 +401,7 @@ class SmartCodeScanner:
             ocr_tasks.append(task)
 
         # 保存OCR任務清單
-        with open('ocr_tasks.json', 'w') as f:
+        with open(self.output_dir / 'ocr_tasks.json', 'w') as f:
             json.dump(ocr_tasks, f, indent=2)
 
         print(f"\n✅ 已準備 {len(ocr_tasks)} 個OCR任務")
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+文字層程式碼重建
+讀取程式碼區塊矩形內帶座標的文字，依x位移還原縮排、依位置去除行號欄，
+原生數位PDF不需要OCR；文字層缺失或亂碼時回傳None交給OCR
+"""
+
+import statistics
+from typing import Dict, List, Optional
+
+from line_classifier import LineKind, classify_line, text_after_marker
+
+# 行號欄與程式碼之間至少要有的距離（以字寬計）
+NUMBER_GAP_CHARS = 1.0
+
+
+def _group_lines(words: List) -> List[List]:
+    """依y中心把文字分成視覺上的行（行號與程式碼常是不同的文字物件）"""
+    if not words:
+        return []
+    heights = [w[3] - w[1] for w in words]
+    tolerance = statistics.median(heights) / 2
+
+    lines = []
+    for word in sorted(words, key=lambda w: ((w[1] + w[3]) / 2, w[0])):
+        center = (word[1] + word[3]) / 2
+        if lines and abs(center - lines[-1]['center']) <= tolerance:
+            lines[-1]['words'].append(word)
+        else:
+            lines.append({'center': center, 'words': [word]})
+
+    return [sorted(line['words'], key=lambda w: w[0]) for line in lines]
+
+
+def _char_width(words: List) -> float:
+    """估計等寬字的字寬（取中位數，避免單一長字影響）"""
+    widths = [(w[2] - w[0]) / len(w[4]) for w in words if w[4]]
+    return statistics.median(widths) if widths else 1.0
+
+
+def is_garbled(text: str) -> bool:
+    """文字層是否不可用：空白、替代字元或大量無法對應的字形"""
+    stripped = ''.join(text.split())
+    if not stripped:
+        return True
+    if '\ufffd' in stripped:
+        return True
+    # 沒有ToUnicode對應的字型常解出私用區或控制字元
+    bad = sum(1 for ch in stripped
+              if 0xE000 <= ord(ch) <= 0xF8FF or (ord(ch) < 32 and ch not in '\t'))
+    return bad / len(stripped) > 0.05
+
+
+def extract_block_code(page, rect) -> Optional[Dict]:
+    """從區塊矩形內的文字層重建程式碼
+
+    回傳 {'code', 'line_numbers', 'lines'}，文字層缺失或亂碼時回傳None。
+    """
+    words = page.get_text("words", clip=rect)
+    if is_garbled(' '.join(w[4] for w in words)):
+        return None
+
+    lines = _group_lines(words)
+    char_width = _char_width(words)
+
+    # 行號欄：位於最左欄的純數字，且與其後文字之間有明顯間隔
+    left_x = min(line[0][0] for line in lines)
+    numbers = []
+    bodies = []
+    for line in lines:
+        first = line[0]
+        in_number_column = first[4].isdigit() and first[0] - left_x < 3 * char_width
+        if (in_number_column and len(line) > 1 and
+                line[1][0] - first[2] >= NUMBER_GAP_CHARS * char_width * 0.9):
+            numbers.append(int(first[4]))
+            bodies.append(line[1:])
+        elif in_number_column and len(line) == 1:
+            numbers.append(int(first[4]))  # 空白行只剩行號
+            bodies.append([])
+        else:
+            numbers.append(None)
+            bodies.append(line)
+
+    # 程式碼的左邊界：所有非空行中最左的x
+    starts = [body[0][0] for body in bodies if body]
+    if not starts:
+        return None
+    base_x = min(starts)
+
+    code_lines = []
+    for body in bodies:
+        if not body:
+            code_lines.append('')
+            continue
+        indent = round((body[0][0] - base_x) / char_width)
+        parts = [' ' * indent + body[0][4]]
+        # 以字間距還原字與字之間的空白數
+        for prev, word in zip(body, body[1:]):
+            spaces = max(1, round((word[0] - prev[2]) / char_width))
+            parts.append(' ' * spaces + word[4])
+        code_lines.append(''.join(parts))
+
+    return {
+        'code': '\n'.join(code_lines).rstrip('\n'),
+        'line_numbers': [n for n in numbers if n is not None],
+        'lines': list(zip(numbers, code_lines))
+    }
+
+
+def extract_description(page, rect, stop_y: float = None) -> str:
+    """讀取區塊下方 Line Description 標記之後的說明文字（到 stop_y 或頁尾為止）"""
+    stop_y = page.rect.y1 if stop_y is None else stop_y
+    blocks = sorted((b for b in page.get_text("blocks") if b[1] >= rect.y1 and b[3] <= stop_y),
+                    key=lambda b: (b[1], b[0]))
+
+    description = []
+    started = False
+    for block in blocks:
+        text = block[4].strip()
+        if not started:
+            if classify_line(text) & LineKind.DESCRIPTION:
+                started = True
+                rest = text_after_marker(text).lstrip(' :：').strip()
+                if rest:
+                    description.append(rest)
+            continue
+        description.append(text)
+
+    return '\n'.join(description)
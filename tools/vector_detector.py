@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+向量層程式碼區塊偵測
+教材中的灰底程式碼區塊是PDF向量層的填滿矩形，
+直接讀取繪圖指令即可得到精確的頁面座標，不必渲染與形態學運算
+"""
+
+from typing import List, Optional
+import fitz  # PyMuPDF
+
+# 與點陣偵測相同的灰階範圍（230-245）
+GRAY_LOW = 230 / 255
+GRAY_HIGH = 245 / 255
+
+
+def _fill_level(fill) -> Optional[float]:
+    """填滿色的灰階值（0-1）；非灰色回傳None"""
+    if fill is None:
+        return None
+    if len(fill) == 1:
+        return fill[0]
+    if len(fill) == 3:
+        if max(fill) - min(fill) > 0.02:  # 有色彩，不是灰色
+            return None
+        return sum(fill) / 3
+    return None
+
+
+def merge_rects(rects: List[fitz.Rect], gap: float = 1.0) -> List[fitz.Rect]:
+    """合併相交或相距 gap 點內的矩形（分段繪製的背景）"""
+    merged = []
+    for rect in sorted(rects, key=lambda r: r.y0):
+        rect = fitz.Rect(rect)
+        changed = True
+        while changed:
+            changed = False
+            for i, other in enumerate(merged):
+                if (rect.x0 <= other.x1 + gap and other.x0 <= rect.x1 + gap and
+                        rect.y0 <= other.y1 + gap and other.y0 <= rect.y1 + gap):
+                    rect |= other
+                    del merged[i]
+                    changed = True
+                    break
+        merged.append(rect)
+    return merged
+
+
+def find_gray_rects(page, min_width: float = 72, min_height: float = 18) -> List[fitz.Rect]:
+    """回傳頁面上灰色填滿矩形的外框（頁面座標，單位：點）
+
+    預設大小門檻等同點陣偵測在200 DPI下的 200x50 像素。
+    """
+    rects = []
+    for path in page.get_drawings():
+        if path.get('fill_opacity', 1) < 0.5:
+            continue
+        level = _fill_level(path.get('fill'))
+        if level is None or not GRAY_LOW <= level <= GRAY_HIGH:
+            continue
+        rects.append(path['rect'])
+
+    return [rect for rect in merge_rects(rects)
+            if rect.width > min_width and rect.height > min_height]
+
+
+def is_scanned_page(page) -> bool:
+    """沒有文字層但有圖片的頁面視為掃描頁，向量層無法提供資訊"""
+    return not page.get_text().strip() and bool(page.get_images())